@@ -1,2 +1,5 @@
-from .tag_converter import TagConverter
+__version__ = "1.1.0"
+
+from .tag_converter import TagConverter, ConversionError
+from .stream_converter import StreamConverter
 from .file_manager import FileManager
@@ -0,0 +1,64 @@
+import posixpath
+import os
+
+def list_asset_types(directory="assets"):
+    """
+    List asset types of the export, as folders of the assets
+    folder (`css`, `img`, `js`, `fonts`...).
+    """
+    if not os.path.isdir(directory):
+        return []
+    return sorted(entry.name for entry in os.scandir(directory) \
+            if entry.is_dir())
+
+class AssetIndex:
+    """
+    Index of every file available in the assets folder of
+    the export, built once with a single scan.
+
+    Used to find static links pointing to missing assets.
+    """
+    def __init__(self, directory="assets"):
+        self.directory = directory
+        self.files = self._scan(directory)
+
+    @staticmethod
+    def _scan(directory):
+        """
+        List recursively files of a directory, as paths relative
+        to the export folder using '/' separator.
+        """
+        files = set()
+        if not os.path.isdir(directory):
+            return files
+
+        pending = [directory]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        files.add(entry.path.replace(os.sep, "/"))
+        return files
+
+    @staticmethod
+    def normalize(link):
+        """
+        Convert a link of an html page to a file path of the export,
+        without query string or fragment.
+        """
+        link = link.split("?", 1)[0].split("#", 1)[0]
+        return posixpath.normpath(link.lstrip("/"))
+
+    def __contains__(self, link):
+        return self.normalize(link) in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def missing_links(self, links):
+        """
+        Return links of the given list without any asset.
+        """
+        return sorted(link for link in links if link not in self)
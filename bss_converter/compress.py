@@ -0,0 +1,147 @@
+from .sync import delete_extra_files
+from .json_file import load_json, save_json
+from concurrent.futures import ProcessPoolExecutor
+import importlib.util
+import functools
+import gzip
+import io
+import os
+
+#Extensions of text assets worth compressing
+COMPRESSED_EXTENSIONS = (".css", ".js", ".svg")
+
+def available_encodings():
+    """
+    List compressed variants written for each asset, brotli
+    only when its module is installed.
+    """
+    encodings = ["gzip"]
+    if importlib.util.find_spec("brotli") is not None:
+        encodings.append("br")
+    return encodings
+
+ENCODING_EXTENSIONS = {
+    "gzip": ".gz",
+    "br": ".br",
+}
+
+def compress_content(content, encoding):
+    """
+    Compress content at the highest level, gzip output
+    doesn't depend on the time of compression.
+    """
+    if encoding == "br":
+        import brotli
+        return brotli.compress(content)
+    #gzip.compress has no mtime before python 3.8
+    compressed = io.BytesIO()
+    with gzip.GzipFile(fileobj=compressed, mode="wb", compresslevel=9,
+            mtime=0) as gzip_stream:
+        gzip_stream.write(content)
+    return compressed.getvalue()
+
+def compress_file(filename, destination, encodings):
+    """
+    Write compressed variants of a file, only those smaller than
+    the file itself. Variants get the modification time of the file.
+
+    Run inside worker processes.
+    Return (filename, list of written variants).
+    """
+    with open(filename, "rb") as file_stream:
+        content = file_stream.read()
+    stat = os.stat(filename)
+
+    written = []
+    for encoding in encodings:
+        compressed = compress_content(content, encoding)
+        variant = destination + ENCODING_EXTENSIONS[encoding]
+        if len(compressed) >= len(content):
+            continue
+
+        os.makedirs(os.path.dirname(variant), exist_ok=True)
+        tmp_filename = variant + ".tmp"
+        with open(tmp_filename, "wb") as variant_stream:
+            variant_stream.write(compressed)
+        os.utime(tmp_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_filename, variant)
+        written.append(variant)
+    return filename, written
+
+class Precompressor:
+    """
+    Write gzip and brotli variants of text assets in a separate
+    folder, to be served without compressing them at each request.
+
+    Files smaller than `min_size` are skipped. Variants are
+    compressed again only when their source file changed, sources
+    are tracked by size and modification time in a cache file
+    next to the destination folder.
+    """
+    def __init__(self, destination, min_size=512, jobs=1):
+        self.destination = destination
+        self.min_size = min_size
+        self.jobs = jobs
+        self.encodings = available_encodings()
+        self.cache_file = os.path.normpath(destination) + ".json"
+        #Variants written by this run, and files left as they were
+        self.compressed = []
+        self.unchanged = []
+
+    def compress(self, source):
+        """
+        Compress text assets of source folder, removing variants
+        of files deleted from it.
+        """
+        cache = load_json(self.cache_file)
+        key = [*self.encodings, self.min_size]
+        kept_files = set()
+        pending = {}
+
+        for directory, subdirs, filenames in os.walk(source):
+            subdirs.sort()
+            for filename in sorted(filenames):
+                if not filename.endswith(COMPRESSED_EXTENSIONS):
+                    continue
+                source_file = os.path.join(directory, filename)
+                relative_file = os.path.relpath(source_file, source)
+                stat = os.stat(source_file)
+                if stat.st_size < self.min_size:
+                    continue
+
+                variants = cache.get(relative_file)
+                state = [stat.st_size, stat.st_mtime_ns, key]
+                if variants and variants[0] == state and \
+                        all(os.path.isfile(os.path.join(self.destination,
+                            variant)) for variant in variants[1]):
+                    kept_files.update(variants[1])
+                    self.unchanged.append(source_file)
+                    continue
+                pending[source_file] = (relative_file, state)
+
+        compressor = functools.partial(compress_file,
+                encodings=self.encodings)
+        destinations = [os.path.join(self.destination, relative_file) \
+                for relative_file, _ in pending.values()]
+        if self.jobs == 1 or len(pending) < 2:
+            results = map(compressor, pending, destinations)
+        else:
+            with ProcessPoolExecutor(min(self.jobs, len(pending))) as \
+                    executor:
+                results = list(executor.map(compressor, pending,
+                    destinations))
+
+        for source_file, written in results:
+            relative_file, state = pending[source_file]
+            variants = [os.path.relpath(variant, self.destination) for \
+                    variant in written]
+            cache[relative_file] = [state, variants]
+            kept_files.update(variants)
+            self.compressed.extend(written)
+
+        cache = {relative_file: variants for relative_file, variants in \
+                cache.items() if set(variants[1]) <= kept_files and \
+                os.path.isfile(os.path.join(source, relative_file))}
+        if os.path.isdir(self.destination):
+            delete_extra_files(self.destination, kept_files)
+        save_json(self.cache_file, cache)
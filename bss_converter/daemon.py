@@ -0,0 +1,131 @@
+import socketserver
+import contextlib
+import traceback
+import socket
+import json
+import io
+import os
+
+def is_export_variable(name):
+    """
+    Check if an environment variable configures exports,
+    sent by clients with each request.
+    """
+    return name == "DJANGO_PROJECT" or name.startswith("BSS_")
+
+class SocketOutput(io.TextIOBase):
+    """
+    Text stream sending everything written to the client,
+    as JSON lines tagged with the stream name.
+    """
+    def __init__(self, wfile, name):
+        self.wfile = wfile
+        self.name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            send_message(self.wfile, {self.name: text})
+        return len(text)
+
+def send_message(wfile, message):
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+class ExportHandler(socketserver.StreamRequestHandler):
+    """
+    Read a single export request, stream its output and
+    end with its exit status.
+    """
+    def handle(self):
+        stderr = SocketOutput(self.wfile, "stderr")
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as error:
+            stderr.write(f"invalid request: {error}\n")
+            send_message(self.wfile, {"status": 2})
+            return
+
+        status = self.server.run_request(request,
+                SocketOutput(self.wfile, "stdout"), stderr)
+        send_message(self.wfile, {"status": status})
+
+class ExportServer(socketserver.UnixStreamServer):
+    """
+    Long running process converting exports sent by clients
+    on a unix socket.
+
+    Imports, compiled rules and caches of previous exports stay in
+    memory between requests. Requests are handled one at a time, each
+    one in the directory and with the export variables of its client.
+    The socket is only usable by the user running the server.
+    """
+    def __init__(self, socket_path, export):
+        """
+        Export is called with the command line arguments of each
+        request, and may raise SystemExit.
+        """
+        self.socket_path = socket_path
+        self.export = export
+        self._remove_stale_socket()
+
+        umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, ExportHandler)
+        finally:
+            os.umask(umask)
+
+    def _remove_stale_socket(self):
+        """
+        Remove socket left by a server which didn't stop properly,
+        fail if a server is still listening.
+        """
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX) as client:
+            try:
+                client.connect(self.socket_path)
+            except ConnectionRefusedError:
+                os.unlink(self.socket_path)
+                return
+        raise OSError(f"a server already listens on '{self.socket_path}'")
+
+    def run_request(self, request, stdout, stderr):
+        """
+        Run an export with output redirected to given streams.
+        Return its exit status.
+        """
+        cwd = os.getcwd()
+        environ = dict(os.environ)
+        try:
+            for name in [name for name in os.environ \
+                    if is_export_variable(name)]:
+                del os.environ[name]
+            os.environ.update({name: value for name, value in \
+                    request.get("environ", {}).items() \
+                    if is_export_variable(name)})
+
+            with contextlib.redirect_stdout(stdout), \
+                    contextlib.redirect_stderr(stderr):
+                os.chdir(request["cwd"])
+                self.export(request.get("argv", []))
+            return 0
+        except SystemExit as error:
+            if error.code is None or isinstance(error.code, int):
+                return error.code or 0
+            stderr.write(f"{error.code}\n")
+            return 1
+        except Exception:
+            stderr.write(traceback.format_exc())
+            return 1
+        finally:
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
@@ -0,0 +1,239 @@
+from .sync import sync_tree, list_tree, delete_extra_files, SyncReport
+from concurrent.futures import ThreadPoolExecutor
+import ctypes.util
+import ctypes
+import shutil
+import errno
+import os
+
+#renameat2 flag swapping two existing paths, and current directory fd
+RENAME_EXCHANGE = 2
+AT_FDCWD = -100
+
+def _load_renameat2():
+    """
+    Find renameat2 function of the C library, None when
+    not available.
+    """
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    return getattr(libc, "renameat2", None)
+
+_renameat2 = _load_renameat2()
+
+def exchange_paths(first, second):
+    """
+    Swap two existing paths with a single atomic rename.
+
+    Return False when the system or the filesystem can't
+    exchange paths.
+    """
+    if _renameat2 is None:
+        return False
+    result = _renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD,
+            os.fsencode(second), RENAME_EXCHANGE)
+    if result == 0:
+        return True
+
+    error = ctypes.get_errno()
+    if error in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), first)
+
+def link_file(source, destination):
+    """
+    Hard link a file, copy it when links are not supported.
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+class StagedDeployment:
+    """
+    Update folders of the django project, as `templates/<app>` and
+    `static/<app>`, each one at once.
+
+    A modified folder is first built completely in a staging folder
+    next to it, from hard links of its current files and the new
+    files of the export. Once every staging folder is ready, they
+    replace deployed folders with atomic renames: a failing export
+    leaves the project untouched, and reloaders never see a folder
+    partially updated.
+
+    Folders are staged by `jobs` threads, deployed folders of
+    several django projects being written at the same time. Their
+    files are copied by another pool of `jobs` threads, shared by
+    all folders.
+    """
+    STAGE_PREFIX = ".bss_stage_"
+    PREVIOUS_PREFIX = ".bss_previous_"
+
+    def __init__(self, delete=False, checksum=False, jobs=1):
+        self.delete = delete
+        self.checksum = checksum
+        self.jobs = jobs
+        #Deployed folders with their sources:
+        #[(source, subfolder, link, kind)]
+        self.folders = {}
+        #Files to delete from deployed folders, relative to the folder
+        self.removals = {}
+
+    def add(self, source, folder, subfolder="", link=False, kind="files"):
+        """
+        Synchronise a source folder with a sub folder of
+        a deployed folder. With link, files are hard linked
+        instead of copied when possible. Copies are reported
+        as transfers of the given kind.
+        """
+        self.folders.setdefault(folder, []).append((source, subfolder,
+            link, kind))
+
+    def remove(self, folder, filename):
+        """
+        Delete a file of a deployed folder.
+        """
+        self.folders.setdefault(folder, [])
+        self.removals.setdefault(folder, []).append(
+                os.path.relpath(filename, folder))
+
+    def plan(self):
+        """
+        Find files to copy and delete, without writing anything.
+        Return a SyncReport of the planned transfer.
+        """
+        report = SyncReport()
+        for folder in sorted(self.folders):
+            report.merge(self._sync_folder(folder, folder, dry_run=True))
+        return report
+
+    def deploy(self):
+        """
+        Stage every modified folder, then swap them with
+        deployed folders.
+
+        Return a SyncReport, with paths of deployed files.
+        """
+        folders = sorted(self.folders)
+        with ThreadPoolExecutor(max(1, self.jobs)) as copier, \
+                ThreadPoolExecutor(max(1, min(self.jobs, len(folders)))) \
+                as executor:
+            futures = [executor.submit(self._prepare_folder, folder,
+                copier if self.jobs > 1 else None) for folder in folders]
+
+        #Nothing is swapped when a folder can't be staged
+        errors = [future.exception() for future in futures \
+                if future.exception() is not None]
+        if errors:
+            for future in futures:
+                if future.exception() is None and future.result()[1]:
+                    shutil.rmtree(future.result()[1], ignore_errors=True)
+            raise errors[0]
+
+        report = SyncReport()
+        for folder, future in zip(folders, futures):
+            folder_report, stage = future.result()
+            report.merge(folder_report)
+            if stage is not None:
+                self._swap_folder(stage, folder)
+        return report
+
+    def _prepare_folder(self, folder, copier=None):
+        """
+        Stage a deployed folder when it is modified, its
+        files being copied by copier threads when given.
+        Return (SyncReport of the folder, staging folder or None).
+        """
+        report = self._sync_folder(folder, folder, dry_run=True)
+        if not report.copied and not report.deleted:
+            return report, None
+
+        stage = self._stage_folder(folder)
+        try:
+            #Planned report, with the time spent copying
+            report.transfers = self._sync_folder(stage, folder,
+                    copier=copier).transfers
+        except BaseException:
+            shutil.rmtree(stage, ignore_errors=True)
+            raise
+        return report, stage
+
+    def _sync_folder(self, destination, folder, dry_run=False, copier=None):
+        """
+        Apply sources and removals of a deployed folder
+        to destination folder.
+        """
+        report = SyncReport()
+        #Sources of each sub folder, several sources share a sub folder
+        #when some files are generated from the export
+        subfolders = {}
+        for source, subfolder, link, kind in self.folders[folder]:
+            subfolders.setdefault(subfolder, []).append((source, link, kind))
+
+        for subfolder, sources in sorted(subfolders.items()):
+            destination_dir = os.path.join(destination, subfolder)
+            if len(sources) == 1:
+                source, link, kind = sources[0]
+                report.merge(sync_tree(source, destination_dir,
+                    self.delete, self.checksum, dry_run, link, copier, kind))
+                continue
+
+            kept_files, kept_dirs = set(), set()
+            for source, link, kind in sources:
+                report.merge(sync_tree(source, destination_dir, False,
+                    self.checksum, dry_run, link, copier, kind))
+                source_files, source_dirs = list_tree(source)
+                kept_files |= source_files
+                kept_dirs |= source_dirs
+            if self.delete:
+                report.deleted.extend(delete_extra_files(destination_dir,
+                    kept_files, kept_dirs, dry_run))
+
+        for relative_file in self.removals.get(folder, []):
+            filename = os.path.join(destination, relative_file)
+            if os.path.isfile(filename):
+                if not dry_run:
+                    os.unlink(filename)
+                report.deleted.append(filename)
+        return report
+
+    def _stage_folder(self, folder):
+        """
+        Create the staging folder of a deployed folder, holding
+        hard links of its current files.
+        """
+        parent, name = os.path.split(folder)
+        os.makedirs(parent, exist_ok=True)
+        stage = os.path.join(parent, self.STAGE_PREFIX + name)
+
+        #Left by an interrupted export
+        shutil.rmtree(stage, ignore_errors=True)
+        if os.path.isdir(folder):
+            shutil.copytree(folder, stage, symlinks=True,
+                    copy_function=link_file)
+        else:
+            os.mkdir(stage)
+        return stage
+
+    def _swap_folder(self, stage, folder):
+        """
+        Replace deployed folder with its staging folder.
+
+        Paths are exchanged at once when supported, otherwise the
+        deployed folder is missing between two renames.
+        """
+        if not os.path.lexists(folder):
+            os.rename(stage, folder)
+            return
+        if exchange_paths(stage, folder):
+            shutil.rmtree(stage)
+            return
+
+        parent, name = os.path.split(folder)
+        previous = os.path.join(parent, self.PREVIOUS_PREFIX + name)
+        shutil.rmtree(previous, ignore_errors=True)
+        os.rename(folder, previous)
+        os.rename(stage, folder)
+        shutil.rmtree(previous)
@@ -0,0 +1,133 @@
+from .live import ConvertedPages, RewrittenStylesheets, export_asset, \
+        list_assets
+from .tag_converter import ConversionError, find_format, find_parser
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.template import Origin, TemplateDoesNotExist, \
+        TemplateSyntaxError
+from django.template.loaders.base import Loader
+import os
+
+def find_export_dir(export_dir=None):
+    """
+    Export folder, given or from BSS_EXPORT_DIR setting.
+    """
+    export_dir = export_dir or getattr(settings, "BSS_EXPORT_DIR", None)
+    if not export_dir:
+        raise ImproperlyConfigured("BSS_EXPORT_DIR setting is required "
+                "to serve a Bootstrap Studio export")
+    return export_dir
+
+#Converted pages of each export folder and converter settings,
+#shared by loaders
+_pages = {}
+
+def converted_pages(export_dir, parser=None, output_format=None):
+    parser = find_parser(parser)
+    output_format = find_format(output_format or "preserve")
+    key = (os.path.realpath(export_dir), parser, output_format)
+    if key not in _pages:
+        _pages[key] = ConvertedPages(export_dir, parser=parser,
+                output_format=output_format)
+    return _pages[key]
+
+#Rewritten stylesheets of each export folder, shared by finders
+_stylesheets = {}
+
+def rewritten_stylesheets(export_dir):
+    export_dir = os.path.realpath(export_dir)
+    if export_dir not in _stylesheets:
+        _stylesheets[export_dir] = RewrittenStylesheets(export_dir)
+    return _stylesheets[export_dir]
+
+class ExportLoader(Loader):
+    """
+    Template loader reading pages of the export, converted
+    with the rules of the export script.
+
+    Template `home/index.html` is the page `home/index.html`
+    of the export. The export folder is BSS_EXPORT_DIR setting,
+    or an argument of the loader, followed by the parser and the
+    format of converted pages.
+    """
+    def __init__(self, engine, export_dir=None, parser=None,
+            output_format=None):
+        super().__init__(engine)
+        self.pages = converted_pages(find_export_dir(export_dir), parser,
+                output_format)
+
+    def get_dirs(self):
+        """
+        Watched by the development server, to reset
+        cached templates when a page changes.
+        """
+        return [self.pages.export_dir]
+
+    def get_template_sources(self, template_name):
+        filename = self.pages.page_file(template_name)
+        if filename is not None:
+            yield Origin(name=filename, template_name=template_name,
+                    loader=self)
+
+    def get_contents(self, origin):
+        try:
+            return self.pages.get(origin.template_name)
+        except FileNotFoundError:
+            raise TemplateDoesNotExist(origin)
+        except ConversionError as error:
+            raise TemplateSyntaxError(str(error))
+
+class ExportStorage(FileSystemStorage):
+    """
+    Storage of the export assets, by static names of
+    the django project. Stylesheets are read with their
+    url() rewritten for static names.
+    """
+    def __init__(self, export_dir):
+        super().__init__(location=export_dir)
+        self.stylesheets = rewritten_stylesheets(export_dir)
+
+    def asset_file(self, asset):
+        """
+        File served for an asset path of the export.
+        """
+        filename = super().path(asset)
+        if asset.endswith(".css") and os.path.isfile(filename):
+            return self.stylesheets.get(asset)
+        return filename
+
+    def path(self, name):
+        asset = export_asset(name.replace(os.sep, "/"))
+        if asset is None:
+            raise FileNotFoundError(name)
+        return self.asset_file(asset)
+
+class ExportFinder(BaseFinder):
+    """
+    Static files finder serving assets of the export, `home/js/app.js`
+    being the asset `assets/js/home/app.js` of the export. Urls of
+    stylesheets are rewritten like deployed stylesheets.
+    """
+    def __init__(self, app_names=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.export_dir = os.path.realpath(find_export_dir())
+        self.storage = ExportStorage(self.export_dir)
+
+    def find(self, path, find_all=False, **kwargs):
+        #Keyword was `all` before django 5.2
+        find_all = kwargs.get("all", find_all)
+        asset = export_asset(path.replace(os.sep, "/"))
+        filename = None if asset is None else \
+                os.path.join(self.export_dir, *asset.split("/"))
+        if filename is None or not os.path.isfile(filename):
+            return []
+        filename = self.storage.asset_file(asset)
+        return [filename] if find_all else filename
+
+    def list(self, ignore_patterns):
+        for static_name, asset in list_assets(self.export_dir):
+            if not matches_patterns(asset, ignore_patterns):
+                yield static_name, self.storage
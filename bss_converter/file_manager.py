@@ -1,10 +1,87 @@
 import glob
-from . import TagConverter
+from . import TagConverter, StreamConverter
+from .tag_converter import error_exit, find_parser, find_format, \
+        ConversionError
+from .manifest import Manifest, file_digest
+from .sync import SyncReport, copy_file, is_same_file, delete_extra_files, \
+        list_tree
+from .deploy import StagedDeployment
+from .metrics import Metrics, NullMetrics
+from .assets import AssetIndex, list_asset_types
+from .fingerprint import HashedAssets
+from .compress import Precompressor
+from .stylesheet import StylesheetRewriter
+from .layout import LayoutExtractor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import functools
+import fnmatch
+import cProfile
+import hashlib
+import shutil
+import time
 import os
 from pathlib import Path
-from distutils.dir_util import copy_tree
 from string import Template
 
+#Available conversion engines
+ENGINES = {
+    "tree": TagConverter,
+    "stream": StreamConverter,
+}
+
+#Stages writing the build folder skipped by plans, with their outputs
+UNPLANNED_STAGES = {
+    "extract_layout": "base templates and pages extending them",
+    "hash_assets": "hashed copies of assets and the list of their names",
+    "rewrite_css": "stylesheets with django urls",
+    "compress": "compressed variants of assets",
+}
+
+def profile_file(profile_dir, filename):
+    """
+    Path of the cProfile stats of an html file.
+    """
+    return os.path.join(profile_dir, filename.replace(os.sep, "__") + \
+            ".prof")
+
+def convert_file(filename, output, engine="tree", parser=None,
+        output_format=None, collect_metrics=False, profile_dir=None):
+    """
+    Convert a single html file with the given engine, writing
+    result in output file.
+
+    When enabled, stages of the conversion are timed, and cProfile
+    stats are written in profile_dir.
+
+    Run inside worker processes, errors are returned as message
+    instead of stopping the whole export.
+    Return (filename, error message or None, stages metrics,
+    static links of the file, True if copied without parsing).
+    """
+    metrics = Metrics() if collect_metrics else None
+    profiler = cProfile.Profile() if profile_dir else None
+    try:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        if profiler:
+            profiler.enable()
+        if engine == "stream":
+            converter = StreamConverter(filename, output, metrics)
+        else:
+            converter = TagConverter(filename, parser, output, metrics,
+                    output_format)
+    except ConversionError as error:
+        return filename, str(error), {}, [], False
+    except Exception as error:
+        return filename, f"{type(error).__name__}: {error}", {}, [], False
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_file(profile_dir, filename))
+
+    stages = metrics.files.get(filename, {}) if metrics else {}
+    return filename, None, stages, sorted(converter.static_links), \
+            converter.fast_path
+
 class FileManager:
     """
     Convert html file and move site assets according
@@ -16,22 +93,328 @@ class FileManager:
     Use convention of 'static' and 'templates' folders
     to store asset and html templates respectively.
     """
-    def __init__(self):
-        self.django_project = os.environ.get('DJANGO_PROJECT')
-        self._convert_html_file()
-        self.apps = self._retrieve_django_apps()
-        self._copy_to_django()
+    def __init__(self, parser=None, engine=None, jobs=None, build_dir=None,
+            delete=None, checksum=None, changed=None, metrics=None,
+            profile_dir=None, profile_count=5, output_format=None,
+            plan=False, hash_assets=None, compress=None,
+            compress_min_size=None, extract_layout=None, link_assets=None,
+            apps=None, pages=None):
+        start_time = time.perf_counter()
+        self.metrics = metrics or NullMetrics()
+        #Keep cProfile stats of the `profile_count` slowest files
+        self.profile_dir = profile_dir
+        self.profile_count = profile_count
+        if profile_dir and not self.metrics.enabled:
+            self.metrics = Metrics()
+
+        self.django_projects = self._find_projects()
+        self.parser = find_parser(parser)
+        self.engine = engine or os.environ.get('BSS_ENGINE') or "tree"
+        self.output_format = find_format(output_format)
+        self.jobs = self._count_jobs(jobs)
+        self.build_dir = self._find_build_dir(build_dir)
+        self.manifest = Manifest(self.build_dir,
+                f"{self.engine}:{self.parser}:{self.output_format}")
+        self.delete = self._enabled(delete, 'BSS_SYNC_DELETE')
+        self.checksum = self._enabled(checksum, 'BSS_SYNC_CHECKSUM')
+        self.hash_assets = self._enabled(hash_assets, 'BSS_HASH_ASSETS')
+        self.compress = self._enabled(compress, 'BSS_COMPRESS')
+        self.extract_layout = self._enabled(extract_layout,
+                'BSS_EXTRACT_LAYOUT')
+        self.compress_min_size = self._count_bytes(compress_min_size,
+                'BSS_COMPRESS_MIN_SIZE', 512)
+        self.link_assets = self._enabled(link_assets, 'BSS_LINK_ASSETS')
+        #Files of the export modified since last run, None if unknown
+        self.changed = None if changed is None else set(changed)
+        #Glob patterns of exported applications and html files,
+        #everything is exported without any pattern
+        self.app_patterns = list(apps or [])
+        self.page_patterns = list(pages or [])
+        #Only find the transfer plan, without writing anything
+        self.plan = plan
+        self.deployment = StagedDeployment(self.delete, self.checksum,
+                self.jobs)
+        #Assets with content hashed names, when enabled
+        self.hashed_assets = None
+
+        #Html files converted, unchanged since last export, removed
+        #from the export, and conversion error of each failing file
+        self.converted = []
+        self.skipped = []
+        self.removed_pages = []
+        self.errors = {}
+        #Outputs of removed html files
+        self.removed = []
+        #Stages whose outputs are not listed by the plan
+        self.unplanned = []
+        #Converted html files without anything to convert, only copied
+        self.fast_path = []
+        self.sync_report = SyncReport()
+        #Compressed variants of assets written during this export
+        self.compressed = []
+        #Stylesheets rewritten for the django layout during this export
+        self.rewritten_css = []
+        #Applications whose pages extend a generated base template
+        self.layout_apps = []
+        #Static links pointing to missing assets, with their html files
+        self.dangling_links = {}
+
+        self.htmlfiles = sorted(filename for filename in \
+                glob.glob("**/*.html", recursive=True) \
+                if os.path.isfile(filename))
+        #Folders of the export assets, as css, img, js or fonts
+        self.asset_types = list_asset_types()
+        with self.metrics.stage("discover_apps"):
+            self.apps = self._discover_apps()
+        with self.metrics.stage("convert"):
+            self._convert_html_file()
+        with self.metrics.stage("check_links"):
+            self._find_dangling_links()
+        with self.metrics.stage("copy") as stage:
+            self._copy_to_django()
+            stage["bytes"] = self.sync_report.bytes_copied
+        if not self.plan:
+            self.manifest.save()
+        self._count_files()
+        self.elapsed = time.perf_counter() - start_time
+
+    def _count_files(self):
+        """
+        Record number of processed files in metrics.
+        """
+        self.metrics.count("converted", len(self.converted))
+        self.metrics.count("fast_path", len(self.fast_path))
+        self.metrics.count("skipped", len(self.skipped))
+        self.metrics.count("removed", len(self.removed_pages))
+        self.metrics.count("failed", len(self.errors))
+        self.metrics.count("copied", len(self.sync_report.copied))
+        self.metrics.count("rewritten_css", len(self.rewritten_css))
+
+    @staticmethod
+    def _find_projects():
+        """
+        Django projects receiving the export, from DJANGO_PROJECT
+        environment variable holding one folder, or several separated
+        by ':' like PATH.
+        """
+        projects = []
+        for project in os.environ.get('DJANGO_PROJECT', "").split(
+                os.pathsep):
+            project = project.strip()
+            if project and project not in projects:
+                projects.append(project)
+        if not projects:
+            error_exit("DJANGO_PROJECT is not set")
+        return projects
+
+    def _find_build_dir(self, build_dir):
+        """
+        Folder storing converted html files and the manifest
+        of previous exports.
+
+        Use BSS_BUILD_DIR environment variable, or a cache folder
+        specific to the django projects.
+        """
+        build_dir = build_dir or os.environ.get('BSS_BUILD_DIR')
+        if build_dir:
+            return os.path.realpath(build_dir)
+
+        cache_dir = os.environ.get('XDG_CACHE_HOME') or \
+                os.path.join(os.path.expanduser("~"), ".cache")
+        projects_path = os.pathsep.join(os.path.realpath(project) for \
+                project in self.django_projects)
+        project_id = hashlib.sha1(projects_path.encode()).hexdigest()[:16]
+        #Real path, folders of the build are recognized by their prefix
+        return os.path.realpath(os.path.join(cache_dir, "bss_converter",
+            project_id))
+
+    def _build_file(self, filename):
+        """
+        Path of the converted html file in the build folder.
+        """
+        return os.path.join(self.build_dir, "html", filename)
+
+    def _template_files(self, filename):
+        """
+        Paths of the templates created in each django project
+        for an html file, none if it is outside any application.
+        """
+        parts = Path(filename).parts
+        if len(parts) < 2 or parts[0] == "assets":
+            return []
+        return [os.path.join(project, parts[0], "templates", *parts) for \
+                project in self.django_projects \
+                if parts[0] in self.apps[project]]
+
+    @staticmethod
+    def _enabled(option, variable):
+        """
+        Read a boolean option, from given value or from
+        an environment variable set to 1, yes or true.
+        """
+        if option is not None:
+            return option
+        value = os.environ.get(variable, "")
+        return value.strip().lower() in ["1", "yes", "true"]
+
+    @staticmethod
+    def _count_jobs(jobs):
+        """
+        Number of processes converting html files, BSS_JOBS
+        environment variable or number of cpus by default.
+        """
+        jobs = jobs or os.environ.get('BSS_JOBS') or os.cpu_count() or 1
+        try:
+            jobs = int(jobs)
+        except ValueError:
+            error_exit(f"invalid number of jobs '{jobs}'")
+        if jobs < 1:
+            error_exit(f"invalid number of jobs '{jobs}'")
+        return jobs
+
+    @staticmethod
+    def _count_bytes(size, variable, default):
+        """
+        Read a size in bytes, from given value or from
+        an environment variable.
+        """
+        if size is None:
+            size = os.environ.get(variable) or default
+        try:
+            size = int(size)
+        except ValueError:
+            error_exit(f"invalid size '{size}'")
+        if size < 0:
+            error_exit(f"invalid size '{size}'")
+        return size
 
     def _convert_html_file(self):
         """
         Retrieve recursively all html files in the export
         folder, and convert bss attributes to django tag
-        using TagConverter.
+        using TagConverter, inside the build folder.
+
+        Files unchanged since the last export are not converted
+        again. Outputs of files removed from the export are deleted.
+        In plan mode, files are only listed.
+
+        Files are shared between `jobs` processes. Errors are
+        collected for every file, and reported together once all
+        files are converted, before anything is copied.
         """
-        htmlfiles = glob.glob("**/*.html", recursive=True)
+        if self.engine not in ENGINES:
+            error_exit(f"unknown engine '{self.engine}', "
+                    f"choose from: {', '.join(ENGINES)}")
 
+        #Files outside of the selection are neither converted nor removed
+        sources = self.htmlfiles + [filename for filename in \
+                self.manifest.entries if not self._page_selected(filename)]
+        self.removed_pages = sorted(set(self.manifest.entries) - \
+                set(sources))
+        self.removed = self.manifest.remove_missing(sources)
+        self._remove_outputs(self.removed)
+        htmlfiles = [filename for filename in self.htmlfiles \
+                if self._page_selected(filename)]
+
+        #Keep only files modified since last export
+        digests = {}
+        with self.metrics.stage("hash") as stage:
+            for filename in htmlfiles:
+                if self.changed is not None and \
+                        filename not in self.changed and \
+                        filename in self.manifest.entries:
+                    self.skipped.append(filename)
+                    continue
+                digests[filename] = file_digest(filename)
+                stage["bytes"] += os.path.getsize(filename)
+                if self.manifest.is_converted(filename, digests[filename]):
+                    self.skipped.append(filename)
+        htmlfiles = [filename for filename in htmlfiles \
+                if filename not in self.skipped]
+        if self.plan:
+            self.converted = htmlfiles
+            return
+
+        outputs = [self._build_file(filename) for filename in htmlfiles]
+        if self.profile_dir:
+            Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+        converter = functools.partial(convert_file, engine=self.engine,
+                parser=self.parser, output_format=self.output_format,
+                collect_metrics=self.metrics.enabled,
+                profile_dir=self.profile_dir)
+
+        if self.jobs == 1 or len(htmlfiles) < 2:
+            results = map(converter, htmlfiles, outputs)
+        else:
+            jobs = min(self.jobs, len(htmlfiles))
+            chunksize = max(1, len(htmlfiles) // (jobs * 4))
+            with ProcessPoolExecutor(jobs) as executor:
+                results = list(executor.map(converter, htmlfiles, outputs,
+                    chunksize=chunksize))
+
+        for filename, error, stages, links, fast_path in results:
+            self.metrics.merge_file(filename, stages)
+            if error:
+                self.errors[filename] = error
+                self.manifest.discard(filename)
+            else:
+                self.converted.append(filename)
+                if fast_path:
+                    self.fast_path.append(filename)
+                self.manifest.update(filename, digests[filename],
+                    [self._build_file(filename)] + \
+                    self._template_files(filename), links)
+
+        if self.profile_dir:
+            self._keep_slowest_profiles(htmlfiles)
+
+        if self.errors:
+            error_list = "\n".join(f"  {filename}: {error}" for \
+                    filename, error in self.errors.items())
+            error_exit(f"{len(self.errors)} html file(s) can't be "
+                    f"converted, nothing copied:\n{error_list}")
+
+    def _remove_outputs(self, outputs):
+        """
+        Delete outputs of files removed from the export. Templates
+        of django projects are deleted with the deployment.
+        """
+        for output in outputs:
+            if output.startswith(os.path.join(self.build_dir, "")):
+                if not self.plan:
+                    os.unlink(output)
+                continue
+
+            #Templates of projects no longer deployed are kept
+            for project in self.django_projects:
+                project_dir = os.path.join(project, "")
+                if output.startswith(project_dir):
+                    #Deployed folder: <app>/templates/<app>
+                    relative_parts = Path(output[len(project_dir):]).parts
+                    folder = os.path.join(project, *relative_parts[:3])
+                    self.deployment.remove(folder, output)
+
+    def _find_dangling_links(self):
+        """
+        Check static links of every html file, converted during this
+        export or a previous one, against an index of the assets.
+        """
+        assets = AssetIndex()
+        for filename, entry in sorted(self.manifest.entries.items()):
+            for link in assets.missing_links(entry.get("links", [])):
+                self.dangling_links.setdefault(link, []).append(filename)
+
+    def _keep_slowest_profiles(self, htmlfiles):
+        """
+        Remove cProfile stats of all converted files, except
+        the slowest ones.
+        """
+        slowest = self.metrics.slowest_files(self.profile_count)
         for filename in htmlfiles:
-            TagConverter(filename)
+            if filename not in slowest:
+                stats_file = profile_file(self.profile_dir, filename)
+                if os.path.exists(stats_file):
+                    os.unlink(stats_file)
 
     def _retrieve_folders(self, directory, black_listed=[]):
         """
@@ -50,14 +433,59 @@ class FileManager:
                 filename in ls_result]
         return list(filter(os.path.isdir, absolute_ls))
 
-    def _retrieve_django_apps(self):
+    def _discover_apps(self):
+        """
+        Find applications of every django project, projects
+        being read at the same time.
+
+        Return a dict mapping each project to its applications.
+        """
+        with ThreadPoolExecutor(len(self.django_projects)) as executor:
+            return dict(zip(self.django_projects, executor.map(
+                self._retrieve_django_apps, self.django_projects)))
+
+    @staticmethod
+    def _matches(name, patterns):
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+    def _page_selected(self, filename):
+        """
+        Check if an html file of the export is selected by
+        page and application patterns.
+        """
+        if self.page_patterns and \
+                not self._matches(filename, self.page_patterns):
+            return False
+        return not self.app_patterns or \
+                self._matches(Path(filename).parts[0], self.app_patterns)
+
+    def _app_selected(self, app):
+        """
+        Check if an application is exported, matching application
+        patterns or holding a selected html file.
+        """
+        if self.app_patterns:
+            return self._matches(app, self.app_patterns)
+        if self.page_patterns:
+            return any(Path(filename).parts[0] == app and \
+                    self._page_selected(filename) for filename \
+                    in self.htmlfiles)
+        return True
+
+    def _all_apps(self):
+        """
+        Applications of at least one django project.
+        """
+        return sorted(set().union(*self.apps.values()))
+
+    def _retrieve_django_apps(self, django_project):
         """
         Find all available django app/modules in the
         project directory.
 
         Remove settings folder of the project.
         """
-        project_dirs = self._retrieve_folders(self.django_project)
+        project_dirs = self._retrieve_folders(django_project)
 
         #Find and remove configuration folder
         setting_folder = None
@@ -68,13 +496,15 @@ class FileManager:
                 break
         project_dirs.remove(setting_folder)
 
-        #Remove folder path of django project to keep only app names
-        return list(map(os.path.basename, project_dirs))
+        #Remove folder path of django project to keep only app names,
+        #and applications outside of the selection
+        return [app for app in map(os.path.basename, project_dirs) \
+                if self._app_selected(app)]
 
-    def _diff_applications(self, folders):
+    def _diff_applications(self, folders, apps):
         """
-        Compare a list of folder with application of the
-        django project.
+        Compare a list of folder with applications
+        of a django project.
 
         Store applications folder in a specific list.
         """
@@ -91,7 +521,7 @@ class FileManager:
             app_to_folder[app] = folder
 
         #Find folder who are matchin existing apps
-        for application in self.apps:
+        for application in apps:
             bss_folder = app_to_folder.pop(application, None)
             if bss_folder:
                 diff_res["applications"].append(bss_folder)
@@ -101,31 +531,189 @@ class FileManager:
 
         return diff_res
 
-    def _move_bss_dir(self, bss_folder, app_dest_folder, black_list=[]):
+    def _move_bss_dir(self, bss_folder, app_dest_folder, black_list=[],
+            link=False, kind="files"):
         """
         Move bss folder of a specific file type (js, html, css, etc.)
-        from the export directory to django project folder.
+        from the export directory to django project folders.
 
         Move them in custom directory within the corresponding
-        application.
+        application, deployed as part of `templates/<app>` or
+        `static/<app>` folder. Only new or modified files are copied,
+        or hard linked with link, and reported as `kind` transfers.
         """
-        if not os.path.isdir(bss_folder):
+        if not os.path.isdir(bss_folder) or \
+                not self._is_modified(bss_folder):
             return
         app_dest_template = Template(app_dest_folder)
         bss_folders = self._retrieve_folders(bss_folder, black_list)
-        organized_folder = self._diff_applications(bss_folders)
 
-        for bss_app_folder in organized_folder['applications']:
-            app_name = os.path.basename(bss_app_folder)
+        for django_project in self.django_projects:
+            organized_folder = self._diff_applications(bss_folders,
+                    self.apps[django_project])
+
+            for bss_app_folder in organized_folder['applications']:
+                app_name = os.path.basename(bss_app_folder)
+
+                #Find app folder in django project, split in deployed
+                #folder and its sub folder
+                app_dest_parts = Path(app_dest_template.substitute(
+                    app_name=app_name)).parts
+                deployed_folder = os.path.join(django_project, app_name,
+                        *app_dest_parts[:2])
+                subfolder = os.path.join("", *app_dest_parts[2:])
+
+                self.deployment.add(bss_app_folder, deployed_folder,
+                        subfolder, link, kind)
+
+    def _hash_assets(self, source_dir, templates_dir):
+        """
+        Give assets names holding a hash of their content, and
+        write templates of source folder with static links using
+        these names.
+
+        Only templates modified since they were written, or linking
+        an asset whose hashed name changed, are written again. The
+        list of hashed names is copied in django project folders.
+        """
+        self.hashed_assets = HashedAssets(self.build_dir, self.asset_types)
+        self.hashed_assets.build()
+
+        source_files = list_tree(source_dir)[0] \
+                if os.path.isdir(source_dir) else set()
+        for filename in source_files:
+            source = os.path.join(source_dir, filename)
+            template = os.path.join(templates_dir, filename)
+            #Links of generated templates are unknown
+            entry = self.manifest.entries.get(filename)
+            if entry is None:
+                links_changed = bool(self.hashed_assets.changed)
+            else:
+                links_changed = bool(self.hashed_assets.changed & \
+                        {TagConverter._convert_bss_link(link) for link in \
+                            entry.get("links", [])})
+            if links_changed or not os.path.isfile(template) or \
+                    os.stat(source).st_mtime_ns >= \
+                    os.stat(template).st_mtime_ns:
+                self.hashed_assets.rewrite_template(source, template)
+        if os.path.isdir(templates_dir):
+            delete_extra_files(templates_dir, source_files)
+
+        for django_project in self.django_projects:
+            manifest_file = os.path.join(django_project,
+                    HashedAssets.MANIFEST)
+            if not is_same_file(self.hashed_assets.manifest_file,
+                    manifest_file, checksum=True):
+                copy_file(self.hashed_assets.manifest_file, manifest_file)
 
-            #Find app folder in django project
-            django_app_folder = os.path.join(self.django_project, \
-                    app_name)
-            django_app_folder = os.path.join(django_app_folder, \
-                app_dest_template.substitute(app_name=app_name))
+    def _extract_layouts(self, source_dir, layout_dir):
+        """
+        Write templates of each application in layout folder, pages
+        sharing their layout extending a generated base template.
+
+        Applications are analysed again only when one of their
+        pages changed, files are written only when modified.
+        """
+        for app in self._all_apps():
+            app_source = os.path.join(source_dir, app)
+            app_layout = os.path.join(layout_dir, app)
+            if not os.path.isdir(app_source):
+                continue
+            if os.path.isdir(app_layout) and not self._app_modified(app):
+                if os.path.isfile(os.path.join(app_layout,
+                        LayoutExtractor.BASE_TEMPLATE)):
+                    self.layout_apps.append(app)
+                continue
+
+            pages = {}
+            for filename in sorted(list_tree(app_source)[0]):
+                with open(os.path.join(app_source, filename)) as page_stream:
+                    pages[filename] = page_stream.read()
+            templates = LayoutExtractor(app, pages).extract()
+            if templates is None:
+                templates = pages
+            else:
+                self.layout_apps.append(app)
+
+            for filename, content in templates.items():
+                self._write_template(os.path.join(app_layout, filename),
+                        content)
+            delete_extra_files(app_layout, set(templates))
+
+    def _app_modified(self, app):
+        """
+        Check if a page of an application was converted or
+        removed during this export.
+        """
+        app_dir = os.path.join(self.build_dir, "html", app, "")
+        return any(Path(filename).parts[0] == app for filename \
+                in self.converted) or \
+                any(output.startswith(app_dir) for output in self.removed)
 
-            Path(django_app_folder).mkdir(parents=True)
-            copy_tree(bss_app_folder, django_app_folder)
+    @staticmethod
+    def _write_template(filename, content):
+        """
+        Write a template, unless it already has this content.
+        """
+        if os.path.isfile(filename):
+            with open(filename) as template_stream:
+                if template_stream.read() == content:
+                    return
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "w") as template_stream:
+            template_stream.write(content)
+
+    def _rewrite_stylesheets(self, source_dir, css_dir):
+        """
+        Write stylesheets of source folder in css folder, with
+        url() pointing to assets deployed in django projects.
+        """
+        rewriter = StylesheetRewriter()
+        if os.path.isdir(source_dir):
+            rewriter.rewrite_tree(source_dir, css_dir)
+        elif os.path.isdir(css_dir):
+            shutil.rmtree(css_dir)
+        self.rewritten_css = rewriter.rewritten
+
+    def _compress_assets(self, asset_dirs):
+        """
+        Write gzip and brotli variants of text assets in
+        the build folder, shared between `jobs` processes.
+        """
+        for asset_type, asset_dir in asset_dirs.items():
+            compressor = Precompressor(os.path.join(self.build_dir,
+                "compressed", asset_type), self.compress_min_size,
+                self.jobs)
+            compressor.compress(asset_dir)
+            self.compressed.extend(compressor.compressed)
+
+    def _is_modified(self, bss_folder):
+        """
+        Check if files of a folder may have changed since last run.
+        """
+        if self.changed is None or self.delete:
+            return True
+        real_folder = os.path.realpath(bss_folder)
+        if os.path.commonpath([real_folder, self.build_dir]) == \
+                self.build_dir:
+            relative_parts = Path(os.path.relpath(real_folder,
+                self.build_dir)).parts
+            hashes_changed = bool(self.hashed_assets and \
+                    self.hashed_assets.changed)
+            if relative_parts[0] in ["html", "layout"]:
+                return bool(self.converted or self.removed)
+            if relative_parts[0] == "templates":
+                return bool(self.converted or self.removed or hashes_changed)
+            if hashes_changed:
+                return True
+            #Hashed, compressed or rewritten copy of an export folder
+            if relative_parts[0] == "css":
+                bss_folder = os.path.join("assets", *relative_parts)
+            else:
+                bss_folder = os.path.join("assets", *relative_parts[1:])
+
+        prefix = os.path.normpath(bss_folder) + os.sep
+        return any(filename.startswith(prefix) for filename in self.changed)
 
     def _copy_to_django(self):
         """
@@ -135,8 +723,71 @@ class FileManager:
         Respect django architecture, placing file inside application.
         Boostrap studio file system must match django architecture,
         with already created apps.
+
+        Modified folders are staged then swapped in, in plan mode
+        the transfer is only planned.
         """
-        self._move_bss_dir(".", "templates/${app_name}", ["assets"])
-        self._move_bss_dir("assets/css", "static/${app_name}/css")
-        self._move_bss_dir("assets/img", "static/${app_name}/img")
-        self._move_bss_dir("assets/js", "static/${app_name}/js")
+        html_dir = os.path.join(self.build_dir, "html")
+        if self.extract_layout:
+            layout_dir = os.path.join(self.build_dir, "layout")
+            if not self.plan:
+                with self.metrics.stage("extract_layout"):
+                    self._extract_layouts(html_dir, layout_dir)
+            html_dir = layout_dir
+
+        assets_dir = "assets"
+        if self.hash_assets:
+            templates_dir = os.path.join(self.build_dir, "templates")
+            assets_dir = os.path.join(self.build_dir, "assets")
+            if not self.plan:
+                with self.metrics.stage("hash_assets"):
+                    self._hash_assets(html_dir, templates_dir)
+            html_dir = templates_dir
+        #Folder of each asset type, stylesheets being rewritten
+        #in the build folder for the django layout
+        asset_dirs = {asset_type: os.path.join(assets_dir, asset_type) \
+                for asset_type in self.asset_types}
+        css_dir = os.path.join(self.build_dir, "css")
+        if not self.plan:
+            with self.metrics.stage("rewrite_css"):
+                self._rewrite_stylesheets(os.path.join(assets_dir, "css"),
+                        css_dir)
+        #Planned from the export until stylesheets are rewritten once
+        if "css" in asset_dirs and (not self.plan or os.path.isdir(css_dir)):
+            asset_dirs["css"] = css_dir
+        if self.compress and not self.plan:
+            with self.metrics.stage("compress"):
+                self._compress_assets(asset_dirs)
+
+        self._move_bss_dir(html_dir, "templates/${app_name}", ["assets"],
+                kind="templates")
+        for asset_type, asset_dir in asset_dirs.items():
+            self._move_bss_dir(asset_dir, f"static/${{app_name}}/{asset_type}",
+                    link=self.link_assets, kind=asset_type)
+        if self.compress:
+            compressed_dir = os.path.join(self.build_dir, "compressed")
+            for asset_type in asset_dirs:
+                self._move_bss_dir(os.path.join(compressed_dir, asset_type),
+                        f"static/${{app_name}}/{asset_type}",
+                        link=self.link_assets, kind=asset_type)
+
+        if not self.plan:
+            self.sync_report.merge(self.deployment.deploy())
+            for kind, transfer in self.sync_report.transfers.items():
+                self.metrics.add(f"copy_{kind}", transfer["seconds"],
+                        transfer["bytes"])
+            return
+
+        #Copies are planned from outputs of the previous export
+        self.unplanned = [stage for stage, enabled in [
+            ("extract_layout", self.extract_layout),
+            ("hash_assets", self.hash_assets),
+            ("rewrite_css", "css" in asset_dirs),
+            ("compress", self.compress)] if enabled]
+
+        self.sync_report.merge(self.deployment.plan())
+        #Templates of html files still to convert
+        for filename in self.converted:
+            for template in self._template_files(filename):
+                if template not in self.sync_report.copied:
+                    self.sync_report.copied.append(template)
@@ -0,0 +1,201 @@
+from .tag_converter import TagConverter
+from .sync import is_same_file, delete_extra_files
+from .deploy import link_file
+from .json_file import load_json, save_json
+from .stylesheet import resolve_url
+import posixpath
+import hashlib
+import re
+import os
+
+class HashedAssets:
+    """
+    Copy of the export assets in the build folder, where each file
+    also gets a name holding a hash of its content, as `x.css`
+    and `x.55e7cbb9ba48.css`.
+
+    Hashed names are used to rewrite static links of converted
+    templates, and url of css files pointing to other assets. They
+    are listed in a `staticfiles.json` file, in the format of django
+    ManifestStaticFilesStorage manifests, as a record of the export:
+    django doesn't read it, templates already link hashed names.
+    """
+    MANIFEST = "staticfiles.json"
+    MANIFEST_VERSION = "1.0"
+    #Digests of assets by file size and modification time
+    CACHE = "asset_hashes.json"
+    HASH_LENGTH = 12
+
+    STATIC_TAG = re.compile(r"""\{% static (['"])(.*?)\1 %\}""")
+
+    def __init__(self, build_dir, asset_types=("css", "img", "js")):
+        self.directory = os.path.join(build_dir, "assets")
+        self.manifest_file = os.path.join(build_dir, self.MANIFEST)
+        self.cache_file = os.path.join(build_dir, self.CACHE)
+        self.asset_types = asset_types
+        #Hashed static names of previous and current export
+        self.previous = load_json(self.manifest_file) \
+                .get("paths", {})
+        self.paths = {}
+        #Static names whose hashed name changed since previous export
+        self.changed = set()
+
+    def build(self):
+        """
+        Link every asset of the export in the build folder, with
+        its hashed name, and write the manifest.
+
+        Css files are handled last, once the hashed name of assets
+        they point to is known. Hashed files of previous exports
+        are removed.
+        """
+        cache = load_json(self.cache_file)
+        #Export path of each asset mapped to its hashed export path
+        hashed_files = {}
+        css_files = []
+
+        for filename in self._list_assets():
+            if filename.endswith(".css"):
+                css_files.append(filename)
+                continue
+            digest = self._file_digest(filename, cache)
+            hashed_files[filename] = self._hashed_name(filename, digest)
+            self._link(filename, filename)
+            self._link(filename, hashed_files[filename])
+
+        for filename in css_files:
+            with open(filename) as css_stream:
+                content = self._rewrite_css(css_stream.read(), filename,
+                        hashed_files)
+            digest = hashlib.md5(content.encode()).hexdigest()
+            hashed_files[filename] = self._hashed_name(filename, digest)
+            self._write(content, hashed_files[filename])
+            self._link(filename, filename)
+
+        for filename, hashed_filename in hashed_files.items():
+            static_name = TagConverter._convert_bss_link(filename)
+            if static_name is not None:
+                self.paths[static_name] = \
+                        TagConverter._convert_bss_link(hashed_filename)
+
+        kept_files = {os.path.relpath(self._build_path(filename),
+            self.directory) for filename in \
+                    list(hashed_files) + list(hashed_files.values())}
+        delete_extra_files(self.directory, kept_files)
+
+        self.changed = {name for name in self.paths.keys() | \
+                self.previous.keys() if \
+                self.paths.get(name) != self.previous.get(name)}
+        save_json(self.cache_file, cache)
+        save_json(self.manifest_file, {"paths": self.paths,
+            "version": self.MANIFEST_VERSION})
+
+    def _list_assets(self):
+        """
+        List asset files of the export, as paths using '/'.
+        """
+        assets = []
+        for asset_type in self.asset_types:
+            for directory, subdirs, filenames in os.walk(
+                    os.path.join("assets", asset_type)):
+                subdirs.sort()
+                assets.extend(os.path.join(directory, filename) \
+                        .replace(os.sep, "/") for filename in \
+                        sorted(filenames))
+        return assets
+
+    @staticmethod
+    def _file_digest(filename, cache):
+        """
+        Md5 of a file content, reused from cache while its
+        size and modification time are unchanged.
+        """
+        stat = os.stat(filename)
+        cached = cache.get(filename)
+        if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+
+        digest = hashlib.md5()
+        with open(filename, "rb") as file_stream:
+            for block in iter(lambda: file_stream.read(64 * 1024), b""):
+                digest.update(block)
+        cache[filename] = [stat.st_size, stat.st_mtime_ns,
+                digest.hexdigest()]
+        return cache[filename][2]
+
+    @classmethod
+    def _hashed_name(cls, filename, digest):
+        """
+        Insert hash in a file name, before its extension.
+        """
+        root, extension = posixpath.splitext(filename)
+        return f"{root}.{digest[:cls.HASH_LENGTH]}{extension}"
+
+    def _build_path(self, filename):
+        return os.path.join(os.path.dirname(self.directory), filename)
+
+    def _link(self, source, filename):
+        """
+        Link an export file in the build folder, unless already
+        up to date.
+        """
+        destination = self._build_path(filename)
+        if is_same_file(source, destination):
+            return
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.lexists(destination):
+            os.unlink(destination)
+        link_file(source, destination)
+
+    def _write(self, content, filename):
+        """
+        Write an hashed file, never modified once written as
+        its name depends on its content.
+        """
+        destination = self._build_path(filename)
+        if os.path.isfile(destination):
+            return
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, "w") as file_stream:
+            file_stream.write(content)
+
+    @staticmethod
+    def _rewrite_css(css, filename, hashed_files):
+        """
+        Replace url() of a css file pointing to other assets
+        with their hashed name.
+        """
+        css_dir = posixpath.dirname(filename)
+        def replace_link(match):
+            quote, url = match.group(1), match.group(2)
+            resolved = resolve_url(url, filename)
+            if resolved is None or resolved[0] not in hashed_files:
+                return match.group(0)
+
+            target, suffix = resolved
+
+            hashed_url = posixpath.relpath(hashed_files[target], css_dir)
+            return f"url({quote}{hashed_url}{suffix}{quote})"
+        return TagConverter.CSS_URL.sub(replace_link, css)
+
+    def rewrite_template(self, source, destination):
+        """
+        Write a converted template with static links using
+        hashed names.
+        """
+        with open(source) as template_stream:
+            content = template_stream.read()
+
+        def replace_link(match):
+            quote, name = match.group(1), match.group(2)
+            hashed_name = self.paths.get(name)
+            if hashed_name is None:
+                return match.group(0)
+            return f"{{% static {quote}{hashed_name}{quote} %}}"
+        content = self.STATIC_TAG.sub(replace_link, content)
+
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp_filename = destination + ".tmp"
+        with open(tmp_filename, "w") as template_stream:
+            template_stream.write(content)
+        os.replace(tmp_filename, destination)
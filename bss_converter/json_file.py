@@ -0,0 +1,24 @@
+import json
+import os
+
+def load_json(filename):
+    """
+    Content of a json file of the build folder, empty when the
+    file is missing or unreadable.
+    """
+    try:
+        with open(filename) as json_stream:
+            return json.load(json_stream)
+    except (OSError, ValueError):
+        return {}
+
+def save_json(filename, content):
+    """
+    Write a json file of the build folder, replacing previous
+    file at once.
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w") as json_stream:
+        json.dump(content, json_stream, indent=1, sort_keys=True)
+    os.replace(tmp_filename, filename)
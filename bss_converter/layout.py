@@ -0,0 +1,253 @@
+from html.parser import HTMLParser
+from .stream_converter import StreamConverter
+from .tag_converter import TagConverter
+import re
+
+class DocumentParts(HTMLParser):
+    """
+    Locate `<head>` and `<body>` of a converted template, with
+    the position of each of their child nodes.
+
+    Positions are offsets in the template text, the template
+    itself is never modified.
+    """
+    CONTAINERS = ["head", "body"]
+    TEMPLATE_TAG = re.compile(r"\{%")
+
+    def __init__(self, content):
+        super().__init__(convert_charrefs=False)
+        self.content = content
+        #Offset of each line start, to convert parser positions
+        self.line_offsets = [0]
+        for line in content.splitlines(keepends=True):
+            self.line_offsets.append(self.line_offsets[-1] + len(line))
+
+        self.stack = []
+        #Container name: [end of open tag, start of close tag]
+        self.bounds = {}
+        #Container name: start offset of each child node
+        self.children = {name: [] for name in self.CONTAINERS}
+
+        self.feed(content)
+        self.close()
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def _add_child(self, offsets=(0,)):
+        if self.stack and self.stack[-1] in self.CONTAINERS:
+            start = self._offset()
+            self.children[self.stack[-1]].extend(start + offset \
+                    for offset in offsets)
+
+    def handle_starttag(self, tag, attrs):
+        self._add_child()
+        if tag in self.CONTAINERS and tag not in self.bounds:
+            self.bounds[tag] = [self._offset() + \
+                    len(self.get_starttag_text()), None]
+        if tag not in StreamConverter.VOID_TAG:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._add_child()
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack.pop() != tag:
+            pass
+        if tag in self.CONTAINERS and tag in self.bounds:
+            self.bounds[tag][1] = self._offset()
+
+    def handle_data(self, data):
+        """
+        Text is cut before each template tag, to share tags
+        around a page specific element.
+        """
+        if not data.strip():
+            return
+        offsets = [len(data) - len(data.lstrip())]
+        offsets += [match.start() for match in self.TEMPLATE_TAG.finditer(
+            data) if match.start() > offsets[0]]
+        self._add_child(offsets)
+
+    def handle_comment(self, data):
+        self._add_child()
+
+    def is_document(self):
+        """
+        Check if the template is a full document, with
+        both containers opened and closed.
+        """
+        for name in self.CONTAINERS:
+            if name not in self.bounds or self.bounds[name][1] is None:
+                return False
+        return self.bounds["head"][1] <= self.bounds["body"][0]
+
+    def split(self):
+        """
+        Cut the template in parts: text around containers, and
+        child nodes of each container with their trailing spaces.
+
+        Return (outer texts, {container: [child texts]}), outer texts
+        being before head content, between head and body contents,
+        and after body content.
+        """
+        head_start, head_end = self.bounds["head"]
+        body_start, body_end = self.bounds["body"]
+        outer = [self.content[:head_start],
+                self.content[head_end:body_start], self.content[body_end:]]
+
+        children = {}
+        for name in self.CONTAINERS:
+            start, end = self.bounds[name]
+            offsets = [offset for offset in self.children[name] \
+                    if start <= offset < end]
+            children[name] = [self.content[start:offsets[0] if offsets \
+                    else end]]
+            children[name] += [self.content[offset:next_offset] for \
+                    offset, next_offset in zip(offsets, offsets[1:] + [end])]
+        return outer, children
+
+class LayoutExtractor:
+    """
+    Factor markup shared by every page of an application, as
+    `<head>` content, navbar or footer, in a generated base template.
+
+    Children of `<head>` and `<body>` identical at the start and at
+    the end of all pages go to the base template, around a block
+    receiving the content specific to each page. Pages are rewritten
+    to extend the base template.
+    """
+    BASE_TEMPLATE = "base.html"
+    BLOCKS = {"head": "bss_head", "body": "bss_content"}
+
+    LOAD_TAG = re.compile(r"\{%\s*load\s[^%]*%\}")
+    TEMPLATE_TAG = re.compile(r"\{%\s*(end)?(\w+)")
+    #Template tags with a closing tag, can't be cut by a block: tags
+    #written by the converter, and other django tags of the pages
+    ENCLOSING_TAGS = frozenset(TagConverter.ENCLOSED_TAG + \
+            [TagConverter.CACHE_TAG] + ["with", "ifchanged", "spaceless",
+                "autoescape", "filter", "comment", "verbatim"])
+
+    def __init__(self, app, pages):
+        """
+        Pages map template names, relative to the application
+        templates folder, to converted templates content.
+        """
+        self.app = app
+        self.pages = pages
+
+    def extract(self):
+        """
+        Return templates rewritten with the base template, or None
+        when pages share no layout.
+        """
+        if self.BASE_TEMPLATE in self.pages or len(self.pages) < 2 or \
+                any("{% extends" in content for content in \
+                    self.pages.values()):
+            return None
+
+        documents = {}
+        for name, content in self.pages.items():
+            parts = DocumentParts(content)
+            if not parts.is_document():
+                return None
+            documents[name] = parts.split()
+
+        names = sorted(documents)
+        outers = [documents[name][0] for name in names]
+        if any(self._strip(outer) != self._strip(outers[0]) \
+                for outer in outers):
+            return None
+
+        #Number of shared children at start and end of each container
+        shared = {}
+        for container in self.BLOCKS:
+            children = [documents[name][1][container] for name in names]
+            shared[container] = self._shared_children(children)
+        if not any(start > 1 or end for start, end in shared.values()):
+            return None
+
+        templates = {self.BASE_TEMPLATE: self._base_template(
+            documents[names[0]], shared)}
+        for name in names:
+            templates[name] = self._child_template(name, documents[name],
+                    shared)
+        return templates
+
+    @staticmethod
+    def _strip(texts):
+        return [text.strip() for text in texts]
+
+    def _depth(self, texts):
+        """
+        Number of template tags left open by the given texts.
+        """
+        depth = 0
+        for text in texts:
+            for match in self.TEMPLATE_TAG.finditer(text):
+                if match.group(2) in self.ENCLOSING_TAGS:
+                    depth += -1 if match.group(1) else 1
+        return depth
+
+    def _shared_children(self, children):
+        """
+        Count children identical in all pages at the start and
+        at the end of a container, without cutting a template tag.
+
+        First child is the text before any node, always shared.
+        """
+        stripped = [self._strip(page_children) for page_children \
+                in children]
+        size = min(len(page_children) for page_children in stripped)
+
+        start = 1
+        while start < size and all(page_children[start] == \
+                stripped[0][start] for page_children in stripped):
+            start += 1
+        end = 0
+        while end < size - start and all(page_children[-end - 1] == \
+                stripped[0][-end - 1] for page_children in stripped):
+            end += 1
+
+        while start > 1 and self._depth(children[0][:start]):
+            start -= 1
+        while end and self._depth(children[0][len(children[0]) - end:]):
+            end -= 1
+        return start, end
+
+    def _base_template(self, document, shared):
+        outer, children = document
+        content = [outer[0]]
+        for index, container in enumerate(self.BLOCKS):
+            start, end = shared[container]
+            page_children = children[container]
+            content += page_children[:start]
+            content.append(f"{{% block {self.BLOCKS[container]} %}}"
+                    "{% endblock %}")
+            #Keep spacing following the page specific content
+            middle = "".join(page_children[start:len(page_children) - end])
+            content.append(middle[len(middle.rstrip()):])
+            content += page_children[len(page_children) - end:]
+            content.append(outer[index + 1])
+        return "".join(content)
+
+    def _child_template(self, name, document, shared):
+        outer, children = document
+        content = [f'{{% extends "{self.app}/{self.BASE_TEMPLATE}" %}}\n']
+        #Libraries loaded by the page are not inherited from the base
+        loads = []
+        for load_tag in self.LOAD_TAG.findall(self.pages[name]):
+            if load_tag not in loads:
+                loads.append(load_tag)
+        content += [load_tag + "\n" for load_tag in loads]
+
+        for container, block in self.BLOCKS.items():
+            start, end = shared[container]
+            page_children = children[container]
+            middle = "".join(page_children[start:len(page_children) - end])
+            content.append(f"{{% block {block} %}}{middle.rstrip()}"
+                    "{% endblock %}\n")
+        return "".join(content)
@@ -0,0 +1,140 @@
+from .tag_converter import TagConverter
+from .assets import list_asset_types
+from .stylesheet import StylesheetRewriter
+from collections import OrderedDict
+from pathlib import PurePosixPath
+import threading
+import tempfile
+import os
+
+def export_asset(static_name):
+    """
+    Path of an asset in the export, relative to the export folder,
+    for a static name of the django project.
+
+    Reverse of TagConverter._convert_bss_link: `home/js/app.js`
+    is exported as `assets/js/home/app.js`. Return None for names
+    outside of any application asset folder.
+    """
+    path = PurePosixPath(static_name)
+    if path.is_absolute() or ".." in path.parts or len(path.parts) < 3:
+        return None
+    app_name, file_type = path.parts[:2]
+    return str(PurePosixPath("assets", file_type, app_name,
+        *path.parts[2:]))
+
+def list_assets(export_dir):
+    """
+    List assets of an export, as (static name, path relative
+    to the export folder).
+    """
+    for file_type in list_asset_types(os.path.join(export_dir, "assets")):
+        type_dir = os.path.join(export_dir, "assets", file_type)
+        for directory, subdirs, filenames in os.walk(type_dir):
+            subdirs.sort()
+            for filename in sorted(filenames):
+                relative_file = os.path.relpath(os.path.join(directory,
+                    filename), export_dir).replace(os.sep, "/")
+                static_name = TagConverter._convert_bss_link(relative_file)
+                if static_name is not None:
+                    yield static_name.replace(os.sep, "/"), relative_file
+
+class ConvertedPages:
+    """
+    Pages of an export converted on demand, read in place
+    from the export folder.
+
+    Converted templates are kept in a LRU cache of `size` pages,
+    a page is converted again when its modification time or size
+    changed. Pages are converted one at a time, the cache can be
+    shared by threads.
+    """
+    def __init__(self, export_dir, parser=None, size=256,
+            output_format="preserve"):
+        self.export_dir = os.path.realpath(export_dir)
+        self.size = size
+        self.converter = TagConverter(parser=parser,
+                output_format=output_format)
+        #Page path: ((modification time, size), converted template)
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def page_file(self, template_name):
+        """
+        Path of the page of a template name, as `<app>/page.html`.
+        Return None for names outside of any application folder.
+        """
+        path = PurePosixPath(template_name)
+        if path.is_absolute() or ".." in path.parts or \
+                len(path.parts) < 2 or path.parts[0] == "assets":
+            return None
+        return os.path.join(self.export_dir, *path.parts)
+
+    def get(self, template_name):
+        """
+        Return converted template of a page.
+
+        Raise FileNotFoundError when the page doesn't exist, and
+        ConversionError when it can't be converted.
+        """
+        filename = self.page_file(template_name)
+        if filename is None:
+            raise FileNotFoundError(template_name)
+        stat = os.stat(filename)
+        state = (stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            cached = self.pages.get(filename)
+            if cached is not None and cached[0] == state:
+                self.pages.move_to_end(filename)
+                return cached[1]
+
+            with open(filename) as page_stream:
+                content = self.converter.convert_string(page_stream.read(),
+                        filename)
+            self.pages[filename] = (state, content)
+            self.pages.move_to_end(filename)
+            while len(self.pages) > self.size:
+                self.pages.popitem(last=False)
+        return content
+
+class RewrittenStylesheets:
+    """
+    Stylesheets of an export with their url() rewritten for static
+    names of the django project, like stylesheets of the export
+    script, written on demand in a temporary folder.
+
+    A stylesheet is rewritten again when its modification time or
+    size changed, stylesheets without any link to rewrite are read
+    in place from the export folder.
+    """
+    def __init__(self, export_dir):
+        self.export_dir = os.path.realpath(export_dir)
+        self.rewriter = StylesheetRewriter()
+        self._tmp_dir = tempfile.TemporaryDirectory(prefix="bss_css_")
+        #Asset: ((modification time, size), served file)
+        self.stylesheets = {}
+        self.lock = threading.Lock()
+
+    def get(self, asset):
+        """
+        Return the file served for a stylesheet of the export,
+        as `assets/css/home/style.css`.
+
+        Raise FileNotFoundError when the stylesheet doesn't exist.
+        """
+        filename = os.path.join(self.export_dir, *asset.split("/"))
+        stat = os.stat(filename)
+        state = (stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            cached = self.stylesheets.get(asset)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+
+            rewritten = os.path.join(self._tmp_dir.name, *asset.split("/"))
+            if not self.rewriter.rewrite_file(filename, rewritten, asset):
+                os.unlink(rewritten)
+                rewritten = filename
+            self.stylesheets[asset] = (state, rewritten)
+        return rewritten
@@ -0,0 +1,132 @@
+from . import __version__
+from .json_file import save_json
+import importlib
+import functools
+import hashlib
+import json
+import os
+
+#Modules holding conversion rules
+CONVERTER_MODULES = ["tag_converter", "stream_converter"]
+
+def file_digest(filename):
+    """
+    Compute sha256 hash of a file content, read by blocks.
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file_stream:
+        for block in iter(lambda: file_stream.read(64 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@functools.lru_cache()
+def rules_digest():
+    """
+    Hash of converter modules sources, changing with any
+    conversion rule, while the version may stay the same.
+    """
+    digest = hashlib.sha256()
+    for module_name in CONVERTER_MODULES:
+        module = importlib.import_module(f".{module_name}", __package__)
+        with open(module.__file__, "rb") as module_stream:
+            digest.update(module_stream.read())
+    return digest.hexdigest()[:16]
+
+class Manifest:
+    """
+    Record of html files converted by previous exports.
+
+    Store for each source file of the export its content hash,
+    and the path of its converted output. Entries are only valid
+    for the converter version and rules used to create them, any
+    change of rules invalidate the whole manifest.
+
+    Content of manifest files is kept in memory, and read again only
+    when the file changed, for long running processes exporting
+    several times.
+    """
+    FILENAME = "manifest.json"
+    #Manifest filename: (size and modification time, content)
+    _loaded = {}
+
+    def __init__(self, build_dir, rules):
+        self.filename = os.path.join(build_dir, self.FILENAME)
+        self.rules = f"{__version__}:{rules_digest()}:{rules}"
+        self.entries = self._load()
+
+    def _load(self):
+        """
+        Read manifest entries, dropping them if they were
+        created with other rules.
+        """
+        if not os.path.isfile(self.filename):
+            return {}
+
+        state = self._file_state()
+        loaded = self._loaded.get(os.path.abspath(self.filename))
+        if loaded is not None and loaded[0] == state:
+            content = loaded[1]
+        else:
+            try:
+                with open(self.filename) as manifest_stream:
+                    content = json.load(manifest_stream)
+            except ValueError:
+                return {}
+            self._loaded[os.path.abspath(self.filename)] = (state, content)
+
+        if content.get("rules") != self.rules:
+            return {}
+        #Entries are replaced, never modified in place
+        return dict(content.get("files", {}))
+
+    def _file_state(self):
+        stat = os.stat(self.filename)
+        return stat.st_size, stat.st_mtime_ns
+
+    def save(self):
+        """
+        Write manifest entries, replacing previous manifest at once.
+        """
+        content = {"rules": self.rules, "files": self.entries}
+        save_json(self.filename, content)
+        content["files"] = dict(self.entries)
+        self._loaded[os.path.abspath(self.filename)] = \
+                (self._file_state(), content)
+
+    def is_converted(self, source, digest):
+        """
+        Check if source file was already converted with the same
+        content, and if all its outputs are still available.
+        """
+        entry = self.entries.get(source)
+        if entry is None or entry["hash"] != digest:
+            return False
+        return all(os.path.isfile(output) for output in entry["outputs"])
+
+    def update(self, source, digest, outputs, links=()):
+        """
+        Record conversion of a source file, with static links
+        found in the file.
+        """
+        self.entries[source] = {"hash": digest, "outputs": outputs,
+                "links": sorted(links)}
+
+    def discard(self, source):
+        """
+        Forget a source file, to convert it again next time.
+        """
+        self.entries.pop(source, None)
+
+    def remove_missing(self, sources):
+        """
+        Forget recorded files missing from given sources.
+
+        Return the list of their outputs still available, to be
+        deleted by the caller.
+        """
+        removed = []
+        for source in set(self.entries) - set(sources):
+            for output in self.entries.pop(source)["outputs"]:
+                if os.path.isfile(output):
+                    removed.append(output)
+        return sorted(removed)
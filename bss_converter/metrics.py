@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+import json
+import time
+import os
+
+class Metrics:
+    """
+    Collect time and bytes spent in each stage of an export,
+    per file and for the whole run.
+
+    Stages are recorded with the `stage` context manager:
+
+        with metrics.stage("extract", filename) as stage:
+            ...
+            stage["bytes"] = size
+    """
+    enabled = True
+
+    def __init__(self):
+        #Totals by stage name: seconds, bytes, count
+        self.stages = {}
+        #Stages of each file: {filename: {stage: {seconds, bytes}}}
+        self.files = {}
+        #Counters of the run, as number of converted files
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name, filename=None):
+        """
+        Time the enclosed code as a stage, optionally
+        attached to a file.
+        """
+        record = {"bytes": 0}
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.add(name, time.perf_counter() - start_time,
+                    record["bytes"], filename)
+
+    def add(self, name, seconds, size=0, filename=None):
+        """
+        Record time and bytes spent in a stage.
+        """
+        total = self.stages.setdefault(name,
+                {"seconds": 0, "bytes": 0, "count": 0})
+        total["seconds"] += seconds
+        total["bytes"] += size
+        total["count"] += 1
+
+        if filename is not None:
+            file_stages = self.files.setdefault(filename, {})
+            file_stage = file_stages.setdefault(name,
+                    {"seconds": 0, "bytes": 0})
+            file_stage["seconds"] += seconds
+            file_stage["bytes"] += size
+
+    def merge_file(self, filename, stages):
+        """
+        Add stages of a file recorded by another Metrics,
+        as returned by worker processes.
+        """
+        for name, record in stages.items():
+            self.add(name, record["seconds"], record["bytes"], filename)
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def file_time(self, filename):
+        """
+        Total time spent on a file.
+        """
+        return sum(record["seconds"] for record in \
+                self.files.get(filename, {}).values())
+
+    def slowest_files(self, number):
+        """
+        Return the given number of files taking the most time.
+        """
+        return sorted(self.files, key=self.file_time, reverse=True)[:number]
+
+    def report(self):
+        """
+        Return all metrics as a dict serializable in JSON.
+        """
+        return {
+            "stages": self.stages,
+            "counters": self.counters,
+            "files": self.files,
+        }
+
+    def write_json(self, filename):
+        """
+        Write metrics report in a JSON file.
+        """
+        with open(filename, "w") as report_stream:
+            json.dump(self.report(), report_stream, indent=2,
+                    sort_keys=True)
+
+    def write_prometheus(self, filename):
+        """
+        Write aggregated metrics in prometheus text format, for
+        the node exporter textfile collector.
+
+        The file is replaced at once, never read partially written.
+        """
+        lines = []
+        metrics = [
+            ("bss_export_stage_seconds", "seconds",
+                "Time spent in each export stage."),
+            ("bss_export_stage_bytes", "bytes",
+                "Bytes processed by each export stage."),
+            ("bss_export_stage_calls", "count",
+                "Number of runs of each export stage."),
+        ]
+        for metric, key, description in metrics:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, record in sorted(self.stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {record[key]}')
+
+        lines.append("# HELP bss_export_files Files of the last export.")
+        lines.append("# TYPE bss_export_files gauge")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'bss_export_files{{status="{name}"}} {value}')
+
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "w") as prometheus_stream:
+            prometheus_stream.write("\n".join(lines) + "\n")
+        os.replace(tmp_filename, filename)
+
+class NullMetrics(Metrics):
+    """
+    Metrics ignoring every record, used when instrumentation
+    is disabled.
+    """
+    enabled = False
+
+    @contextmanager
+    def stage(self, name, filename=None):
+        yield {"bytes": 0}
+
+    def add(self, name, seconds, size=0, filename=None):
+        pass
@@ -0,0 +1,292 @@
+from html.parser import HTMLParser
+from .tag_converter import TagConverter, ConversionError, copy_unconverted
+from .metrics import NullMetrics
+import tempfile
+import os
+
+class StreamConverter(HTMLParser):
+    """
+    Convert bss attributes to django tags without building
+    an html tree.
+
+    The file is tokenized by chunks, converted output is written
+    as soon as each token is read. Memory is bounded by the nesting
+    depth of the document, not by its size.
+
+    Source formatting is kept, only converted tags are rewritten.
+    Rewritten start tags keep the source order of attributes, like
+    the tree engine, other tags are written as they were read.
+    """
+    #Size of chunks read from the html file
+    CHUNK_SIZE = 64 * 1024
+
+    #Tags without closing part, never pushed on the element stack
+    VOID_TAG = frozenset(["area", "base", "br", "col", "embed", "hr",
+        "img", "input", "keygen", "link", "menuitem", "meta", "param",
+        "source", "track", "wbr", "basefont", "bgsound", "command",
+        "frame", "image", "isindex", "nextid", "spacer"])
+
+    def __init__(self, htmlfile, output=None, metrics=None):
+        super().__init__(convert_charrefs=False)
+        self.htmlfile = htmlfile
+        self.output_file = output or htmlfile
+        self.metrics = metrics or NullMetrics()
+
+        #Open elements, as (tag name, text written after end tag)
+        self.stack = []
+        #Open elements inside a removed dj-for-data element
+        self.skipped = []
+        #Text content waiting for the next tag
+        self.pending_text = []
+        #Local links converted to static tags
+        self.static_links = set()
+        #Set once cache library is loaded, before the first cache tag
+        self.cache_loaded = False
+        #Set when the page was copied without being parsed
+        self.fast_path = False
+        #Position of the end tag being parsed, to write it as read
+        self.endtag_start = None
+
+        with self.metrics.stage("stream", htmlfile) as stage:
+            stage["bytes"] = self._convert_file()
+
+    def _convert_file(self):
+        """
+        Feed html file by chunks, and write converted output
+        in a temporary file replacing the output file once complete.
+
+        Pages with nothing to convert are only copied.
+        Return the number of characters read.
+        """
+        if not os.path.isfile(self.htmlfile):
+            err_msg = "file '{}' is invalid or don't exists"
+            raise ConversionError(err_msg.format(self.htmlfile))
+
+        source_size = os.path.getsize(self.htmlfile)
+        if copy_unconverted(self.htmlfile, self.output_file):
+            self.fast_path = True
+            return source_size
+
+        directory = os.path.dirname(os.path.abspath(self.output_file))
+        with open(self.htmlfile) as htmlstream, \
+                tempfile.NamedTemporaryFile("w", dir=directory,
+                        delete=False) as self.output:
+            size = 0
+            try:
+                self.output.write(TagConverter.LOAD_STATIC)
+                for chunk in iter(lambda: htmlstream.read(self.CHUNK_SIZE),
+                        ""):
+                    size += len(chunk)
+                    self.feed(chunk)
+                self.close()
+
+                #Close elements left open at end of file
+                while self.stack:
+                    self._write(self.stack.pop()[1])
+                self._flush_text()
+            except BaseException:
+                os.unlink(self.output.name)
+                raise
+
+        os.replace(self.output.name, self.output_file)
+        return size
+
+    @staticmethod
+    def _format_attribute(name, value):
+        """
+        Format an html attribute, quoted like BeautifulSoup does.
+        """
+        if value is None:
+            return name
+
+        value = value.replace("&", "&amp;").replace("<", "&lt;") \
+                .replace(">", "&gt;")
+        quote = '"'
+        if '"' in value:
+            if "'" in value:
+                value = value.replace('"', "&quot;")
+            else:
+                quote = "'"
+        return f"{name}={quote}{value}{quote}"
+
+    def _format_starttag(self, tag, attrs):
+        """
+        Rebuild text of a start tag with converted attributes,
+        in their source order.
+        """
+        attributes = "".join(" " + self._format_attribute(name, value) \
+                for name, value in attrs)
+        closing = "/>" if self.get_starttag_text().endswith("/>") else ">"
+        return f"<{tag}{attributes}{closing}"
+
+    def _write(self, text):
+        """
+        Write converted text, unless inside a removed element.
+        """
+        if not self.skipped:
+            self._flush_text()
+            self.output.write(text)
+
+    def _flush_text(self):
+        """
+        Write text content read since the last tag.
+        """
+        if self.pending_text:
+            text = "".join(self.pending_text)
+            self.pending_text = []
+            self.output.write(text)
+
+    def _convert_attributes(self, tag, attrs):
+        """
+        Extract bss attributes of a start tag.
+
+        Return the converted attributes, text to write before
+        the tag, just after the start tag, and after the end tag.
+        """
+        attributes = dict(attrs)
+        before, inside, after = [], [], []
+
+        for django_tag in TagConverter.ENCLOSED_TAG:
+            bss_attribute = TagConverter._convert_bss_attribute(django_tag)
+            if bss_attribute in attributes:
+                value = attributes.pop(bss_attribute)
+                before.append(f"{{% {django_tag} {value} %}}")
+                after.insert(0, f"{{% end{django_tag} %}}")
+
+        for django_tag in TagConverter.OPEN_TAG:
+            bss_attribute = TagConverter._convert_bss_attribute(django_tag)
+            if bss_attribute in attributes:
+                value = attributes.pop(bss_attribute)
+                before.append(f"{{% {django_tag} {value} %}}")
+
+        bss_attribute = TagConverter._convert_bss_attribute(
+                TagConverter.CACHE_TAG)
+        if bss_attribute in attributes:
+            value = TagConverter._cache_arguments(
+                    attributes.pop(bss_attribute), self.htmlfile)
+            if not self.cache_loaded:
+                before.append("{% load cache %}")
+                self.cache_loaded = True
+            before.append(f"{{% cache {value} %}}")
+            after.insert(0, "{% endcache %}")
+
+        if tag in TagConverter.TAG_LINK:
+            for attribute in ["href", "src"]:
+                link = attributes.get(attribute)
+                if link:
+                    converted_link = TagConverter._convert_bss_link(link)
+                    if converted_link is not None:
+                        self.static_links.add(link)
+                        attributes[attribute] = \
+                                f'{{% static "{converted_link}" %}}'
+                    break
+
+        bss_attribute = TagConverter._convert_bss_attribute("ref")
+        if bss_attribute in attributes:
+            value = attributes.pop(bss_attribute)
+            inside.append(f"{{{{{value}}}}}")
+
+        style = attributes.get("style")
+        if style and "url(" in style:
+            attributes["style"] = TagConverter._convert_css_links(style,
+                    self.static_links)
+
+        return list(attributes.items()), before, inside, after
+
+    def _start_element(self, tag, attrs, is_void):
+        """
+        Convert and write a start tag, and keep track of the
+        element until its end tag.
+        """
+        if self.skipped:
+            if not is_void:
+                self.skipped.append(tag)
+            return
+
+        for_data = TagConverter._convert_bss_attribute("for-data")
+        if any(name == for_data for name, _ in attrs):
+            if not is_void:
+                self.skipped.append(tag)
+            return
+
+        converted, before, inside, after = \
+                self._convert_attributes(tag, attrs)
+        if converted == attrs:
+            starttag = self.get_starttag_text()
+        else:
+            starttag = self._format_starttag(tag, converted)
+
+        self._write("".join(before) + starttag + "".join(inside))
+        if is_void:
+            self._write("".join(after))
+        else:
+            self.stack.append((tag, "".join(after)))
+
+    def handle_starttag(self, tag, attrs):
+        self._start_element(tag, attrs, tag in self.VOID_TAG)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start_element(tag, attrs, True)
+
+    def parse_endtag(self, i):
+        self.endtag_start = i
+        return super().parse_endtag(i)
+
+    def _endtag_text(self, tag):
+        """
+        Text of the end tag being parsed, as written in the source.
+        """
+        if self.endtag_start is None:
+            return f"</{tag}>"
+        end = self.rawdata.find(">", self.endtag_start)
+        text = self.rawdata[self.endtag_start:end + 1]
+        self.endtag_start = None
+        return text if end != -1 else f"</{tag}>"
+
+    def handle_endtag(self, tag):
+        endtag = self._endtag_text(tag)
+        if self.skipped:
+            if tag in self.skipped:
+                while self.skipped.pop() != tag:
+                    pass
+            return
+
+        #Ignore end tag without opening tag
+        if tag not in (name for name, _ in self.stack):
+            self._write(endtag)
+            return
+
+        #Close unclosed children of the element
+        while True:
+            name, after = self.stack.pop()
+            if name == tag:
+                break
+            self._write(after)
+        self._write(endtag + after)
+
+    def handle_data(self, data):
+        if self.skipped:
+            return
+
+        #Content of a style tag is read at once
+        if self.stack and self.stack[-1][0] == "style" and "url(" in data:
+            data = TagConverter._convert_css_links(data, self.static_links)
+        self.pending_text.append(data)
+
+    def handle_entityref(self, name):
+        self.handle_data(f"&{name};")
+
+    def handle_charref(self, name):
+        self.handle_data(f"&#{name};")
+
+    def handle_comment(self, data):
+        self._write(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._write(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self._write(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self._write(f"<![{data}]>")
@@ -0,0 +1,195 @@
+from .tag_converter import TagConverter
+from .sync import delete_extra_files
+from .deploy import link_file
+from .json_file import load_json, save_json
+import posixpath
+import re
+import os
+
+def resolve_url(url, css_file):
+    """
+    Resolve an url() of a stylesheet of the export, as `css_file`
+    `assets/css/home/style.css`, to the export path of its target.
+
+    Return (target path, query string and fragment), or None for
+    external links and data uris.
+    """
+    if not url or url.startswith(TagConverter.EXTERNAL_LINK):
+        return None
+
+    #Keep query string and fragment
+    suffix_match = re.search(r"[?#]", url)
+    split = suffix_match.start() if suffix_match else len(url)
+    path, suffix = url[:split], url[split:]
+    if path.startswith("/"):
+        target = posixpath.normpath(path.lstrip("/"))
+    else:
+        target = posixpath.normpath(posixpath.join(
+            posixpath.dirname(css_file), path))
+    return target, suffix
+
+class StylesheetRewriter:
+    """
+    Rewrite url() of exported stylesheets for the django layout of
+    assets, `assets/img/home/a.png` being deployed as `home/img/a.png`.
+
+    Links are mapped like static links of templates, and stay relative
+    to the stylesheet. Files are read and written by chunks of
+    `chunk_size` bytes, only a small window is kept in memory
+    whatever the size of the stylesheet.
+    """
+    #Link of an url(), without spaces, quotes or parentheses: a match
+    #never depends on the bytes following it
+    CSS_URL = re.compile(rb"""url\(\s*(['"]?)([^'"()\s]*)\1\s*\)""")
+    URL_START = b"url("
+    #Longer url() are kept as they are, as data uris
+    MAX_LINK = 4096
+
+    def __init__(self, chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+        #Stylesheets rewritten by this run, and files linked as they are
+        self.rewritten = []
+        self.unchanged = []
+
+    @staticmethod
+    def rewrite_link(url, css_file):
+        """
+        Convert an url of a stylesheet of the export, as
+        `assets/css/home/style.css`, to an url relative to
+        the deployed stylesheet.
+
+        Return None when the url is kept as it is.
+        """
+        resolved = resolve_url(url, css_file)
+        css_static = TagConverter._convert_bss_link(css_file)
+        if resolved is None or css_static is None:
+            return None
+
+        target, suffix = resolved
+        if not target.startswith("assets/"):
+            return None
+        target_static = TagConverter._convert_bss_link(target)
+        if target_static is None:
+            return None
+
+        converted = posixpath.relpath(target_static.replace(os.sep, "/"),
+                posixpath.dirname(css_static.replace(os.sep, "/"))) + suffix
+        return None if converted == url else converted
+
+    def rewrite_stream(self, input_stream, output_stream, css_file):
+        """
+        Copy a binary stylesheet stream with its url() rewritten.
+        Return the number of rewritten links.
+        """
+        count = 0
+        pending = b""
+        for chunk in iter(lambda: input_stream.read(self.chunk_size), b""):
+            pending, rewritten = self._rewrite_window(pending + chunk,
+                    output_stream, css_file)
+            count += rewritten
+        return count + self._rewrite_window(pending, output_stream,
+                css_file, final=True)[1]
+
+    def _rewrite_window(self, window, output_stream, css_file, final=False):
+        """
+        Write a window of a stylesheet, keeping its end when it may
+        hold the start of an url() completed by next chunk.
+
+        Return (kept bytes, number of rewritten links).
+        """
+        position = 0
+        count = 0
+        for match in self.CSS_URL.finditer(window):
+            link = match.group(2).decode("utf-8", "surrogateescape")
+            converted = self.rewrite_link(link, css_file)
+            if converted is None:
+                continue
+            quote = match.group(1)
+            output_stream.write(window[position:match.start()])
+            output_stream.write(b"url(" + quote + converted.encode("utf-8",
+                "surrogateescape") + quote + b")")
+            position = match.end()
+            count += 1
+
+        if final:
+            output_stream.write(window[position:])
+            return b"", count
+
+        #Unfinished url(), or the start of its name
+        kept = window.rfind(self.URL_START, position)
+        if kept == -1 or len(window) - kept > self.MAX_LINK:
+            kept = max(position, len(window) - len(self.URL_START) + 1)
+        output_stream.write(window[position:kept])
+        return window[kept:], count
+
+    def rewrite_file(self, source, destination, css_file):
+        """
+        Write a rewritten copy of a stylesheet, replaced at once.
+        Stylesheets without any link to rewrite are linked instead.
+
+        Return the number of rewritten links.
+        """
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp_filename = destination + ".tmp"
+        with open(source, "rb") as input_stream, \
+                open(tmp_filename, "wb") as output_stream:
+            count = self.rewrite_stream(input_stream, output_stream,
+                    css_file)
+        if not count:
+            os.unlink(tmp_filename)
+            link_file(source, tmp_filename)
+        os.replace(tmp_filename, destination)
+        return count
+
+    def rewrite_tree(self, source, destination, prefix="assets/css"):
+        """
+        Rewrite stylesheets of source folder in destination folder,
+        source being the `prefix` folder of the export. Other files
+        are linked as they are.
+
+        Only files modified since they were written are processed,
+        files deleted from source are removed. Sources are tracked
+        by size, modification time and inode in a cache file next
+        to the destination folder, a linked destination sharing the
+        modification time of its source.
+        """
+        cache_file = os.path.normpath(destination) + ".json"
+        cache = load_json(cache_file)
+        kept_files = set()
+        for directory, subdirs, filenames in os.walk(source):
+            subdirs.sort()
+            for filename in sorted(filenames):
+                source_file = os.path.join(directory, filename)
+                relative_file = os.path.relpath(source_file, source)
+                destination_file = os.path.join(destination, relative_file)
+                kept_files.add(relative_file)
+                stat = os.stat(source_file)
+                state = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+                if cache.get(relative_file) == state and \
+                        os.path.isfile(destination_file):
+                    self.unchanged.append(source_file)
+                    continue
+
+                if filename.endswith(".css"):
+                    count = self.rewrite_file(source_file, destination_file,
+                            posixpath.join(prefix, relative_file.replace(
+                                os.sep, "/")))
+                else:
+                    count = 0
+                    os.makedirs(os.path.dirname(destination_file),
+                            exist_ok=True)
+                    if os.path.lexists(destination_file):
+                        os.unlink(destination_file)
+                    link_file(source_file, destination_file)
+
+                cache[relative_file] = state
+                if count:
+                    self.rewritten.append(destination_file)
+                else:
+                    self.unchanged.append(source_file)
+
+        if os.path.isdir(destination):
+            delete_extra_files(destination, kept_files)
+        save_json(cache_file, {relative_file: state for \
+                relative_file, state in cache.items() \
+                if relative_file in kept_files})
@@ -0,0 +1,283 @@
+from .manifest import file_digest
+from concurrent.futures import wait
+import tempfile
+import shutil
+import errno
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+#ioctl sharing blocks of a whole file, on copy on write filesystems
+FICLONE = 0x40049409
+#Errors of filesystems or systems unable to link or clone files
+UNSUPPORTED_ERRORS = (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP,
+        errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EMLINK)
+#Bytes copied by each copy_file_range call, from python 3.8 on linux
+_copy_file_range = getattr(os, "copy_file_range", None)
+COPY_RANGE_SIZE = 1024 * 1024 * 1024
+
+class SyncReport:
+    """
+    Summary of files transferred by one or more synchronisations.
+    """
+    def __init__(self):
+        self.copied = []
+        self.unchanged = []
+        self.deleted = []
+        self.bytes_copied = 0
+        #Copies of each kind of file: {kind: {files, bytes, start, end,
+        #seconds}}, seconds being the wall clock time from the start
+        #of the first copy to the end of the last one
+        self.transfers = {}
+
+    def add_transfer(self, kind, size, start, end, files=1):
+        """
+        Record copied files of the given kind, copied
+        between start and end times.
+        """
+        transfer = self.transfers.setdefault(kind, {"files": 0,
+            "bytes": 0, "start": start, "end": end})
+        transfer["files"] += files
+        transfer["bytes"] += size
+        transfer["start"] = min(transfer["start"], start)
+        transfer["end"] = max(transfer["end"], end)
+        transfer["seconds"] = transfer["end"] - transfer["start"]
+
+    def merge(self, other):
+        """
+        Add results of another synchronisation.
+        """
+        self.copied.extend(other.copied)
+        self.unchanged.extend(other.unchanged)
+        self.deleted.extend(other.deleted)
+        self.bytes_copied += other.bytes_copied
+        for kind, transfer in other.transfers.items():
+            self.add_transfer(kind, transfer["bytes"], transfer["start"],
+                    transfer["end"], transfer["files"])
+
+def is_same_file(source, destination, checksum=False):
+    """
+    Check if destination file is up to date with source file.
+
+    Compare size and modification time, or file content
+    when checksum is enabled.
+    """
+    try:
+        destination_stat = os.stat(destination)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source)
+
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if checksum:
+        return file_digest(source) == file_digest(destination)
+
+    #Filesystems storing whole seconds only are compared by second
+    if destination_stat.st_mtime_ns % 1000000000 == 0:
+        return int(source_stat.st_mtime) == int(destination_stat.st_mtime)
+    return source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+
+def clone_file(source, destination):
+    """
+    Clone a file like `cp --reflink`, both files sharing their
+    blocks until one is modified.
+
+    Return False when the filesystem can't clone files.
+    """
+    if fcntl is None:
+        return False
+    with open(source, "rb") as source_stream, \
+            open(destination, "wb") as destination_stream:
+        try:
+            fcntl.ioctl(destination_stream.fileno(), FICLONE,
+                    source_stream.fileno())
+        except OSError as error:
+            if error.errno in UNSUPPORTED_ERRORS:
+                return False
+            raise
+    shutil.copystat(source, destination)
+    return True
+
+def copy_range(source, destination):
+    """
+    Copy a file inside the kernel with copy_file_range, without
+    reading it in userspace. Filesystems may share blocks or copy
+    on the server side.
+
+    Return False when the system or the filesystem can't
+    copy ranges.
+    """
+    if _copy_file_range is None:
+        return False
+    with open(source, "rb") as source_stream, \
+            open(destination, "wb") as destination_stream:
+        copied = 0
+        while True:
+            try:
+                count = _copy_file_range(source_stream.fileno(),
+                        destination_stream.fileno(), COPY_RANGE_SIZE)
+            except OSError as error:
+                if copied == 0 and error.errno in UNSUPPORTED_ERRORS:
+                    return False
+                raise
+            if count == 0:
+                break
+            copied += count
+    shutil.copystat(source, destination)
+    return True
+
+def hard_link(source, destination):
+    """
+    Replace destination with a hard link of source.
+
+    Return False when source and destination are
+    on different filesystems, or links are not supported.
+    """
+    os.unlink(destination)
+    try:
+        os.link(source, destination)
+    except OSError as error:
+        if error.errno in UNSUPPORTED_ERRORS:
+            return False
+        raise
+    return True
+
+def copy_file(source, destination, link=False):
+    """
+    Copy a file with its metadata, replacing destination at once
+    to never leave a partially written file.
+
+    The file is cloned on copy on write filesystems, or copied by
+    the kernel without going through userspace. With link, it is hard
+    linked when source and destination share a filesystem, files are
+    always replaced, never modified through a link.
+    """
+    directory = os.path.dirname(destination)
+    file_descriptor, tmp_filename = tempfile.mkstemp(dir=directory,
+            prefix=".bss_")
+    os.close(file_descriptor)
+    try:
+        if not (link and hard_link(source, tmp_filename)) and \
+                not clone_file(source, tmp_filename) and \
+                not copy_range(source, tmp_filename):
+            #Copied with sendfile on linux
+            shutil.copy2(source, tmp_filename)
+        os.replace(tmp_filename, destination)
+    except BaseException:
+        if os.path.lexists(tmp_filename):
+            os.unlink(tmp_filename)
+        raise
+
+def timed_copy(source, destination, link=False):
+    """
+    Copy a file, return its start and end times.
+    """
+    start_time = time.perf_counter()
+    copy_file(source, destination, link)
+    return start_time, time.perf_counter()
+
+def sync_tree(source, destination, delete=False, checksum=False,
+        dry_run=False, link=False, executor=None, kind="files"):
+    """
+    Synchronise destination folder with source folder.
+
+    Copy only new or modified files, and delete files missing
+    from source when `delete` is enabled. With `dry_run`, the
+    transfer is only planned, nothing is written. With `link`,
+    files are hard linked when possible. Files are copied by
+    threads of `executor` when given, and recorded as `kind`
+    transfers.
+    Return a SyncReport of the transfer.
+    """
+    report = SyncReport()
+    #Copies in progress: (future or copy times, size)
+    copies = []
+    source_files = set()
+    source_dirs = set()
+
+    for directory, subdirs, filenames in os.walk(source):
+        subdirs.sort()
+        relative_dir = os.path.relpath(directory, source)
+        destination_dir = os.path.normpath(os.path.join(destination,
+            relative_dir))
+        if not dry_run:
+            os.makedirs(destination_dir, exist_ok=True)
+        source_dirs.add(os.path.normpath(relative_dir))
+
+        for filename in sorted(filenames):
+            source_file = os.path.join(directory, filename)
+            destination_file = os.path.join(destination_dir, filename)
+            source_files.add(os.path.normpath(os.path.join(relative_dir,
+                filename)))
+
+            if is_same_file(source_file, destination_file, checksum):
+                report.unchanged.append(destination_file)
+                continue
+
+            size = os.path.getsize(source_file)
+            if executor is not None and not dry_run:
+                copies.append((executor.submit(timed_copy, source_file,
+                    destination_file, link), size))
+            elif not dry_run:
+                copies.append((timed_copy(source_file, destination_file,
+                    link), size))
+            report.copied.append(destination_file)
+            report.bytes_copied += size
+
+    #A failing copy is raised once no other copy writes in destination
+    if executor is not None:
+        wait([copy for copy, _ in copies])
+    for copy, size in copies:
+        start, end = copy if executor is None else copy.result()
+        report.add_transfer(kind, size, start, end)
+
+    if delete:
+        report.deleted = delete_extra_files(destination, source_files,
+                source_dirs, dry_run)
+    return report
+
+def list_tree(directory):
+    """
+    List files and folders of a directory, as paths relative
+    to the directory.
+    """
+    files = set()
+    dirs = set()
+    for current_dir, _, filenames in os.walk(directory):
+        relative_dir = os.path.normpath(os.path.relpath(current_dir,
+            directory))
+        dirs.add(relative_dir)
+        files.update(os.path.normpath(os.path.join(relative_dir, filename)) \
+                for filename in filenames)
+    return files, dirs
+
+def delete_extra_files(destination, kept_files, kept_dirs=(),
+        dry_run=False):
+    """
+    Delete files of destination folder not listed in kept files,
+    as path relative to destination, and remove emptied folders
+    not listed in kept folders.
+
+    Return the list of deleted files, only listed with `dry_run`.
+    """
+    deleted = []
+    for directory, subdirs, filenames in os.walk(destination,
+            topdown=False):
+        for filename in filenames:
+            destination_file = os.path.join(directory, filename)
+            relative_file = os.path.relpath(destination_file, destination)
+            if relative_file not in kept_files:
+                if not dry_run:
+                    os.unlink(destination_file)
+                deleted.append(destination_file)
+
+        relative_dir = os.path.relpath(directory, destination)
+        if not dry_run and relative_dir not in kept_dirs and \
+                not os.listdir(directory):
+            os.rmdir(directory)
+    return sorted(deleted)
@@ -1,7 +1,18 @@
 #!/usr/bin/env python3
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag, NavigableString, Doctype
+from bs4.builder import HTMLTreeBuilder
+from .metrics import NullMetrics
 from pathlib import PurePath
+import importlib.util
+import functools
+import tempfile
+import shutil
+import codecs
+import locale
+import mmap
+import io
+import time
 import sys
 import re
 import os
@@ -15,96 +26,600 @@ def error_exit(msg):
     print(f"{script_name}: {msg}", file=sys.stderr)
     exit(1)
 
+class ConversionError(Exception):
+    """
+    Raised when a single html file can't be converted.
+    """
+    pass
+
+#Tree builders usable by BeautifulSoup, by order of preference.
+#Map parser name to the module providing it.
+PARSERS = {
+    "lxml": "lxml",
+    "html5lib": "html5lib",
+    "html.parser": "html.parser",
+}
+
+def available_parsers():
+    """
+    List installed tree builders, fastest first.
+    """
+    return [parser for parser, module in PARSERS.items() \
+            if importlib.util.find_spec(module) is not None]
+
+def find_parser(parser=None):
+    """
+    Select the tree builder used to parse html files.
+
+    Use given parser, or BSS_PARSER environment variable. Otherwise
+    pick the fastest installed builder, lxml when available.
+    """
+    parser = parser or os.environ.get("BSS_PARSER")
+    installed = available_parsers()
+
+    if not parser:
+        return installed[0]
+
+    if parser not in PARSERS:
+        error_exit(f"unknown parser '{parser}', "
+                f"choose from: {', '.join(PARSERS)}")
+    if parser not in installed:
+        error_exit(f"parser '{parser}' is not installed")
+    return parser
+
+#Output formats of converted html files
+FORMATS = ["preserve", "prettify"]
+
+def find_format(output_format=None):
+    """
+    Select how converted html trees are written.
+
+    Use given format, or BSS_FORMAT environment variable, `preserve`
+    by default: source formatting is kept, only converted elements
+    change. `prettify` re-indents the whole file.
+    """
+    output_format = output_format or os.environ.get("BSS_FORMAT") or \
+            FORMATS[0]
+    if output_format not in FORMATS:
+        error_exit(f"unknown format '{output_format}', "
+                f"choose from: {', '.join(FORMATS)}")
+    return output_format
+
+#Size of the slices of an unconverted page checked by the decoder
+DECODE_CHUNK_SIZE = 64 * 1024
+
+def copy_unconverted(htmlfile, output):
+    """
+    Write output file as html file with static library loaded, if
+    the page holds nothing to convert.
+
+    The page is scanned as raw bytes from a memory map, without
+    being parsed. Its encoding is checked by slices, the page is
+    never decoded as a whole. Return False when the page needs
+    a full conversion.
+    """
+    encoding = locale.getpreferredencoding(False)
+    with open(htmlfile, "rb") as htmlstream:
+        if os.fstat(htmlstream.fileno()).st_size == 0:
+            content = b""
+        else:
+            content = mmap.mmap(htmlstream.fileno(), 0,
+                    access=mmap.ACCESS_READ)
+        try:
+            if TagConverter.CONVERTIBLE_PAGE.search(content):
+                return False
+            #Undecodable pages fail like fully converted pages
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                for start in range(0, len(content), DECODE_CHUNK_SIZE):
+                    decoder.decode(content[start:start + DECODE_CHUNK_SIZE])
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError as error:
+                raise ConversionError(f"file '{htmlfile}' can't be read: "
+                        f"{error}")
+
+            #Output may be the html file itself
+            directory = os.path.dirname(os.path.abspath(output))
+            with tempfile.NamedTemporaryFile("wb", dir=directory,
+                    delete=False) as output_stream:
+                try:
+                    output_stream.write(TagConverter.LOAD_STATIC.encode(
+                        encoding))
+                    output_stream.write(content)
+                    shutil.copymode(htmlfile, output_stream.name)
+                except BaseException:
+                    os.unlink(output_stream.name)
+                    raise
+        finally:
+            if not isinstance(content, bytes):
+                content.close()
+    os.replace(output_stream.name, output)
+    return True
+
 class TagConverter:
     #Define different type of tag behavior
     ENCLOSED_TAG = ["for", "if", "block"]
     OPEN_TAG = ["load"]
     TAG_LINK = ["script", "img", "link"]
+    #Fragment caching tag, its library is loaded by the converted file
+    CACHE_TAG = "cache"
 
-    def __init__(self, htmlfile):
+    #Arguments of a cache tag, quoted parts may hold spaces
+    CACHE_ARGUMENT = re.compile(r"""(?:[^\s"']+|"[^"]*"|'[^']*')+""")
+    #Template variable with optional filters, or quoted string
+    CACHE_VARIABLE = re.compile(r"""[A-Za-z_][\w.]*"""
+            r"""(?:\|\w+(?::(?:"[^"]*"|'[^']*'|[\w.]+))?)*|"[^"]*"|'[^']*'""")
+    CACHE_FRAGMENT = re.compile(r"[\w.:-]+")
+
+    #Css url() function, with optional quotes around the link
+    CSS_URL = re.compile(r"""url\(\s*(['"]?)(.*?)\1\s*\)""")
+    #Links kept as they are, not served by django static files
+    EXTERNAL_LINK = ("http:", "https:", "//", "data:", "#", "{%")
+    #Raw bytes of a page which may need a conversion: bss attributes,
+    #src or href attributes not starting like an external link, and
+    #css url(). Pages without any are only copied.
+    _external = "|".join(map(re.escape, EXTERNAL_LINK)).encode()
+    CONVERTIBLE_PAGE = re.compile(rb"(?i:dj-)|url\(|(?i:src|href)\s*=\s*"
+            rb"""(?:["'](?!""" + _external + rb")|(?![\"'\s])(?!" + \
+            _external + rb"))")
+    del _external
+
+    #First line of converted templates
+    LOAD_STATIC = "{% load static %}\n"
+
+    #Compiled dispatch table, shared by every converted file
+    _rules = None
+
+    #Document tags added by some parsers around html fragments
+    DOCUMENT_TAG = ["html", "head", "body"]
+
+    def __init__(self, htmlfile=None, parser=None, output=None,
+            metrics=None, output_format=None):
+        """
+        Convert htmlfile, writing the result in output file or
+        in htmlfile itself.
+
+        Without htmlfile nothing is converted, the converter is kept
+        to convert documents in memory with `convert_string`,
+        `convert_bytes` and `convert_stream`. Parser and format are
+        resolved once, for every converted document.
+        """
         self.htmlfile = htmlfile
-        self.tree = self._extract_tree()
+        self.output = output or htmlfile
+        self.parser = find_parser(parser)
+        self.output_format = find_format(output_format)
+        self.metrics = metrics or NullMetrics()
+        self._reset()
 
-        self._remove_for_data()
+        if htmlfile is not None:
+            self._convert_file()
 
-        for tag in self.ENCLOSED_TAG:
-            self._extend_tag(tag, before=True, after=True)
+    def _reset(self):
+        """
+        Clear state of the previous converted document.
+        """
+        self.tree = None
+        #Local links converted to static tags
+        self.static_links = set()
+        #Set once cache library is loaded, before the first cache tag
+        self.cache_loaded = False
+        #Set when the page was copied without being parsed
+        self.fast_path = False
+
+    def convert_string(self, markup, name="<string>"):
+        """
+        Convert html markup, return the django template.
 
-        for tag in self.OPEN_TAG:
-            self._extend_tag(tag, before=True)
+        Name identifies the document in error messages and metrics.
+        Static links of the document are kept in `static_links`
+        until the next conversion.
+        """
+        output = io.StringIO()
+        self.convert_stream(io.StringIO(markup), output, name)
+        return output.getvalue()
 
-        for tag in self.TAG_LINK:
-            self._replace_static_links(tag)
+    def convert_bytes(self, content, encoding="utf-8", name="<bytes>"):
+        """
+        Convert encoded html content, return the django template
+        with the same encoding.
+        """
+        try:
+            markup = content.decode(encoding)
+        except UnicodeDecodeError as error:
+            raise ConversionError(f"file '{name}' is not valid "
+                    f"{encoding}: {error}")
+        return self.convert_string(markup, name).encode(encoding)
 
-        self._replace_ref()
-        self._save_tree()
+    def convert_stream(self, input_stream, output_stream, name=None):
+        """
+        Convert html read from a text stream, and write the django
+        template in output stream.
+
+        Return the number of written characters.
+        """
+        self._reset()
+        self.htmlfile = name or getattr(input_stream, "name", "<stream>")
+        self._convert_tree(input_stream.read())
+        return self._write_output(output_stream)
 
-    def _extract_tree(self):
+    def _convert_file(self):
         """
-        Convert file to an html tree using BeautifulSoup.
+        Convert htmlfile, replacing output file content.
         """
         #Control file existence and type
         if not os.path.exists(self.htmlfile) or \
                 not os.path.isfile(self.htmlfile):
             err_msg = "file '{}' is invalid or don't exists"
-            error_exit(err_msg.format(self.htmlfile))
+            raise ConversionError(err_msg.format(self.htmlfile))
+
+        #Prettified pages are always parsed to be indented
+        if self.output_format == "preserve":
+            with self.metrics.stage("prefilter", self.htmlfile) as stage:
+                self.fast_path = copy_unconverted(self.htmlfile, self.output)
+                stage["bytes"] = os.path.getsize(self.htmlfile)
+            if self.fast_path:
+                return
 
         with open(self.htmlfile) as htmlstream:
-            return BeautifulSoup(htmlstream, "html.parser")
+            markup = htmlstream.read()
+        self._convert_tree(markup)
+        self._save_tree()
+
+    def _convert_tree(self, markup):
+        """
+        Parse markup and apply rules to the html tree.
+        """
+        with self.metrics.stage("extract", self.htmlfile) as stage:
+            self.tree = self._extract_tree(markup)
+            stage["bytes"] = len(markup)
+
+        with self.metrics.stage("select", self.htmlfile):
+            matches = self._match_elements()
+
+        if self.metrics.enabled:
+            self._apply_timed_rules(matches)
+        else:
+            for element, handlers in matches:
+                for handler, kwargs in handlers:
+                    handler(self, element, **kwargs)
+
+    def _apply_timed_rules(self, matches):
+        """
+        Apply rules handlers, recording time spent in each rule.
+        """
+        rule_times = {}
+        for element, handlers in matches:
+            for handler, kwargs in handlers:
+                start_time = time.perf_counter()
+                handler(self, element, **kwargs)
+                rule = "rule" + handler.__name__
+                rule_times[rule] = rule_times.get(rule, 0) + \
+                        time.perf_counter() - start_time
+
+        for rule, seconds in rule_times.items():
+            self.metrics.add(rule, seconds, filename=self.htmlfile)
+
+    @classmethod
+    def _compile_rules(cls):
+        """
+        Build once the table of rules applied to each element.
+
+        Rules are stored in the order they must be applied,
+        attribute rules are looked up by bss attribute name, and link
+        rules by tag name. The table is cached on the class to be
+        reused across files.
+        """
+        if cls._rules is not None:
+            return cls._rules
+
+        attribute_rules = []
+        for tag in cls.ENCLOSED_TAG:
+            attribute_rules.append((cls._convert_bss_attribute(tag),
+                cls._extend_tag, {"django_tag": tag, "before": True,
+                    "after": True}))
+
+        for tag in cls.OPEN_TAG:
+            attribute_rules.append((cls._convert_bss_attribute(tag),
+                cls._extend_tag, {"django_tag": tag, "before": True}))
+
+        #Cache tag is the innermost tag around the element
+        attribute_rules.append((cls._convert_bss_attribute(cls.CACHE_TAG),
+            cls._cache_fragment, {}))
+
+        cls._rules = {
+            "for_data": cls._convert_bss_attribute("for-data"),
+            "attributes": attribute_rules,
+            "links": frozenset(cls.TAG_LINK),
+            "ref": cls._convert_bss_attribute("ref"),
+        }
+        return cls._rules
+
+    def _match_elements(self):
+        """
+        Walk the tree a single time, and find for each element
+        the list of handlers to apply.
+
+        Content of removed dj-for-data elements is not visited.
+        Return a list of (element, handlers) in document order.
+        """
+        rules = self._compile_rules()
+        matches = []
+
+        stack = [self.tree]
+        while stack:
+            node = stack.pop()
+            handlers = []
+
+            if node is not self.tree:
+                attributes = node.attrs
+                if rules["for_data"] in attributes:
+                    matches.append((node, [(TagConverter._remove_for_data,
+                        {})]))
+                    continue
+
+                for bss_attribute, handler, kwargs in rules["attributes"]:
+                    if bss_attribute in attributes:
+                        handlers.append((handler, kwargs))
+
+                if node.name in rules["links"]:
+                    handlers.append((TagConverter._replace_static_link, {}))
+
+                if rules["ref"] in attributes:
+                    handlers.append((TagConverter._replace_ref, {}))
+
+                if node.name == "style" or "style" in attributes:
+                    handlers.append((TagConverter._replace_style_links, {}))
+
+                if handlers:
+                    matches.append((node, handlers))
+
+            #Push children in reverse order to visit them in document order
+            children = [child for child in node.contents \
+                    if isinstance(child, Tag)]
+            stack.extend(reversed(children))
+
+        return matches
+
+    def _extract_tree(self, markup):
+        """
+        Convert markup to an html tree using BeautifulSoup.
+        """
+        options = {}
+        if self.output_format == "preserve":
+            #Whitespace only strings are collapsed outside of these tags
+            options["preserve_whitespace_tags"] = \
+                    HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS | \
+                    {BeautifulSoup.ROOT_TAG_NAME}
+        tree = BeautifulSoup(markup, self.parser, **options)
+        self._remove_implicit_tags(tree, markup)
+        return tree
+
+    def _remove_implicit_tags(self, tree, markup):
+        """
+        Remove html, head and body tags created by the parser
+        when they are not part of the file.
+
+        lxml and html5lib always build a full document, keep
+        html fragments as they are written.
+        """
+        for tag_name in self.DOCUMENT_TAG:
+            if re.search(f"<{tag_name}[\\s>/]", markup, re.IGNORECASE):
+                continue
+            for element in tree.find_all(tag_name):
+                element.unwrap()
 
     def _save_tree(self):
         """
-        Write html tree in a destination file
+        Write html tree in a destination file.
+
+        Preserved trees are serialized straight to the file, their
+        save stage also covers serialization.
+        """
+        if self.output_format == "preserve":
+            with self.metrics.stage("save", self.htmlfile) as stage, \
+                    open(self.output, 'w') as htmlstream:
+                htmlstream.write(self.LOAD_STATIC)
+                stage["bytes"] = self._write_tree(htmlstream) + \
+                        len(self.LOAD_STATIC)
+            return
+
+        #File is only opened once serialized, left intact on error
+        content = self._serialize()
+        with self.metrics.stage("save", self.htmlfile) as stage:
+            with open(self.output, 'w') as htmlstream:
+                htmlstream.write(content)
+            stage["bytes"] = len(content)
+
+    def _write_output(self, htmlstream):
+        """
+        Write converted template in a text stream.
+        Return number of written characters.
         """
-        with open(self.htmlfile, 'w') as htmlstream:
-            print("{% load static %}", file=htmlstream)
-            content = self._replace_background_img(self.tree.prettify())
-            print(content, file=htmlstream)
-            
+        if self.output_format == "preserve":
+            with self.metrics.stage("serialize", self.htmlfile) as stage:
+                htmlstream.write(self.LOAD_STATIC)
+                stage["bytes"] = self._write_tree(htmlstream)
+            return stage["bytes"] + len(self.LOAD_STATIC)
+
+        content = self._serialize()
+        htmlstream.write(content)
+        return len(content)
+
+    def _serialize(self):
+        """
+        Prettify html tree, with static library loaded.
+        """
+        with self.metrics.stage("serialize", self.htmlfile) as stage:
+            content = self.tree.prettify()
+            stage["bytes"] = len(content)
+        return f"{self.LOAD_STATIC}{content}\n"
+
+    def _write_tree(self, htmlstream):
+        """
+        Write html tree without changing its formatting, element
+        by element straight to the stream.
+
+        Text is written as parsed, attributes keep their source order.
+        Markup normalized by parsers can't be restored: entities
+        are written as characters except `&amp;`, `&lt;` and `&gt;`,
+        attributes are double quoted and separated by one space, and
+        boolean attributes get an empty value. lxml and html5lib drop spacing around document
+        tags.
+
+        Return number of written characters.
+        """
+        formatter = self.tree.formatter_for_name("minimal")
+        #Only html.parser keeps the line break following the doctype
+        doctype_suffix = ">" if self.parser == "html.parser" else \
+                Doctype.SUFFIX
+        size = 0
+        #Elements to write, closing tags are pending as plain strings
+        pending = list(reversed(self.tree.contents))
+        while pending:
+            element = pending.pop()
+            if isinstance(element, Doctype):
+                content = f"{Doctype.PREFIX}{element}{doctype_suffix}"
+            elif isinstance(element, NavigableString):
+                content = element.output_ready(formatter)
+            elif isinstance(element, Tag):
+                content = self._start_tag(element, formatter)
+                if not element.is_empty_element:
+                    pending.append(f"</{self._tag_name(element)}>")
+                    pending.extend(reversed(element.contents))
+            else:
+                content = element
+            htmlstream.write(content)
+            size += len(content)
+        return size
+
+    @staticmethod
+    def _tag_name(element):
+        if element.prefix:
+            return f"{element.prefix}:{element.name}"
+        return element.name
+
+    def _start_tag(self, element, formatter):
+        """
+        Serialize opening tag of an element, without self
+        closing slash for void elements.
+        """
+        attributes = []
+        for attribute, value in element.attrs.items():
+            if value is None:
+                attributes.append(f" {attribute}")
+                continue
+            if isinstance(value, (list, tuple)):
+                value = " ".join(value)
+            value = formatter.attribute_value(str(value))
+            attributes.append(
+                    f" {attribute}={formatter.quoted_attribute_value(value)}")
+        return f"<{self._tag_name(element)}{''.join(attributes)}>"
+
     @staticmethod
     def _convert_bss_attribute(attribute):
         return f"dj-{attribute}"
 
-    def _remove_for_data(self):
+    def _remove_for_data(self, element):
         """
         Remove extra tag used to simulate for loop content.
         """
-        bss_attribute = self._convert_bss_attribute("for-data")
-        for element in self.tree.select(f'[{bss_attribute}]'):
-            element.extract()
+        element.extract()
 
-    def _extend_tag(self, django_tag, before=False, after=False):
+    def _extend_tag(self, element, django_tag, before=False, after=False):
         """
         Replace html attribute from bss to django template tag.
         Used for tag with opening and closing part : if, for, block, etc.
         """
         bss_attribute = self._convert_bss_attribute(django_tag)
         close_tag = f"{{% end{django_tag} %}}"
-        for element in self.tree.select(f'[{bss_attribute}]'):
-            #Create content of django template tag
-            #with value in html tags attributes
-            attribute_value = element.attrs.pop(bss_attribute)
-            open_tag = f"{{% {django_tag} {attribute_value} %}}"
 
-            #Insert element in tree
-            if before:
-                element.insert_before(open_tag)
-            if after:
-                element.insert_after(close_tag)
+        #Create content of django template tag
+        #with value in html tags attributes
+        attribute_value = element.attrs.pop(bss_attribute)
+        open_tag = f"{{% {django_tag} {attribute_value} %}}"
 
-    def _convert_bss_link(self, file_link):
+        #Insert element in tree
+        if before:
+            element.insert_before(open_tag)
+        if after:
+            element.insert_after(close_tag)
+
+    def _cache_fragment(self, element):
+        """
+        Wrap element in a cache tag, with checked arguments.
+        Cache library is loaded just before the first cache tag.
+        """
+        bss_attribute = self._convert_bss_attribute(self.CACHE_TAG)
+        element.attrs[bss_attribute] = self._cache_arguments(
+                element.attrs[bss_attribute], self.htmlfile)
+
+        if not self.cache_loaded:
+            element.insert_before("{% load cache %}")
+            self.cache_loaded = True
+        self._extend_tag(element, self.CACHE_TAG, before=True, after=True)
+
+    @classmethod
+    def _cache_arguments(cls, value, htmlfile):
+        """
+        Check a dj-cache value against django cache tag syntax:
+        timeout in seconds, fragment name, variables the fragment
+        varies on, and optional `using="cache name"`.
+
+        Return arguments separated by single spaces, raise
+        ConversionError if they can't be rendered by django.
+        """
+        arguments = cls.CACHE_ARGUMENT.findall(value or "")
+        err_msg = f"file '{htmlfile}': invalid dj-cache '{value}', "
+        if len(arguments) < 2:
+            raise ConversionError(err_msg + \
+                    "expected a timeout and a fragment name")
+
+        timeout, fragment, *vary_on = arguments
+        if not timeout.isdigit() and \
+                not cls.CACHE_VARIABLE.fullmatch(timeout):
+            raise ConversionError(err_msg + \
+                    f"timeout '{timeout}' is not a number of seconds")
+        if not cls.CACHE_FRAGMENT.fullmatch(fragment):
+            raise ConversionError(err_msg + \
+                    f"invalid fragment name '{fragment}'")
+
+        if vary_on and vary_on[-1].startswith("using="):
+            cache_name = vary_on.pop()[len("using="):]
+            if not cls.CACHE_VARIABLE.fullmatch(cache_name):
+                raise ConversionError(err_msg + \
+                        f"invalid cache name '{cache_name}'")
+        for variable in vary_on:
+            if not cls.CACHE_VARIABLE.fullmatch(variable):
+                raise ConversionError(err_msg + \
+                        f"invalid variable '{variable}'")
+        return " ".join(arguments)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=65536)
+    def _convert_bss_link(file_link):
         """
         Change link pointed by static tag, file architecture
         of export is different from django.
 
+        Conversions are cached, shared by all files converted
+        by a process.
+
         In bss : file_type/app_name (ex: js/home)
         In django : app_name/file_type (ex: home/js)
+
+        Return None for external links, and links outside
+        of an application folder.
         """
+        if file_link.startswith(TagConverter.EXTERNAL_LINK):
+            return None
+
         #Remove file root
         if file_link.startswith("/"):
             file_link = file_link[1:]
 
         path = PurePath(file_link)
+        if len(path.parts) < 4:
+            return None
 
         app_name = path.parts[2]
         file_type = path.parts[1]
@@ -113,7 +628,7 @@ class TagConverter:
         new_path = PurePath(app_name) / file_type / "/".join(path.parts[3:])
         return str(new_path)
 
-    def _replace_static_links(self, tag_name):
+    def _replace_static_link(self, element):
         """
         Replace tag who will use django static files.
         
@@ -133,41 +648,63 @@ class TagConverter:
 
         static_template = '{{% static "{}" %}}'
 
-        for element in self.tree.select(tag_name):
-            attribute, link = find_ressource_attribute(element.attrs)
+        attribute, link = find_ressource_attribute(element.attrs)
 
-            if link.startswith("http"):
-                continue
+        converted_link = self._convert_bss_link(link)
+        if converted_link is None:
+            return
+        self.static_links.add(link)
+        element.attrs[attribute] = \
+                static_template.format(converted_link)
 
-            converted_link = self._convert_bss_link(link)
-            element.attrs[attribute] = \
-                    static_template.format(converted_link)
-
-    def _replace_ref(self):
+    def _replace_ref(self, element):
         """
         Insert variable reference in specified tags.
         """
         bss_attribute = self._convert_bss_attribute("ref")
-        for element in self.tree.select(f'[{bss_attribute}]'):
-            attribute_value = element.attrs.pop(bss_attribute)
-            variable = f"{{{{{attribute_value}}}}}"
-            element.insert(0, variable)
+        attribute_value = element.attrs.pop(bss_attribute)
+        variable = f"{{{{{attribute_value}}}}}"
+        element.insert(0, variable)
 
-    def _replace_background_img(self, raw_file):
+    @classmethod
+    def _convert_css_links(cls, css, static_links=None):
         """
-        Replace background-image css attribute inside
-        an html file. Change it to serve file according
+        Replace url() links of css code to serve file according
         to django architecture.
+
+        Quoted urls are supported, external links and data
+        uris are kept. Converted links are added to static_links set.
         """
         def url_convert(match):
             """
-            Use current filename and convert it to
-            a static link if needed.
+            Convert url to a static link if needed.
             """
-            url = match.group(1)
-            if not url.startswith("http"):
-                url = self._convert_bss_link(url)
-                url = f'{{% static "{url}" %}}'
-            return f"url({url})"
+            quote, url = match.group(1), match.group(2)
+            converted_link = cls._convert_bss_link(url)
+            if converted_link is None:
+                return match.group(0)
+            if static_links is not None:
+                static_links.add(url)
+
+            #Avoid quotes of css code inside the static tag
+            static_quote = "'" if '"' in css else '"'
+            return f"url({{% static {static_quote}{converted_link}" \
+                    f"{static_quote} %}})"
+
+        return cls.CSS_URL.sub(url_convert, css)
+
+    def _replace_style_links(self, element):
+        """
+        Convert css links of a style attribute or a style tag.
+        """
+        style = element.attrs.get("style")
+        if style and "url(" in style:
+            element.attrs["style"] = self._convert_css_links(style,
+                    self.static_links)
 
-        return re.sub("url\((.*?)\)", url_convert, raw_file)
+        if element.name == "style":
+            for string in list(element.contents):
+                if isinstance(string, NavigableString) and "url(" in string:
+                    converted = self._convert_css_links(string,
+                            self.static_links)
+                    string.replace_with(type(string)(converted))
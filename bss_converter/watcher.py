@@ -0,0 +1,219 @@
+import ctypes.util
+import ctypes
+import select
+import struct
+import errno
+import time
+import os
+
+class PollingWatcher:
+    """
+    Find modified files by comparing snapshots of a directory,
+    used when inotify is not available.
+    """
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        """
+        Map each file of the directory to its modification
+        time and size.
+        """
+        snapshot = {}
+        for directory, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                relative_path = os.path.relpath(path, self.directory)
+                snapshot[relative_path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """
+        Wait for modified files, at most timeout seconds or
+        forever if timeout is None.
+
+        Return the set of created, modified or deleted files, relative
+        to the watched directory.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+            snapshot = self._take_snapshot()
+            changed = {path for path in snapshot.keys() | \
+                    self.snapshot.keys() if \
+                    snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+
+            if changed or (deadline is not None and \
+                    time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """
+    Find modified files with linux inotify, watching every
+    sub directory of a directory.
+    """
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+            IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.libc = self._load_libc()
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        #Map watch descriptors to directory path
+        self.watches = {}
+        self._add_watches(directory)
+
+    @staticmethod
+    def _load_libc():
+        """
+        Load C library, raising OSError if inotify is not available.
+        """
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, "C library not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        return libc
+
+    def _add_watches(self, directory):
+        """
+        Watch a directory and all its sub directories.
+
+        Return files already existing in directories, which may have
+        been created before the watch.
+        """
+        existing = set()
+        for path, subdirs, filenames in os.walk(directory):
+            descriptor = self.libc.inotify_add_watch(self.fd,
+                    os.fsencode(path), self.WATCH_MASK)
+            if descriptor < 0:
+                raise OSError(ctypes.get_errno(), "inotify_add_watch "
+                        f"failed on '{path}'")
+            self.watches[descriptor] = path
+            existing.update(os.path.relpath(os.path.join(path, filename),
+                self.directory) for filename in filenames)
+        return existing
+
+    def _read_events(self):
+        """
+        Read available events, return modified files, or None
+        if the event queue overflowed and everything must be checked.
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, length = \
+                        self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length] \
+                        .rstrip(b"\0"))
+                offset += length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(descriptor, None)
+                    continue
+                if descriptor not in self.watches or not name:
+                    continue
+
+                path = os.path.join(self.watches[descriptor], name)
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO) and \
+                            os.path.isdir(path):
+                        changed.update(self._add_watches(path))
+                    continue
+                changed.add(os.path.relpath(path, self.directory))
+
+    def wait(self, timeout=None):
+        """
+        Wait for modified files, at most timeout seconds or
+        forever if timeout is None.
+
+        Return the set of created, modified or deleted files, relative
+        to the watched directory, or None when every file
+        must be checked.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = None
+            if deadline is not None:
+                delay = max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], delay)
+            if not readable:
+                return set()
+
+            changed = self._read_events()
+            if changed is None or changed:
+                return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def create_watcher(directory, poll_interval=1.0):
+    """
+    Watch directory with inotify, or by polling when inotify
+    is not available.
+    """
+    try:
+        return InotifyWatcher(directory)
+    except OSError:
+        return PollingWatcher(directory, poll_interval)
+
+def watch(directory, callback, debounce=0.2, watcher=None):
+    """
+    Call callback each time files of directory are modified.
+
+    Bursts of events are batched, callback is called once no
+    event happened for `debounce` seconds, with the sorted list of
+    modified files, or None if every file must be checked.
+    """
+    watcher = watcher or create_watcher(directory)
+    try:
+        while True:
+            changed = watcher.wait()
+            while changed is not None:
+                events = watcher.wait(debounce)
+                if not events and events is not None:
+                    break
+                changed = None if events is None else changed | events
+
+            callback(None if changed is None else sorted(changed))
+    finally:
+        watcher.close()
@@ -1,6 +1,255 @@
 #!/usr/bin/env python3
 
 from bss_converter import TagConverter, FileManager
+from bss_converter.tag_converter import PARSERS, FORMATS, error_exit
+from bss_converter.file_manager import ENGINES, UNPLANNED_STAGES
+from bss_converter.watcher import watch, create_watcher
+from bss_converter.metrics import Metrics
+from bss_converter.daemon import ExportServer
+import argparse
+import signal
+import sys
+import os
+
+def parse_arguments(argv=None):
+    """
+    Read command line options of the export script, from
+    given arguments or from the command line.
+    """
+    parser = argparse.ArgumentParser(
+            description="Export a Bootstrap Studio design into "
+            "a django project.")
+    parser.add_argument("export_dir", nargs="?",
+            help="Bootstrap Studio export folder, current directory "
+            "by default")
+    parser.add_argument("--parser", choices=list(PARSERS),
+            help="html parser used by BeautifulSoup, fastest installed "
+            "parser by default (BSS_PARSER in env file)")
+    parser.add_argument("--engine", choices=list(ENGINES),
+            help="conversion engine, 'tree' (BeautifulSoup) by default, "
+            "'stream' keeps memory low on large pages "
+            "(BSS_ENGINE in env file)")
+    parser.add_argument("--format", choices=FORMATS, dest="output_format",
+            help="output of the tree engine, 'preserve' keeps page "
+            "formatting (default) apart from entities and attribute "
+            "quotes, 'prettify' re-indents pages (BSS_FORMAT in env file)")
+    parser.add_argument("-j", "--jobs", type=int,
+            help="number of processes converting html files, "
+            "number of cpus by default (BSS_JOBS in env file)")
+    parser.add_argument("--delete", action="store_true", default=None,
+            help="delete files of the django project removed from "
+            "the export (BSS_SYNC_DELETE in env file)")
+    parser.add_argument("--checksum", action="store_true", default=None,
+            help="compare file content instead of size and modification "
+            "time to find modified files (BSS_SYNC_CHECKSUM in env file)")
+    parser.add_argument("--hash-assets", action="store_true", default=None,
+            help="copy assets with a hash of their content in their "
+            "name, and use these names in templates "
+            "(BSS_HASH_ASSETS in env file)")
+    parser.add_argument("--compress", action="store_true", default=None,
+            help="write gzip variants of css, js and svg assets, and "
+            "brotli variants when brotli is installed "
+            "(BSS_COMPRESS in env file)")
+    parser.add_argument("--compress-min-size", type=int, metavar="BYTES",
+            help="smallest asset compressed, 512 bytes by default "
+            "(BSS_COMPRESS_MIN_SIZE in env file)")
+    parser.add_argument("--extract-layout", action="store_true",
+            default=None, help="move markup shared by all pages of an "
+            "application in a generated base.html template "
+            "(BSS_EXTRACT_LAYOUT in env file)")
+    parser.add_argument("--link-assets", action="store_true", default=None,
+            help="hard link assets in django projects instead of "
+            "copying them, when on the same filesystem as the export "
+            "(BSS_LINK_ASSETS in env file)")
+    parser.add_argument("--app", action="append", metavar="PATTERN",
+            dest="apps", help="only export applications matching this "
+            "glob pattern, can be given several times")
+    parser.add_argument("--page", action="append", metavar="PATTERN",
+            dest="pages", help="only export html files matching this "
+            "glob pattern, as `home/*.html`, with the assets of their "
+            "applications, can be given several times")
+    parser.add_argument("--plan", action="store_true",
+            help="print html files to convert and files to copy or "
+            "delete, without writing anything")
+    parser.add_argument("--watch", action="store_true",
+            help="keep running, and export again modified files "
+            "each time the export folder changes")
+    parser.add_argument("--debounce", type=float, default=0.2,
+            help="in watch mode, seconds without any change to wait "
+            "before exporting a burst of changes (default: 0.2)")
+    parser.add_argument("--daemon", metavar="SOCKET",
+            help="keep running, and export folders sent by "
+            "export_client.py on given unix socket")
+    parser.add_argument("--metrics", metavar="FILE",
+            help="write time and bytes of each stage, per file and "
+            "for the whole run, in a JSON file")
+    parser.add_argument("--prometheus", metavar="FILE",
+            help="write stages metrics in a prometheus textfile")
+    parser.add_argument("--profile", metavar="DIR",
+            help="write cProfile stats of the slowest html files "
+            "in given folder")
+    parser.add_argument("--profile-count", type=int, default=5,
+            help="number of profiled html files kept (default: 5)")
+    arguments = parser.parse_args(argv)
+    if arguments.plan and arguments.watch:
+        parser.error("--plan can't be used with --watch")
+    if arguments.daemon and (arguments.watch or arguments.plan):
+        parser.error("--daemon can't be used with --watch or --plan")
+    return arguments
+
+def export(arguments, changed=None):
+    """
+    Convert and copy the export folder to the django project,
+    and print a summary of the run.
+    """
+    metrics = None
+    if arguments.metrics or arguments.prometheus:
+        metrics = Metrics()
+
+    manager = FileManager(parser=arguments.parser, engine=arguments.engine,
+            jobs=arguments.jobs, delete=arguments.delete,
+            checksum=arguments.checksum, changed=changed, metrics=metrics,
+            profile_dir=arguments.profile,
+            profile_count=arguments.profile_count,
+            output_format=arguments.output_format, plan=arguments.plan,
+            hash_assets=arguments.hash_assets, compress=arguments.compress,
+            compress_min_size=arguments.compress_min_size,
+            extract_layout=arguments.extract_layout,
+            link_assets=arguments.link_assets, apps=arguments.apps,
+            pages=arguments.pages)
+
+    if arguments.plan:
+        print_plan(manager)
+        return
+
+    if arguments.metrics:
+        manager.metrics.write_json(arguments.metrics)
+    if arguments.prometheus:
+        manager.metrics.write_prometheus(arguments.prometheus)
+    print(f"{len(manager.converted)} html file(s) converted with "
+            f"{manager.jobs} job(s) ({len(manager.fast_path)} without "
+            f"anything to convert), {len(manager.skipped)} unchanged, "
+            f"{len(manager.removed_pages)} removed")
+    report = manager.sync_report
+    print(f"{len(report.copied)} file(s) copied ({report.bytes_copied} "
+            f"bytes), {len(report.unchanged)} unchanged, "
+            f"{len(report.deleted)} deleted")
+    print_transfers(report.transfers)
+    if manager.compress:
+        print(f"{len(manager.compressed)} compressed variant(s) written")
+    if manager.extract_layout:
+        print(f"base template extracted for {len(manager.layout_apps)} "
+                "application(s)")
+    print_dangling_links(manager.dangling_links)
+    print(f"export done in {manager.elapsed:.2f}s")
+
+def print_plan(manager):
+    """
+    Print every action of a planned export.
+    """
+    report = manager.sync_report
+    actions = [("convert", manager.converted),
+            ("remove", manager.removed_pages), ("copy", report.copied),
+            ("delete", report.deleted)]
+    for action, filenames in actions:
+        for filename in filenames:
+            print(f"{action:8} {filename}")
+    print(f"plan: {len(manager.converted)} html file(s) to convert, "
+            f"{len(manager.removed_pages)} removed, {len(report.copied)} "
+            f"file(s) to copy ({report.bytes_copied} bytes), "
+            f"{len(report.deleted)} to delete")
+    #Their files are planned as written by the previous export
+    for stage in manager.unplanned:
+        print(f"not planned: {UNPLANNED_STAGES[stage]} ({stage})")
+
+def print_transfers(transfers):
+    """
+    Print files and throughput of copies of each kind,
+    as templates, css or img, over the wall clock time of
+    their copies.
+    """
+    for kind, transfer in sorted(transfers.items()):
+        throughput = transfer["bytes"] / transfer["seconds"] / 1000000 \
+                if transfer["seconds"] else 0
+        print(f"  {kind}: {transfer['files']} file(s), {transfer['bytes']} "
+                f"bytes in {transfer['seconds']:.2f}s "
+                f"({throughput:.1f} MB/s)")
+
+def print_dangling_links(dangling_links):
+    """
+    Warn about every static link pointing to a missing asset.
+    """
+    if not dangling_links:
+        return
+    print(f"warning: {len(dangling_links)} static link(s) point to "
+            "missing assets:", file=sys.stderr)
+    for link, htmlfiles in sorted(dangling_links.items()):
+        print(f"  {link} (in {', '.join(htmlfiles)})", file=sys.stderr)
+
+def export_changes(arguments):
+    """
+    Return callback exporting modified files in watch mode,
+    an export error must not stop watching.
+    """
+    def callback(changed):
+        try:
+            export(arguments, changed)
+        except SystemExit:
+            pass
+        sys.stdout.flush()
+    return callback
+
+def export_request(argv):
+    """
+    Export a folder sent to the daemon, with the
+    options of the client.
+    """
+    arguments = parse_arguments(argv)
+    if arguments.watch or arguments.daemon:
+        error_exit("--watch and --daemon can't be sent to the daemon")
+    if arguments.export_dir:
+        os.chdir(arguments.export_dir)
+    export(arguments)
+
+def serve(socket_path):
+    """
+    Run exports sent on the socket until interrupted.
+    """
+    try:
+        server = ExportServer(socket_path, export_request)
+    except OSError as error:
+        error_exit(f"can't listen on '{socket_path}': {error}")
+    print(f"waiting for exports on {socket_path}")
+    sys.stdout.flush()
+
+    #Stop like on ctrl-c, removing the socket
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt()
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 if __name__ == "__main__":
-    FileManager()
+    arguments = parse_arguments()
+    if arguments.daemon:
+        serve(arguments.daemon)
+        exit(0)
+
+    if arguments.export_dir:
+        os.chdir(arguments.export_dir)
+
+    if arguments.watch:
+        #Start watching before the first export to miss no change
+        watcher = create_watcher(".")
+        callback = export_changes(arguments)
+        callback(None)
+        try:
+            watch(".", callback, arguments.debounce, watcher)
+        except KeyboardInterrupt:
+            pass
+    else:
+        export(arguments)
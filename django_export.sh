@@ -3,12 +3,18 @@
 SCRIPT_DIR=$(dirname $0)
 BSS_DIR=$1
 
-function load_venv()
+#Status of export_client.py when no daemon is listening
+NO_DAEMON=3
+
+function load_env()
 {
     local env_file=$SCRIPT_DIR/env
 
     source $env_file
+}
 
+function load_venv()
+{
     if [ -n "$VIRTUAL_ENV" ]
     then
         #Activate virtual env
@@ -16,9 +22,22 @@ function load_venv()
     fi
 }
 
+load_env
+
+#Send export to the converter daemon when it runs,
+#only the standard library is needed by the client
+if [ -n "$BSS_DAEMON_SOCKET" ] && [ -S "$BSS_DAEMON_SOCKET" ]
+then
+    python3 $SCRIPT_DIR/export_client.py "$BSS_DAEMON_SOCKET" "$1"
+    status=$?
+    if [ $status -ne $NO_DAEMON ]
+    then
+        exit $status
+    fi
+fi
+
 #Load virtual env if necessary
 load_venv
 
-#Run bss template converter
-cd $1
-python3 $SCRIPT_DIR/converter.py $1
+#Run bss template converter, moving itself to the export folder
+python3 $SCRIPT_DIR/converter.py "$1"
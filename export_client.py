@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Send an export to a converter daemon started with
+`converter.py --daemon SOCKET`, and print its output.
+
+Only the standard library is imported, to start fast. Exit status
+is the one of the export, or 3 when no daemon listens on the socket.
+"""
+import socket
+import json
+import sys
+import os
+
+#Exit status when the daemon can't be reached
+NO_DAEMON = 3
+
+def request_export(socket_path, export_dir, argv=(), stdout=None,
+        stderr=None):
+    """
+    Run an export in the daemon, writing its output as it comes.
+
+    Return exit status of the export, raise OSError when
+    the daemon can't be reached.
+    """
+    streams = {"stdout": stdout or sys.stdout,
+            "stderr": stderr or sys.stderr}
+    request = {
+        "cwd": os.path.abspath(export_dir),
+        "argv": list(argv),
+        #Variables of the env file, read again for each export
+        "environ": {name: value for name, value in os.environ.items() \
+                if name == "DJANGO_PROJECT" or name.startswith("BSS_")},
+    }
+
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("rb") as responses:
+            for line in responses:
+                message = json.loads(line)
+                if "status" in message:
+                    return message["status"]
+                for name, text in message.items():
+                    streams[name].write(text)
+                    streams[name].flush()
+
+    print("export_client.py: daemon closed the connection",
+            file=streams["stderr"])
+    return 1
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: export_client.py SOCKET EXPORT_DIR [OPTIONS...]",
+                file=sys.stderr)
+        exit(2)
+
+    try:
+        status = request_export(sys.argv[1], sys.argv[2], sys.argv[3:])
+    except (ConnectionError, FileNotFoundError) as error:
+        print(f"export_client.py: no daemon on '{sys.argv[1]}': {error}",
+                file=sys.stderr)
+        status = NO_DAEMON
+    exit(status)
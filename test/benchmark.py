@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the export on a synthetic Bootstrap Studio export.
+
+Time each conversion stage, and stages of whole exports (discovery,
+conversion, copy...), store results as JSON, and fail when throughput
+regressed compared to a saved baseline.
+
+Usage: python test/benchmark.py [--pages 50] [--baseline results.json]
+"""
+import argparse
+import tempfile
+import shutil
+import json
+import time
+import sys
+import os
+
+#Allow to run from any folder, as a standalone script
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.realpath(__file__))))
+
+from tree_generator import ExportGenerator
+from tree_generator.file_utils import Workdir
+from bss_converter import TagConverter, StreamConverter, FileManager
+from bss_converter.metrics import Metrics
+
+def measure(function, files, size, repeat, setup=None):
+    """
+    Run a benchmark stage `repeat` times, keep the fastest run.
+    Setup function is called before each run, and is not timed.
+
+    Return stage timing and throughput.
+    """
+    seconds = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        seconds.append(timed(function))
+    return throughput(min(seconds), files, size)
+
+def measure_export(jobs, files, size, repeat, setup=None):
+    """
+    Run whole exports like `measure`, also returning the time
+    of each stage of the fastest run, as recorded by metrics.
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        metrics = Metrics()
+        runs.append((timed(lambda: FileManager(jobs=jobs,
+            metrics=metrics)), metrics))
+    seconds, metrics = min(runs, key=lambda run: run[0])
+
+    result = throughput(seconds, files, size)
+    result["stages"] = {name: round(record["seconds"], 6) for \
+            name, record in sorted(metrics.stages.items())}
+    return result
+
+def throughput(seconds, files, size):
+    return {
+        "seconds": round(seconds, 6),
+        "files": files,
+        "bytes": size,
+        "files_per_second": round(files / seconds, 3) if seconds else 0,
+        "bytes_per_second": round(size / seconds, 3) if seconds else 0,
+    }
+
+def timed(function):
+    start_time = time.perf_counter()
+    function()
+    return time.perf_counter() - start_time
+
+def run_benchmark(options, directory):
+    """
+    Generate an export inside directory and time every stage.
+    """
+    generator = ExportGenerator(directory, apps=options.apps,
+            pages=options.pages, page_size=options.page_size,
+            density=options.density, assets=options.assets)
+    html_size = generator.generate()
+    html_count = options.apps * options.pages
+
+    pages = [os.path.join(app, f"page{index}.html") \
+            for app in generator.apps for index in range(options.pages)]
+    output_dir = os.path.join(directory, "bench_output")
+    build_dir = os.path.join(directory, "bench_build")
+    os.environ["DJANGO_PROJECT"] = generator.django_dir
+    os.environ["BSS_BUILD_DIR"] = build_dir
+
+    def convert_pages(converter, **kwargs):
+        for page in pages:
+            output = os.path.join(output_dir, page)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            converter(page, output=output, **kwargs)
+
+    def reset_export():
+        generator.reset_django()
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    results = {}
+    with Workdir(generator.export_dir):
+        results["tag_converter"] = measure(lambda: convert_pages(
+            TagConverter, parser=options.parser), html_count, html_size,
+            options.repeat)
+        results["tag_converter_prettify"] = measure(lambda: convert_pages(
+            TagConverter, parser=options.parser, output_format="prettify"),
+            html_count, html_size, options.repeat)
+        results["stream_converter"] = measure(lambda: convert_pages(
+            StreamConverter), html_count, html_size, options.repeat)
+        results["file_manager_cold"] = measure_export(options.jobs,
+                html_count, html_size, options.repeat, setup=reset_export)
+
+        results["file_manager_warm"] = measure_export(options.jobs,
+                html_count, html_size, options.repeat)
+
+    return results
+
+def check_regressions(results, baseline, threshold):
+    """
+    Compare throughput of each stage with a baseline.
+
+    Return a message for each stage slower than the baseline
+    by more than `threshold` (ratio).
+    """
+    regressions = []
+    for stage, reference in baseline.get("results", {}).items():
+        if stage not in results or not reference["files_per_second"]:
+            continue
+        ratio = results[stage]["files_per_second"] / \
+                reference["files_per_second"]
+        if ratio < 1 - threshold:
+            regressions.append(f"{stage}: {ratio:.0%} of baseline "
+                    f"throughput ({results[stage]['files_per_second']} "
+                    f"vs {reference['files_per_second']} files/s)")
+    return regressions
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=50,
+            help="html pages per application")
+    parser.add_argument("--page-size", type=int, default=20000,
+            help="approximate size of each page in bytes")
+    parser.add_argument("--density", type=float, default=0.2,
+            help="ratio of html elements using a dj-* attribute")
+    parser.add_argument("--assets", type=int, default=20,
+            help="files per asset type and application")
+    parser.add_argument("--parser", default=None)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3,
+            help="runs of each stage, fastest run is kept")
+    parser.add_argument("--output", default="bench_results.json",
+            help="JSON file receiving results")
+    parser.add_argument("--baseline",
+            help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+            help="allowed throughput loss compared to the baseline")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    options = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = run_benchmark(options, tmp_dir)
+
+    parameters = {name: getattr(options, name) for name in ["apps",
+        "pages", "page_size", "density", "assets", "parser", "jobs",
+        "repeat"]}
+    with open(options.output, "w") as output_stream:
+        json.dump({"parameters": parameters, "results": results},
+                output_stream, indent=2)
+
+    for stage, result in results.items():
+        print(f"{stage:20} {result['seconds']:10.4f}s "
+                f"{result['files_per_second']:10.1f} files/s "
+                f"{result['bytes_per_second'] / 1e6:8.2f} MB/s")
+        #Stages of files converted by worker processes are summed
+        for name, seconds in result.get("stages", {}).items():
+            print(f"  {name:28} {seconds:10.4f}s")
+
+    if options.baseline:
+        with open(options.baseline) as baseline_stream:
+            baseline = json.load(baseline_stream)
+        regressions = check_regressions(results, baseline,
+                options.threshold)
+        if regressions:
+            print("Throughput regression:\n  " + "\n  ".join(regressions),
+                    file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,36 @@
+import unittest
+import tempfile
+import os
+from pathlib import Path
+from bss_converter.assets import AssetIndex
+
+class AssetIndexTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.assets module.
+    """
+    def setUp(self):
+        self._oldpwd = os.getcwd()
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp_dir.name)
+        Path("assets", "img", "home").mkdir(parents=True)
+        Path("assets", "img", "home", "logo.png").touch()
+
+    def tearDown(self):
+        os.chdir(self._oldpwd)
+        self._tmp_dir.cleanup()
+
+    def test_links(self):
+        index = AssetIndex()
+        self.assertEqual(len(index), 1)
+        self.assertIn("assets/img/home/logo.png", index)
+        self.assertIn("/assets/img/home/./logo.png?v=2#top", index)
+        self.assertNotIn("assets/img/home/icon.png", index)
+
+    def test_missing_links(self):
+        index = AssetIndex()
+        links = ["assets/img/home/logo.png", "assets/img/home/icon.png"]
+        self.assertEqual(index.missing_links(links),
+                ["assets/img/home/icon.png"])
+
+    def test_missing_directory(self):
+        self.assertEqual(len(AssetIndex("missing")), 0)
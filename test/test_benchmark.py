@@ -0,0 +1,56 @@
+import unittest
+import tempfile
+import glob
+import os
+from unittest import mock
+from tree_generator import ExportGenerator
+from tree_generator.file_utils import Workdir
+from benchmark import check_regressions, measure_export
+
+class BenchmarkTest(unittest.TestCase):
+    """
+    Test suits for the benchmark tools.
+    """
+    def test_export_generator(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            generator = ExportGenerator(tmp_dir, apps=2, pages=3,
+                    page_size=2000, assets=2)
+            html_size = generator.generate()
+
+            pages = glob.glob(os.path.join(generator.export_dir, "*",
+                "*.html"))
+            self.assertEqual(len(pages), 6)
+            self.assertEqual(html_size, sum(map(os.path.getsize, pages)))
+            self.assertTrue(os.path.isfile(os.path.join(
+                generator.export_dir, "assets", "img", "app1",
+                "image1.png")))
+            self.assertTrue(os.path.isfile(os.path.join(
+                generator.django_dir, "project", "settings.py")))
+
+    def test_regressions(self):
+        baseline = {"results": {
+            "tag_converter": {"files_per_second": 100},
+            "stream_converter": {"files_per_second": 100},
+            }}
+        results = {
+            "tag_converter": {"files_per_second": 85},
+            "stream_converter": {"files_per_second": 70},
+            }
+        regressions = check_regressions(results, baseline, 0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("stream_converter"))
+
+    def test_export_stages(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.dict(os.environ):
+            generator = ExportGenerator(tmp_dir, apps=1, pages=2,
+                    page_size=2000, assets=1)
+            html_size = generator.generate()
+            os.environ["DJANGO_PROJECT"] = generator.django_dir
+            os.environ["BSS_BUILD_DIR"] = os.path.join(tmp_dir, "build")
+            with Workdir(generator.export_dir):
+                result = measure_export(1, 2, html_size, 1)
+
+        self.assertEqual(result["files"], 2)
+        for stage in ["discover_apps", "convert", "copy"]:
+            self.assertIn(stage, result["stages"])
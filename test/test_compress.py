@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import gzip
+import os
+from pathlib import Path
+from unittest import mock
+from bss_converter.compress import Precompressor, compress_content
+
+class PrecompressorTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.compress module.
+    """
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._tmp_dir.name, "css")
+        self.destination = os.path.join(self._tmp_dir.name, "compressed")
+
+        Path(self.source, "home").mkdir(parents=True)
+        self.content = b"body { margin: 0; }\n" * 100
+        Path(self.source, "home", "style.css").write_bytes(self.content)
+        Path(self.source, "home", "small.css").write_bytes(b"p {}")
+        Path(self.source, "home", "logo.png").write_bytes(self.content)
+        #Random bytes don't shrink once compressed
+        Path(self.source, "home", "random.js").write_bytes(os.urandom(2048))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def compress(self, jobs=1):
+        compressor = Precompressor(self.destination, min_size=100,
+                jobs=jobs)
+        compressor.compress(self.source)
+        return compressor
+
+    def test_compress(self):
+        compressor = self.compress(jobs=2)
+        variant = os.path.join(self.destination, "home", "style.css.gz")
+        self.assertIn(variant, compressor.compressed)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.destination,
+            "home"))), sorted(os.path.basename(filename) for filename in \
+                compressor.compressed))
+        with gzip.open(variant) as variant_stream:
+            self.assertEqual(variant_stream.read(), self.content)
+
+    def test_incremental(self):
+        self.compress()
+        compressor = self.compress()
+        self.assertEqual(compressor.compressed, [])
+        self.assertEqual(len(compressor.unchanged), 2)
+
+        os.unlink(os.path.join(self.source, "home", "style.css"))
+        self.compress()
+        self.assertFalse(Path(self.destination, "home", "style.css.gz") \
+                .exists())
+
+    def test_deterministic_gzip(self):
+        compressed = compress_content(self.content, "gzip")
+        with mock.patch("time.time", return_value=1e9):
+            self.assertEqual(compress_content(self.content, "gzip"),
+                    compressed)
+        self.assertEqual(gzip.decompress(compressed), self.content)
@@ -0,0 +1,100 @@
+import unittest
+import threading
+import tempfile
+import stat
+import io
+import os
+from unittest import mock
+from bss_converter.daemon import ExportServer
+from export_client import request_export
+
+class ExportServerTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.daemon module, with
+    export_client.py as client.
+    """
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self._tmp_dir.name, "bss.sock")
+        self.requests = []
+        self.server = ExportServer(self.socket_path, self.export)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self._tmp_dir.cleanup()
+
+    def export(self, argv):
+        """
+        Fake export, printing its request.
+        """
+        self.requests.append((argv, os.getcwd(),
+            os.environ.get("BSS_PARSER")))
+        print("exported", *argv)
+        if "--fail" in argv:
+            exit(4)
+        if "--crash" in argv:
+            raise ValueError("broken export")
+
+    def request(self, argv=(), environ=None):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch.dict(os.environ, environ or {}):
+            status = request_export(self.socket_path, self._tmp_dir.name,
+                    argv, stdout, stderr)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_export(self):
+        cwd = os.getcwd()
+        status, stdout, _ = self.request(["--jobs", "2"],
+                {"BSS_PARSER": "html.parser", "HOME": "/nowhere"})
+        self.assertEqual((status, stdout), (0, "exported --jobs 2\n"))
+        self.assertEqual(self.requests, [(["--jobs", "2"],
+            os.path.realpath(self._tmp_dir.name), "html.parser")])
+
+        #Directory and variables of the daemon are restored
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertNotEqual(os.environ.get("HOME"), "/nowhere")
+
+    def test_variables_removed(self):
+        """
+        Export variables of the daemon missing from the
+        client are not used.
+        """
+        with mock.patch.dict(os.environ, {"BSS_PARSER": "lxml"}):
+            status = self.server.run_request({"cwd": self._tmp_dir.name,
+                "environ": {"PATH": "/nowhere"}}, io.StringIO(),
+                io.StringIO())
+            self.assertEqual(os.environ["BSS_PARSER"], "lxml")
+        self.assertEqual(status, 0)
+        self.assertIsNone(self.requests[0][2])
+        self.assertNotEqual(os.environ["PATH"], "/nowhere")
+
+    def test_exit_status(self):
+        self.assertEqual(self.request(["--fail"])[0], 4)
+
+        status, _, stderr = self.request(["--crash"])
+        self.assertEqual(status, 1)
+        self.assertIn("ValueError: broken export", stderr)
+
+        #Daemon keeps running after a failing export
+        self.assertEqual(self.request()[0], 0)
+
+    def test_socket(self):
+        mode = os.stat(self.socket_path).st_mode
+        self.assertTrue(stat.S_ISSOCK(mode))
+        self.assertEqual(stat.S_IMODE(mode) & 0o077, 0)
+
+        with self.assertRaises(OSError):
+            ExportServer(self.socket_path, self.export)
+
+    def test_stale_socket(self):
+        socket_path = os.path.join(self._tmp_dir.name, "stale.sock")
+        server = ExportServer(socket_path, self.export)
+        #Socket left by a killed daemon
+        server.socket.close()
+        server = ExportServer(socket_path, self.export)
+        server.server_close()
+        self.assertFalse(os.path.exists(socket_path))
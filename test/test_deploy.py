@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import time
+import os
+from pathlib import Path
+from unittest import mock
+from bss_converter import deploy
+from bss_converter.deploy import StagedDeployment
+
+class StagedDeploymentTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.deploy module.
+    """
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._tmp_dir.name, "source")
+        self.folder = os.path.join(self._tmp_dir.name, "static", "home")
+
+        Path(self.source).mkdir()
+        Path(self.source, "style.css").write_text("body {}")
+        Path(self.folder, "css").mkdir(parents=True)
+        Path(self.folder, "css", "old.css").write_text("p {}")
+        Path(self.folder, "kept.txt").write_text("kept")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def create_deployment(self, delete=False):
+        deployment = StagedDeployment(delete)
+        deployment.add(self.source, self.folder, "css")
+        return deployment
+
+    def test_plan(self):
+        report = self.create_deployment(delete=True).plan()
+        self.assertEqual(report.copied,
+                [os.path.join(self.folder, "css", "style.css")])
+        self.assertEqual(report.deleted,
+                [os.path.join(self.folder, "css", "old.css")])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.folder,
+            "css"))), ["old.css"])
+
+    def test_deploy(self):
+        kept_inode = os.stat(os.path.join(self.folder, "kept.txt")).st_ino
+        report = self.create_deployment().deploy()
+
+        self.assertEqual(len(report.copied), 1)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.folder,
+            "css"))), ["old.css", "style.css"])
+        #Untouched files are hard linked, staging folder is removed
+        self.assertEqual(os.stat(os.path.join(self.folder,
+            "kept.txt")).st_ino, kept_inode)
+        self.assertEqual(os.listdir(os.path.dirname(self.folder)), ["home"])
+
+    def test_failure_keeps_folder(self):
+        with mock.patch("bss_converter.sync.copy_file",
+                side_effect=OSError("disk full")), \
+                self.assertRaises(OSError):
+            self.create_deployment(delete=True).deploy()
+
+        self.assertEqual(sorted(os.listdir(os.path.join(self.folder,
+            "css"))), ["old.css"])
+        self.assertEqual(os.listdir(os.path.dirname(self.folder)), ["home"])
+
+    def test_swap_without_exchange(self):
+        with mock.patch.object(deploy, "_renameat2", None):
+            self.create_deployment().deploy()
+        self.assertTrue(Path(self.folder, "css", "style.css").is_file())
+        self.assertEqual(os.listdir(os.path.dirname(self.folder)), ["home"])
+
+    def test_remove(self):
+        deployment = StagedDeployment()
+        deployment.remove(self.folder, os.path.join(self.folder, "kept.txt"))
+        report = deployment.deploy()
+        self.assertEqual(report.deleted,
+                [os.path.join(self.folder, "kept.txt")])
+        self.assertFalse(Path(self.folder, "kept.txt").exists())
+
+    def test_parallel_copies(self):
+        """
+        Files are copied by a shared pool of threads, and
+        reported with the kind of their folder.
+        """
+        for index in range(20):
+            Path(self.source, f"{index}.css").write_text("p {}")
+        deployment = StagedDeployment(jobs=4)
+        deployment.add(self.source, self.folder, "css", kind="css")
+        start_time = time.perf_counter()
+        report = deployment.deploy()
+        seconds = time.perf_counter() - start_time
+
+        self.assertEqual(len(report.copied), 21)
+        self.assertEqual(len(os.listdir(os.path.join(self.folder, "css"))),
+                22)
+        self.assertEqual(list(report.transfers), ["css"])
+        self.assertEqual(report.transfers["css"]["files"], 21)
+        self.assertEqual(report.transfers["css"]["bytes"], 87)
+        #Wall clock time of copies, not summed over threads
+        self.assertLessEqual(report.transfers["css"]["seconds"], seconds)
+
+        with mock.patch("bss_converter.sync.copy_file",
+                side_effect=OSError("disk full")), \
+                self.assertRaises(OSError):
+            Path(self.source, "style.css").write_text("body {margin: 0}")
+            deployment.deploy()
+        self.assertEqual(os.listdir(os.path.dirname(self.folder)), ["home"])
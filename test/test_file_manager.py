@@ -1,6 +1,12 @@
 import unittest
 from pathlib import Path
+from unittest import mock
 from tree_generator import TreeScript
+from bss_converter import FileManager
+import converter
+import contextlib
+import tempfile
+import io
 import os
 
 class FileManagerTest(unittest.TestCase):
@@ -12,10 +18,12 @@ class FileManagerTest(unittest.TestCase):
     def setUp(self):
         self._oldpwd = os.getcwd()
         os.chdir(self.TEST_FOLDER)
+        #Projects of each test are set in environment, restored after it
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
 
     def tearDown(self):
-        result = self.defaultTestResult()
-        self._feedErrorsToResult(result, self._outcome.errors)
         os.chdir(self._oldpwd)
 
     def log_error(self, script_file, result_tree, reference_tree):
@@ -73,3 +81,426 @@ class FileManagerTest(unittest.TestCase):
         self.run_script("mixed", "subfolders")
         self.run_script("mixed", "multiple_assets_type")
         self.run_script("mixed", "multiple_assets_type_multiple_app")
+
+    def create_project(self, tmp_dir, apps):
+        """
+        Create an empty django project with given applications
+        and an export folder, and move to the export folder.
+        """
+        django_dir = os.path.join(tmp_dir, "django")
+        Path(django_dir, "django").mkdir(parents=True)
+        Path(django_dir, "django", "settings.py").touch()
+        for application in apps:
+            Path(django_dir, application).mkdir()
+
+        os.environ["DJANGO_PROJECT"] = django_dir
+        os.environ["BSS_BUILD_DIR"] = os.path.join(tmp_dir, "build")
+
+        Path(tmp_dir, "export").mkdir()
+        os.chdir(os.path.join(tmp_dir, "export"))
+        return django_dir
+
+    def test_conversion_errors(self):
+        """
+        Every failing html file is reported, and nothing
+        is copied to the django project.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+
+            Path("home").mkdir()
+            for filename in ["home/broken.html", "home/invalid.html"]:
+                Path(filename).write_bytes(b"<p>\xff\xfe</p>")
+            Path("home/index.html").touch()
+
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr), \
+                    self.assertRaises(SystemExit):
+                FileManager(jobs=2)
+
+            self.assertIn("home/broken.html", stderr.getvalue())
+            self.assertIn("home/invalid.html", stderr.getvalue())
+            self.assertEqual(os.listdir(os.path.join(django_dir, "home")),
+                    [])
+
+    def test_incremental_export(self):
+        """
+        Only html files modified since the last export are
+        converted, removed files are deleted from the project.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            templates = os.path.join(django_dir, "home", "templates", "home")
+
+            Path("home").mkdir()
+            Path("home/index.html").write_text("<p>index</p>")
+            Path("home/about.html").write_text("<p>about</p>")
+
+            manager = FileManager(jobs=1)
+            self.assertEqual(manager.converted,
+                    ["home/about.html", "home/index.html"])
+            self.assertEqual(manager.fast_path, manager.converted)
+
+            manager = FileManager(jobs=1)
+            self.assertEqual(manager.converted, [])
+            self.assertEqual(len(manager.skipped), 2)
+
+            #Only listed modified files are checked
+            Path("home/index.html").write_text("<p dj-ref=user>index</p>")
+            manager = FileManager(jobs=1, changed=["home/about.html"])
+            self.assertEqual(manager.converted, [])
+
+            os.unlink("home/about.html")
+            manager = FileManager(jobs=1)
+            self.assertEqual(manager.converted, ["home/index.html"])
+            self.assertEqual(sorted(os.listdir(templates)), ["index.html"])
+            self.assertIn("{{user}}",
+                    Path(templates, "index.html").read_text())
+
+    def test_linked_cache_dir(self):
+        """
+        Converted files of a build folder reached through a
+        symbolic link are deployed when their page changed.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            templates = os.path.join(django_dir, "home", "templates", "home")
+            del os.environ["BSS_BUILD_DIR"]
+            Path(tmp_dir, "cache").mkdir()
+            os.symlink(os.path.join(tmp_dir, "cache"),
+                    os.path.join(tmp_dir, "linked_cache"))
+            os.environ["XDG_CACHE_HOME"] = os.path.join(tmp_dir,
+                    "linked_cache")
+            Path("home").mkdir()
+            Path("home/index.html").write_text("<p>index</p>")
+
+            manager = FileManager(jobs=1)
+            self.assertEqual(os.path.commonpath([manager.build_dir,
+                os.path.realpath(tmp_dir)]), os.path.realpath(tmp_dir))
+            self.assertNotIn("linked_cache", manager.build_dir)
+
+            Path("home/index.html").write_text("<p dj-ref=user>index</p>")
+            manager = FileManager(jobs=1, changed=["home/index.html"])
+            self.assertEqual(manager.converted, ["home/index.html"])
+            self.assertIn("{{user}}",
+                    Path(templates, "index.html").read_text())
+
+            #Folders next to the build folder are not part of it
+            sibling = manager.build_dir + "-old"
+            manager.changed = [os.path.join(sibling, "index.html")]
+            self.assertTrue(manager._is_modified(sibling))
+
+    def test_rules_change(self):
+        """
+        Every html file is converted again when conversion
+        rules changed, with the same version.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.create_project(tmp_dir, ["home"])
+            Path("home").mkdir()
+            Path("home/index.html").write_text("<p>index</p>")
+
+            FileManager(jobs=1)
+            self.assertEqual(FileManager(jobs=1).converted, [])
+            with mock.patch("bss_converter.manifest.rules_digest",
+                    return_value="changed"):
+                manager = FileManager(jobs=1)
+            self.assertEqual(manager.converted, ["home/index.html"])
+
+    def test_dangling_links(self):
+        """
+        Static links to missing assets are reported with their
+        pages, including pages unchanged since the last export.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.create_project(tmp_dir, ["home"])
+
+            Path("assets/css/home").mkdir(parents=True)
+            Path("assets/css/home/style.css").touch()
+            Path("home").mkdir()
+            Path("home/index.html").write_text(
+                '<link href="assets/css/home/style.css">'
+                '<img src="assets/img/home/logo.png">')
+            Path("home/about.html").write_text(
+                '<div style="background: url(assets/img/home/logo.png)">'
+                '</div><a href="https://example.com/a/b/c.png"></a>')
+
+            manager = FileManager(jobs=1)
+            self.assertEqual(manager.dangling_links,
+                    {"assets/img/home/logo.png":
+                        ["home/about.html", "home/index.html"]})
+
+            manager = FileManager(jobs=1)
+            self.assertEqual(manager.converted, [])
+            self.assertEqual(len(manager.dangling_links), 1)
+
+            Path("assets/img/home").mkdir(parents=True)
+            Path("assets/img/home/logo.png").touch()
+            manager = FileManager(jobs=1)
+            self.assertEqual(manager.dangling_links, {})
+
+    def test_plan(self):
+        """
+        Planned export lists files to convert and copy, without
+        writing anything.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            Path("home").mkdir()
+            Path("home/index.html").write_text("<p>index</p>")
+            Path("assets/css/home").mkdir(parents=True)
+            Path("assets/css/home/style.css").write_text("p {}")
+
+            manager = FileManager(jobs=1, plan=True)
+            self.assertEqual(manager.converted, ["home/index.html"])
+            self.assertEqual(sorted(manager.sync_report.copied), [
+                os.path.join(django_dir, "home", "static", "home", "css",
+                    "style.css"),
+                os.path.join(django_dir, "home", "templates", "home",
+                    "index.html")])
+            self.assertEqual(os.listdir(os.path.join(django_dir, "home")),
+                    [])
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "build")))
+
+            FileManager(jobs=1)
+            manager = FileManager(jobs=1, plan=True)
+            self.assertEqual(manager.converted, [])
+            self.assertEqual(manager.sync_report.copied, [])
+
+    def test_plan_unplanned_stages(self):
+        """
+        Plans list stages writing the build folder they
+        don't plan, and count removed pages.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.create_project(tmp_dir, ["home"])
+            Path("home").mkdir()
+            Path("home/index.html").write_text("<p>index</p>")
+            Path("home/about.html").write_text("<p>about</p>")
+            Path("assets/img/home").mkdir(parents=True)
+            Path("assets/img/home/a.png").write_bytes(b"png")
+
+            manager = FileManager(jobs=1, plan=True)
+            self.assertEqual(manager.unplanned, [])
+
+            FileManager(jobs=1, extract_layout=True, hash_assets=True)
+            os.unlink("home/about.html")
+            manager = FileManager(jobs=1, plan=True, extract_layout=True,
+                    hash_assets=True)
+            self.assertEqual(manager.unplanned,
+                    ["extract_layout", "hash_assets"])
+            self.assertEqual(manager.removed_pages, ["home/about.html"])
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                converter.print_plan(manager)
+            self.assertIn("remove   home/about.html", output.getvalue())
+            self.assertIn("not planned: hashed copies of assets and the "
+                    "list of their names (hash_assets)", output.getvalue())
+
+    def test_multiple_projects(self):
+        """
+        Pages are converted once, and deployed in each
+        django project having their application.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first_dir = self.create_project(tmp_dir, ["home"])
+            second_dir = os.path.join(tmp_dir, "second")
+            Path(second_dir, "settings").mkdir(parents=True)
+            Path(second_dir, "settings", "settings.py").touch()
+            Path(second_dir, "home").mkdir()
+            Path(second_dir, "blog").mkdir()
+            os.environ["DJANGO_PROJECT"] = os.pathsep.join([first_dir,
+                second_dir])
+
+            for app in ["home", "blog"]:
+                Path(app).mkdir()
+                Path(app, "index.html").write_text(f"<p>{app}</p>")
+            Path("assets/css/home").mkdir(parents=True)
+            Path("assets/css/home/style.css").write_text("p {}")
+
+            manager = FileManager(jobs=2, link_assets=True)
+            self.assertEqual(manager.converted,
+                    ["blog/index.html", "home/index.html"])
+            self.assertEqual(sorted(os.listdir(first_dir)),
+                    ["django", "home"])
+            for django_dir in [first_dir, second_dir]:
+                template = Path(django_dir, "home", "templates", "home",
+                        "index.html")
+                self.assertIn("<p>home</p>", template.read_text())
+                style = os.path.join(django_dir, "home", "static", "home",
+                        "css", "style.css")
+                self.assertTrue(os.path.samefile(style,
+                    "assets/css/home/style.css"))
+            self.assertTrue(Path(second_dir, "blog", "templates", "blog",
+                "index.html").is_file())
+
+            os.unlink("home/index.html")
+            manager = FileManager(jobs=2, delete=True)
+            self.assertEqual(len(manager.removed), 3)
+            for django_dir in [first_dir, second_dir]:
+                self.assertEqual(os.listdir(os.path.join(django_dir, "home",
+                    "templates", "home")), [])
+
+    def test_selective_export(self):
+        """
+        Only selected applications and pages are exported,
+        other pages are neither converted nor removed.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home", "blog"])
+            for app in ["home", "blog"]:
+                Path(app).mkdir()
+                Path(app, "index.html").write_text(f"<p>{app}</p>")
+                Path("assets/css", app).mkdir(parents=True)
+                Path("assets/css", app, "style.css").write_text("p {}")
+            Path("home/about.html").write_text("<p>about</p>")
+
+            manager = FileManager(jobs=1, apps=["bl*"])
+            self.assertEqual(manager.converted, ["blog/index.html"])
+            self.assertEqual(manager.apps[django_dir], ["blog"])
+            self.assertTrue(Path(django_dir, "blog", "static", "blog",
+                "css", "style.css").is_file())
+            self.assertFalse(Path(django_dir, "home", "static").exists())
+            self.assertFalse(Path(django_dir, "home", "templates").exists())
+
+            manager = FileManager(jobs=1, pages=["home/index.html"])
+            self.assertEqual(manager.converted, ["home/index.html"])
+            self.assertEqual(manager.removed, [])
+            self.assertEqual(manager.apps[django_dir], ["home"])
+            self.assertEqual(os.listdir(os.path.join(django_dir, "home",
+                "templates", "home")), ["index.html"])
+
+            os.unlink("blog/index.html")
+            manager = FileManager(jobs=1, pages=["home/*"])
+            self.assertEqual(manager.converted, ["home/about.html"])
+            self.assertEqual(manager.removed, [])
+            self.assertEqual(sorted(os.listdir(os.path.join(django_dir,
+                "home", "templates", "home"))),
+                ["about.html", "index.html"])
+
+    def test_rewrite_stylesheets(self):
+        """
+        Url of deployed stylesheets follow the django layout,
+        with hashed names when enabled.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            Path("assets/css/home").mkdir(parents=True)
+            Path("assets/css/home/style.css").write_text(
+                    "p { background: url('../../img/home/a.png') }")
+            Path("assets/img/home").mkdir(parents=True)
+            Path("assets/img/home/a.png").write_bytes(b"png")
+            style = Path(django_dir, "home", "static", "home", "css",
+                    "style.css")
+
+            manager = FileManager(jobs=1)
+            self.assertEqual(len(manager.rewritten_css), 1)
+            self.assertEqual(style.read_text(),
+                    "p { background: url('../img/a.png') }")
+
+            FileManager(jobs=1, hash_assets=True)
+            hashed_style, = style.parent.glob("style.*.css")
+            self.assertRegex(hashed_style.read_text(),
+                    r"url\('\.\./img/a\.[0-9a-f]{12}\.png'\)")
+
+    def test_asset_types(self):
+        """
+        Every asset folder of the export is deployed, copies
+        being reported by kind.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            Path("home").mkdir()
+            Path("home/index.html").write_text("<p>home</p>")
+            for asset_type, filename in [("fonts", "a.woff"),
+                    ("img", "a.png"), ("css", "a.css")]:
+                Path("assets", asset_type, "home").mkdir(parents=True)
+                Path("assets", asset_type, "home", filename).write_bytes(
+                        b"asset")
+
+            manager = FileManager(jobs=2)
+            self.assertTrue(Path(django_dir, "home", "static", "home",
+                "fonts", "a.woff").is_file())
+            self.assertEqual(sorted(manager.sync_report.transfers),
+                    ["css", "fonts", "img", "templates"])
+            self.assertEqual(manager.sync_report.transfers["fonts"]["bytes"],
+                    5)
+
+    def test_hash_assets(self):
+        """
+        Assets are deployed with hashed names, used by templates.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            Path("home").mkdir()
+            Path("home/index.html").write_text(
+                    '<script src="assets/js/home/app.js"></script>')
+            Path("assets/js/home").mkdir(parents=True)
+            Path("assets/js/home/app.js").write_text("run();")
+
+            FileManager(jobs=1, hash_assets=True)
+            static_dir = os.path.join(django_dir, "home", "static", "home",
+                    "js")
+            template = Path(django_dir, "home", "templates", "home",
+                    "index.html")
+            self.assertEqual(sorted(os.listdir(static_dir)),
+                    ["app.b22741f5b439.js", "app.js"])
+            self.assertIn("home/js/app.b22741f5b439.js", template.read_text())
+            self.assertTrue(Path(django_dir, "staticfiles.json").is_file())
+
+            #Unchanged page is written again with the new asset name
+            Path("assets/js/home/app.js").write_text("run(1);")
+            manager = FileManager(jobs=1, hash_assets=True, delete=True)
+            self.assertEqual(manager.converted, [])
+            self.assertEqual(len(os.listdir(static_dir)), 2)
+            self.assertNotIn("home/js/app.b22741f5b439.js",
+                    template.read_text())
+
+    def test_compress(self):
+        """
+        Compressed variants are deployed next to their asset.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            Path("assets/js/home").mkdir(parents=True)
+            Path("assets/js/home/app.js").write_text("run();\n" * 200)
+
+            manager = FileManager(jobs=1, compress=True)
+            self.assertEqual(len(manager.compressed), len(
+                manager.sync_report.copied) - 1)
+            self.assertTrue(Path(django_dir, "home", "static", "home", "js",
+                "app.js.gz").is_file())
+
+            manager = FileManager(jobs=1, compress=True, delete=True)
+            self.assertEqual(manager.compressed, [])
+            self.assertEqual(manager.sync_report.deleted, [])
+
+    def test_extract_layout(self):
+        """
+        Pages of an application extend a generated base template.
+        """
+        page = '<!DOCTYPE html>\n<html>\n<head><title>Site</title></head>\n' \
+                '<body>\n<nav>menu</nav>\n{}\n<footer>f</footer>\n' \
+                '</body>\n</html>\n'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            django_dir = self.create_project(tmp_dir, ["home"])
+            templates = os.path.join(django_dir, "home", "templates", "home")
+            Path("home").mkdir()
+            Path("home/index.html").write_text(page.format("<p>index</p>"))
+            Path("home/about.html").write_text(page.format("<p>about</p>"))
+
+            manager = FileManager(jobs=1, extract_layout=True,
+                    hash_assets=True)
+            self.assertEqual(manager.layout_apps, ["home"])
+            self.assertEqual(sorted(os.listdir(templates)),
+                    ["about.html", "base.html", "index.html"])
+            self.assertIn("<nav>menu</nav>",
+                    Path(templates, "base.html").read_text())
+            self.assertNotIn("<nav>menu</nav>",
+                    Path(templates, "index.html").read_text())
+
+            manager = FileManager(jobs=1, extract_layout=True,
+                    hash_assets=True)
+            self.assertEqual(manager.layout_apps, ["home"])
+            self.assertEqual(manager.sync_report.copied, [])
@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+import json
+import os
+from pathlib import Path
+from bss_converter.fingerprint import HashedAssets
+
+class HashedAssetsTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.fingerprint module.
+    """
+    def setUp(self):
+        self._oldpwd = os.getcwd()
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp_dir.name)
+        self.build_dir = os.path.join(self._tmp_dir.name, "build")
+
+        Path("assets/img/home").mkdir(parents=True)
+        Path("assets/css/home").mkdir(parents=True)
+        Path("assets/img/home/logo.png").write_bytes(b"logo")
+        Path("assets/css/home/style.css").write_text(
+                "a { background: url('../../img/home/logo.png?v=1'); }")
+
+    def tearDown(self):
+        os.chdir(self._oldpwd)
+        self._tmp_dir.cleanup()
+
+    def build(self):
+        assets = HashedAssets(self.build_dir)
+        assets.build()
+        return assets
+
+    def test_hashed_names(self):
+        assets = self.build()
+        logo = assets.paths["home/img/logo.png"]
+        self.assertEqual(logo, "home/img/logo.96d6f2e7e1f7.png")
+
+        css = assets.paths["home/css/style.css"]
+        css_content = Path(self.build_dir, "assets", "css", "home",
+                os.path.basename(css)).read_text()
+        self.assertIn("url('../../img/home/logo.96d6f2e7e1f7.png?v=1')",
+                css_content)
+        self.assertTrue(Path(self.build_dir, "assets/css/home/style.css") \
+                .is_file())
+
+        with open(os.path.join(self.build_dir, "staticfiles.json")) as \
+                manifest_stream:
+            manifest = json.load(manifest_stream)
+        self.assertEqual(manifest, {"paths": assets.paths, "version": "1.0"})
+
+    def test_changed_names(self):
+        self.build()
+        self.assertEqual(self.build().changed, set())
+
+        Path("assets/img/home/logo.png").write_bytes(b"new logo")
+        assets = self.build()
+        #Css pointing to the logo changes too
+        self.assertEqual(assets.changed,
+                {"home/img/logo.png", "home/css/style.css"})
+        self.assertEqual(sorted(os.listdir(os.path.join(self.build_dir,
+            "assets", "img", "home"))), sorted(["logo.png",
+                os.path.basename(assets.paths["home/img/logo.png"])]))
+
+    def test_rewrite_template(self):
+        assets = self.build()
+        Path("page.html").write_text('<img src="{% static "home/img/logo.png" '
+                '%}"><a href="{% static \'home/js/missing.js\' %}">')
+        assets.rewrite_template("page.html", "out/page.html")
+        self.assertEqual(Path("out/page.html").read_text(),
+                '<img src="{% static "home/img/logo.96d6f2e7e1f7.png" %}">'
+                '<a href="{% static \'home/js/missing.js\' %}">')
@@ -0,0 +1,75 @@
+import unittest
+from bss_converter.layout import LayoutExtractor
+
+class LayoutExtractorTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.layout module.
+    """
+    NAVBAR = '<nav class="navbar">\n    <a href="/">Home</a>\n  </nav>\n'
+
+    def page(self, title, content):
+        return '{% load static %}\n<!DOCTYPE html>\n<html>\n<head>\n' \
+                '  <meta charset="utf-8">\n' \
+                f'  <title>{title}</title>\n' \
+                '  <link rel="stylesheet" href="{% static "home/a.css" %}">\n' \
+                '</head>\n<body>\n' \
+                f'  {self.NAVBAR}  {content}\n' \
+                '  {% if user %}<footer>Footer</footer>{% endif %}\n' \
+                '</body>\n</html>\n'
+
+    def test_extract(self):
+        pages = {
+            "index.html": self.page("Index", "{% load humanize %}<p>1</p>"),
+            "about.html": self.page("About", "<p>about</p>"),
+        }
+        templates = LayoutExtractor("home", pages).extract()
+
+        self.assertEqual(templates["base.html"], '{% load static %}\n'
+                '<!DOCTYPE html>\n<html>\n<head>\n  <meta charset="utf-8">\n'
+                '  {% block bss_head %}{% endblock %}\n'
+                '  <link rel="stylesheet" href="{% static "home/a.css" %}">\n'
+                '</head>\n<body>\n'
+                f'  {self.NAVBAR}  {{% block bss_content %}}{{% endblock %}}\n'
+                '  {% if user %}<footer>Footer</footer>{% endif %}\n'
+                '</body>\n</html>\n')
+        self.assertEqual(templates["index.html"],
+                '{% extends "home/base.html" %}\n{% load static %}\n'
+                '{% load humanize %}\n'
+                '{% block bss_head %}<title>Index</title>{% endblock %}\n'
+                '{% block bss_content %}{% load humanize %}<p>1</p>'
+                '{% endblock %}\n')
+
+    def test_template_tags_not_cut(self):
+        pages = {
+            "index.html": self.page("Page", "{% if a %}<p>1</p>{% endif %}"),
+            "about.html": self.page("Page", "{% if a %}<p>2</p>{% endif %}"),
+        }
+        templates = LayoutExtractor("home", pages).extract()
+        self.assertIn("{% block bss_content %}{% if a %}<p>2</p>{% endif %}"
+                "{% endblock %}", templates["about.html"])
+
+    def test_no_layout(self):
+        fragment = {"index.html": "<p>1</p>", "about.html": "<p>2</p>"}
+        self.assertIsNone(LayoutExtractor("home", fragment).extract())
+
+        single = {"index.html": self.page("Index", "<p>1</p>")}
+        self.assertIsNone(LayoutExtractor("home", single).extract())
+
+        with_base = {"index.html": self.page("Index", "<p>1</p>"),
+                "base.html": self.page("Base", "<p>2</p>")}
+        self.assertIsNone(LayoutExtractor("home", with_base).extract())
+
+    def test_cache_not_cut(self):
+        """
+        A cache tag shared by all pages stays in the content
+        block, with its closing tag.
+        """
+        pages = {name: '{% load cache %}' + self.page("Page",
+            '{% cache 500 grid %}<div class="grid">'
+            f'<p>{name}</p></div>{{% endcache %}}') for name in \
+                    ["index.html", "about.html"]}
+        templates = LayoutExtractor("home", pages).extract()
+        self.assertNotIn("cache 500", templates["base.html"])
+        self.assertIn('{% block bss_content %}{% cache 500 grid %}'
+                '<div class="grid"><p>about.html</p></div>{% endcache %}'
+                '{% endblock %}', templates["about.html"])
@@ -0,0 +1,172 @@
+import unittest
+import importlib.util
+import tempfile
+import os
+from pathlib import Path
+from bss_converter.live import ConvertedPages, RewrittenStylesheets, \
+        export_asset, list_assets
+
+class ExportFixture:
+    """
+    Export folder with a page and an asset.
+    """
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.export_dir = self._tmp_dir.name
+        Path(self.export_dir, "home").mkdir()
+        self.page = Path(self.export_dir, "home", "index.html")
+        self.page.write_text('<p dj-if="user">Hello</p>'
+                '<img src="assets/img/home/logo.png">')
+        Path(self.export_dir, "assets", "img", "home").mkdir(parents=True)
+        Path(self.export_dir, "assets", "img", "home", "logo.png").touch()
+        Path(self.export_dir, "assets", "css", "home").mkdir(parents=True)
+        self.stylesheet = Path(self.export_dir, "assets", "css", "home",
+                "style.css")
+        self.stylesheet.write_text(
+                "p { background: url(../../img/home/logo.png) }")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+class LiveExportTest(ExportFixture, unittest.TestCase):
+    """
+    Test suits for bss_converter.live module.
+    """
+    def test_export_asset(self):
+        self.assertEqual(export_asset("home/js/app/main.js"),
+                "assets/js/home/app/main.js")
+        self.assertEqual(export_asset("home/fonts/a.woff"),
+                "assets/fonts/home/a.woff")
+        for static_name in ["home/app.js", "../home/js/app.js",
+                "/home/js/app.js", "home/js/../a"]:
+            self.assertIsNone(export_asset(static_name))
+        self.assertEqual(list(list_assets(self.export_dir)),
+                [("home/css/style.css", "assets/css/home/style.css"),
+                    ("home/img/logo.png", "assets/img/home/logo.png")])
+
+    def test_rewritten_stylesheets(self):
+        stylesheets = RewrittenStylesheets(self.export_dir)
+        filename = stylesheets.get("assets/css/home/style.css")
+        self.assertEqual(Path(filename).read_text(),
+                "p { background: url(../img/logo.png) }")
+        self.assertEqual(stylesheets.get("assets/css/home/style.css"),
+                filename)
+
+        #Stylesheets without links are read in place
+        self.stylesheet.write_text("p {}")
+        self.assertEqual(stylesheets.get("assets/css/home/style.css"),
+                str(self.stylesheet.resolve()))
+        with self.assertRaises(FileNotFoundError):
+            stylesheets.get("assets/css/home/missing.css")
+
+    def test_converted_pages(self):
+        pages = ConvertedPages(self.export_dir, "html.parser")
+        content = pages.get("home/index.html")
+        self.assertEqual(content, '{% load static %}\n{% if user %}'
+                '<p>Hello</p>{% endif %}<img src=\'{% static '
+                '"home/img/logo.png" %}\'>')
+        self.assertIs(pages.get("home/index.html"), content)
+
+        #Modified pages are converted again
+        self.page.write_text('<p dj-ref="user"></p>')
+        self.assertIn("{{user}}", pages.get("home/index.html"))
+
+        for template_name in ["home/missing.html", "index.html",
+                "assets/css/home/a.html", "home/../../a.html"]:
+            with self.assertRaises(FileNotFoundError):
+                pages.get(template_name)
+
+    def test_cache_size(self):
+        pages = ConvertedPages(self.export_dir, "html.parser", size=1)
+        Path(self.export_dir, "home", "about.html").write_text("<p>a</p>")
+        pages.get("home/index.html")
+        pages.get("home/about.html")
+        self.assertEqual(list(pages.pages),
+                [os.path.join(pages.export_dir, "home", "about.html")])
+
+@unittest.skipUnless(importlib.util.find_spec("django"),
+        "django is not installed")
+class DjangoLiveTest(ExportFixture, unittest.TestCase):
+    """
+    Test suits for bss_converter.django_live module.
+    """
+    def setUp(self):
+        super().setUp()
+        import django
+        from django.conf import settings
+        from django.test.utils import override_settings
+        if not settings.configured:
+            settings.configure(STATIC_URL="/static/",
+                    INSTALLED_APPS=["django.contrib.staticfiles"])
+            django.setup()
+        self.settings = override_settings(BSS_EXPORT_DIR=self.export_dir)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        super().tearDown()
+
+    def test_loader(self):
+        from django.template import Context, Engine, TemplateDoesNotExist
+        engine = Engine(loaders=["bss_converter.django_live.ExportLoader"],
+                libraries={"static": "django.templatetags.static"})
+        template = engine.get_template("home/index.html")
+        self.assertIn("<p>Hello</p>", template.render(Context(
+            {"user": "admin"})))
+        self.assertIn("/static/home/img/logo.png",
+                template.render(Context()))
+        with self.assertRaises(TemplateDoesNotExist):
+            engine.get_template("home/missing.html")
+
+    def test_loader_settings(self):
+        """
+        Loaders with other converter settings do not share
+        converted pages.
+        """
+        from django.template import Engine
+        engines = [Engine(loaders=[("bss_converter.django_live."
+            "ExportLoader", None, "html.parser", output_format)],
+            libraries={"static": "django.templatetags.static"}) \
+                    for output_format in ["preserve", "prettify"]]
+        sources = [engine.get_template("home/index.html").source \
+                for engine in engines]
+        self.assertNotEqual(sources[0], sources[1])
+        self.assertEqual(engines[0].get_template("home/index.html").source,
+                sources[0])
+
+    def test_finder(self):
+        from bss_converter.django_live import ExportFinder
+        finder = ExportFinder()
+        logo = os.path.join(os.path.realpath(self.export_dir), "assets",
+                "img", "home", "logo.png")
+        self.assertEqual(finder.find("home/img/logo.png"), logo)
+        self.assertEqual(finder.find("home/img/missing.png"), [])
+        files = list(finder.list([]))
+        self.assertEqual([name for name, _ in files], ["home/css/style.css",
+            "home/img/logo.png"])
+        self.assertEqual(files[1][1].path(files[1][0]), logo)
+        with files[0][1].open(files[0][0]) as css_stream:
+            self.assertEqual(css_stream.read(),
+                    b"p { background: url(../img/logo.png) }")
+
+    def test_stylesheet_links(self):
+        """
+        Images referenced by stylesheets are served with their
+        static names.
+        """
+        import posixpath
+        import re
+        from django.contrib.staticfiles.views import serve
+        from django.test import RequestFactory
+        from django.test.utils import override_settings
+        with override_settings(DEBUG=True, STATICFILES_FINDERS=[
+                "bss_converter.django_live.ExportFinder"]):
+            request = RequestFactory().get("/static/home/css/style.css")
+            response = serve(request, "home/css/style.css")
+            css = b"".join(response.streaming_content).decode()
+            url = re.search(r"url\((.*)\)", css).group(1)
+            image = posixpath.normpath(posixpath.join("home/css", url))
+            self.assertEqual(image, "home/img/logo.png")
+            response = serve(RequestFactory().get("/static/" + image), image)
+            self.assertEqual(response.status_code, 200)
+            response.close()
@@ -0,0 +1,65 @@
+import unittest
+import tempfile
+import json
+import os
+from pathlib import Path
+from bss_converter import TagConverter
+from bss_converter.metrics import Metrics, NullMetrics
+
+class MetricsTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.metrics module.
+    """
+    def setUp(self):
+        self.metrics = Metrics()
+        with self.metrics.stage("extract", "home/index.html") as stage:
+            stage["bytes"] = 100
+        self.metrics.add("extract", 2, 50, "home/about.html")
+        self.metrics.merge_file("home/about.html",
+                {"save": {"seconds": 1, "bytes": 10}})
+        self.metrics.count("converted", 2)
+
+    def test_aggregate(self):
+        self.assertEqual(self.metrics.stages["extract"]["bytes"], 150)
+        self.assertEqual(self.metrics.stages["extract"]["count"], 2)
+        self.assertEqual(self.metrics.file_time("home/about.html"), 3)
+        self.assertEqual(self.metrics.slowest_files(1), ["home/about.html"])
+
+    def test_reports(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file = os.path.join(tmp_dir, "report.json")
+            self.metrics.write_json(json_file)
+            with open(json_file) as json_stream:
+                report = json.load(json_stream)
+            self.assertEqual(report["counters"], {"converted": 2})
+
+            prometheus_file = os.path.join(tmp_dir, "bss.prom")
+            self.metrics.write_prometheus(prometheus_file)
+            with open(prometheus_file) as prometheus_stream:
+                content = prometheus_stream.read()
+            self.assertIn('bss_export_stage_bytes{stage="extract"} 150',
+                    content)
+            self.assertIn('bss_export_files{status="converted"} 2', content)
+
+    def test_disabled(self):
+        metrics = NullMetrics()
+        with metrics.stage("extract", "home/index.html") as stage:
+            stage["bytes"] = 100
+        self.assertEqual(metrics.stages, {})
+
+    def test_converter_stages(self):
+        """
+        Converted pages record every stage, the written file
+        in a save stage whatever the output format.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            page = Path(tmp_dir, "index.html")
+            for output_format in ["preserve", "prettify"]:
+                with self.subTest(output_format=output_format):
+                    page.write_text('<p dj-ref="user"></p>')
+                    metrics = Metrics()
+                    TagConverter(str(page), "html.parser", metrics=metrics,
+                            output_format=output_format)
+                    self.assertIn("extract", metrics.stages)
+                    self.assertEqual(metrics.stages["save"]["bytes"],
+                            len(page.read_text()))
@@ -0,0 +1,111 @@
+import unittest
+import glob
+import os
+from bs4 import BeautifulSoup
+from bss_converter import StreamConverter, TagConverter
+from bss_converter.tag_converter import ConversionError
+from test_tag_converter import TemporaryFile
+import test_tag_converter
+
+class StreamConverterTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.StreamConverter class.
+
+    Streaming engine keep source formatting, rendered templates
+    are compared with reference files once parsed, without any
+    whitespace.
+    """
+    TEMPLATE_DIR = test_tag_converter.TagConverterTest.TEMPLATE_DIR
+    BSS_EXTENSION = test_tag_converter.TagConverterTest.BSS_EXTENSION
+    DJANGO_EXTENSION = test_tag_converter.TagConverterTest.DJANGO_EXTENSION
+
+    @staticmethod
+    def normalize(filename):
+        """
+        Return content of given filename without spacing,
+        attribute order, quoting and self closing tag differences.
+        """
+        with open(filename) as file_stream:
+            content = BeautifulSoup(file_stream.read(), "html.parser")
+        return "".join(content.prettify().split())
+
+    def test_templates_conformance(self):
+        """
+        Render every bss template and compare it with
+        its reference file.
+        """
+        pattern = os.path.join(self.TEMPLATE_DIR, "**", \
+                "*" + self.DJANGO_EXTENSION)
+
+        for django_file in sorted(glob.glob(pattern, recursive=True)):
+            bss_file = django_file[:-len(self.DJANGO_EXTENSION)] + \
+                    self.BSS_EXTENSION
+            with self.subTest(template=bss_file), \
+                    TemporaryFile(bss_file) as copy_file:
+                StreamConverter(copy_file)
+                self.assertEqual(self.normalize(copy_file),
+                        self.normalize(django_file))
+
+    def test_invalid_cache_fragment(self):
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, \
+                "cache", "basic.html")) as copy_file:
+            with open(copy_file, "w") as file_stream:
+                file_stream.write('<div dj-cache="500"></div>\n')
+            with self.assertRaises(ConversionError):
+                StreamConverter(copy_file)
+
+    def test_fast_path(self):
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, \
+                "if", "basic.html")) as copy_file:
+            self.assertFalse(StreamConverter(copy_file).fast_path)
+            self.assertTrue(StreamConverter(copy_file).fast_path)
+
+    def test_keep_formatting(self):
+        """
+        Untouched markup must be written as it was read.
+        """
+        content = '<div  class=a>\n  <p>Text &amp; more</p>\n' \
+                '  <!-- comment --><br>\n</div>\n'
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, \
+                "if", "basic.html")) as copy_file:
+            with open(copy_file, "w") as file_stream:
+                file_stream.write(content)
+            StreamConverter(copy_file)
+            with open(copy_file) as file_stream:
+                self.assertEqual(file_stream.read(),
+                        "{% load static %}\n" + content)
+
+    def test_same_output_as_tree(self):
+        """
+        Converted tags are written like preserved pages of the tree
+        engine, attributes in their source order.
+        """
+        content = '<div class="row" id="main" dj-if="user" data-x="1">\n' \
+                '  <img src="assets/img/home/a.png" alt="A" width="10">\n' \
+                '  <p title="t" dj-ref="user" class="b"></p>\n</div>\n'
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, \
+                "if", "basic.html")) as copy_file:
+            with open(copy_file, "w") as file_stream:
+                file_stream.write(content)
+            StreamConverter(copy_file)
+            with open(copy_file) as file_stream:
+                stream_output = file_stream.read()
+        tree_output = TagConverter(parser="html.parser").convert_string(
+                content)
+        self.assertEqual(stream_output, tree_output)
+        self.assertIn('<div class="row" id="main" data-x="1">',
+                stream_output)
+
+    def test_keep_end_tags(self):
+        """
+        End tags are written as they were read, like start tags.
+        """
+        content = '<DIV dj-if="user"><P>Text</P ></DIV>\n'
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, \
+                "if", "basic.html")) as copy_file:
+            with open(copy_file, "w") as file_stream:
+                file_stream.write(content)
+            StreamConverter(copy_file)
+            with open(copy_file) as file_stream:
+                self.assertEqual(file_stream.read(), "{% load static %}\n"
+                        "{% if user %}<div><P>Text</P ></DIV>{% endif %}\n")
@@ -0,0 +1,126 @@
+import unittest
+import tempfile
+import io
+import os
+from pathlib import Path
+from bss_converter.stylesheet import StylesheetRewriter, resolve_url
+
+class StylesheetRewriterTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.stylesheet module.
+    """
+    CSS_FILE = "assets/css/home/style.css"
+
+    def rewrite(self, css, chunk_size=64 * 1024):
+        rewriter = StylesheetRewriter(chunk_size)
+        output = io.BytesIO()
+        count = rewriter.rewrite_stream(io.BytesIO(css), output,
+                self.CSS_FILE)
+        return output.getvalue(), count
+
+    def test_rewrite_link(self):
+        links = {
+            "../../img/home/a.png": "../img/a.png",
+            "'../../img/home/a.png'": "'../img/a.png'",
+            '"../../fonts/blog/f.woff?v=2#x"': '"../../blog/fonts/f.woff?v=2#x"',
+            "/assets/img/home/sub/b.png": "../img/sub/b.png",
+            "other.css": "other.css",
+            "https://example.com/a.png": "https://example.com/a.png",
+            "data:image/png;base64,AAAA": "data:image/png;base64,AAAA",
+            "../../../home/index.html": "../../../home/index.html",
+        }
+        for link, expected in links.items():
+            with self.subTest(link=link):
+                css = f"p {{ background: url({link}) }}".encode()
+                output, count = self.rewrite(css)
+                self.assertEqual(output,
+                        f"p {{ background: url({expected}) }}".encode())
+                self.assertEqual(count, int(link != expected))
+
+    def test_resolve_url(self):
+        """
+        Targets of urls, shared by rewritten and hashed stylesheets.
+        """
+        urls = {
+            "../../img/home/a.png?v=2#x": ("assets/img/home/a.png", "?v=2#x"),
+            "/assets/img/home/a.png": ("assets/img/home/a.png", ""),
+            "sub/b.png": ("assets/css/home/sub/b.png", ""),
+            "data:image/png;base64,AAAA": None,
+            "": None,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(resolve_url(url, self.CSS_FILE), expected)
+
+    def test_chunks(self):
+        """
+        Links cut between two chunks are rewritten, long
+        data uris are kept.
+        """
+        css = b"".join([b"a { background: url('../../img/home/a.png') }\n",
+            b"b { background: url(data:image/png;base64,",
+            b"A" * 10000, b") }\n",
+            b"c{background:url(../../img/home/c.png)}"] * 5)
+        expected = css.replace(b"../../img/home/", b"../img/")
+        for chunk_size in [5, 64, 4096]:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.rewrite(css, chunk_size),
+                        (expected, 10))
+
+    def test_rewrite_tree(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, "css")
+            destination = os.path.join(tmp_dir, "rewritten")
+            Path(source, "home").mkdir(parents=True)
+            Path(source, "home", "style.css").write_text(
+                    "p { background: url(../../img/home/a.png) }")
+            Path(source, "home", "plain.css").write_text("p {}")
+            Path(source, "home", "style.css.map").write_text("{}")
+
+            rewriter = StylesheetRewriter()
+            rewriter.rewrite_tree(source, destination)
+            style = Path(destination, "home", "style.css")
+            self.assertEqual(rewriter.rewritten, [str(style)])
+            self.assertEqual(style.read_text(),
+                    "p { background: url(../img/a.png) }")
+            for filename in ["plain.css", "style.css.map"]:
+                self.assertTrue(os.path.samefile(os.path.join(source,
+                    "home", filename), os.path.join(destination, "home",
+                        filename)))
+
+            os.unlink(os.path.join(source, "home", "plain.css"))
+            rewriter = StylesheetRewriter()
+            rewriter.rewrite_tree(source, destination)
+            self.assertEqual(rewriter.rewritten, [])
+            self.assertEqual(len(rewriter.unchanged), 2)
+            self.assertFalse(Path(destination, "home", "plain.css").exists())
+
+    def test_linked_stylesheet_modified(self):
+        """
+        A stylesheet linked while it had no link to rewrite is
+        rewritten once modified in place.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, "css")
+            destination = os.path.join(tmp_dir, "rewritten")
+            Path(source, "home").mkdir(parents=True)
+            source_file = Path(source, "home", "style.css")
+            source_file.write_text("p {}")
+            StylesheetRewriter().rewrite_tree(source, destination)
+
+            #Written in place, through the link
+            stat = source_file.stat()
+            with open(source_file, "w") as css_stream:
+                css_stream.write(
+                        "p { background: url(../../img/home/a.png) }")
+            os.utime(source_file, ns=(stat.st_atime_ns,
+                stat.st_mtime_ns + 1))
+
+            rewriter = StylesheetRewriter()
+            rewriter.rewrite_tree(source, destination)
+            style = Path(destination, "home", "style.css")
+            self.assertEqual(rewriter.rewritten, [str(style)])
+            self.assertEqual(style.read_text(),
+                    "p { background: url(../img/a.png) }")
+            self.assertEqual(source_file.read_text(),
+                    "p { background: url(../../img/home/a.png) }")
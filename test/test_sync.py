@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+import os
+from pathlib import Path
+from unittest import mock
+from bss_converter import sync
+from bss_converter.sync import sync_tree, copy_file
+
+class SyncTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.sync module.
+    """
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._tmp_dir.name, "source")
+        self.destination = os.path.join(self._tmp_dir.name, "destination")
+
+        Path(self.source, "sub").mkdir(parents=True)
+        Path(self.source, "style.css").write_text("body {}")
+        Path(self.source, "sub", "script.js").write_text("run();")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_copy_modified_files(self):
+        report = sync_tree(self.source, self.destination)
+        self.assertEqual(len(report.copied), 2)
+        self.assertEqual(report.bytes_copied, 13)
+        self.assertEqual(Path(self.destination, "sub", "script.js") \
+                .read_text(), "run();")
+
+        report = sync_tree(self.source, self.destination)
+        self.assertEqual(report.copied, [])
+        self.assertEqual(len(report.unchanged), 2)
+
+        Path(self.source, "style.css").write_text("body {margin: 0}")
+        report = sync_tree(self.source, self.destination)
+        self.assertEqual(report.copied,
+                [os.path.join(self.destination, "style.css")])
+
+    def test_checksum(self):
+        sync_tree(self.source, self.destination)
+
+        #Same size and modification time, different content
+        source_file = Path(self.source, "style.css")
+        stat = source_file.stat()
+        source_file.write_text("body [}")
+        os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(sync_tree(self.source, self.destination).copied,
+                [])
+        report = sync_tree(self.source, self.destination, checksum=True)
+        self.assertEqual(len(report.copied), 1)
+
+    def test_delete(self):
+        sync_tree(self.source, self.destination)
+        os.unlink(os.path.join(self.source, "sub", "script.js"))
+        os.rmdir(os.path.join(self.source, "sub"))
+
+        report = sync_tree(self.source, self.destination)
+        self.assertEqual(report.deleted, [])
+
+        report = sync_tree(self.source, self.destination, delete=True)
+        self.assertEqual(report.deleted,
+                [os.path.join(self.destination, "sub", "script.js")])
+        self.assertEqual(os.listdir(self.destination), ["style.css"])
+
+    def test_link(self):
+        """
+        Linked files are replaced when modified, never
+        written through the link.
+        """
+        style = os.path.join(self.destination, "style.css")
+        sync_tree(self.source, self.destination)
+        self.assertFalse(os.path.samefile(style,
+            os.path.join(self.source, "style.css")))
+
+        sync_tree(self.source, self.destination, link=True, checksum=True)
+        self.assertFalse(os.path.samefile(style,
+            os.path.join(self.source, "style.css")))
+
+        os.unlink(style)
+        report = sync_tree(self.source, self.destination, link=True)
+        self.assertEqual(report.copied, [style])
+        self.assertTrue(os.path.samefile(style,
+            os.path.join(self.source, "style.css")))
+
+        copy_file(os.path.join(self.source, "sub", "script.js"), style)
+        self.assertEqual(Path(self.source, "style.css").read_text(),
+                "body {}")
+
+    def test_copy_range(self):
+        """
+        Files copied by the kernel keep their content and
+        modification time, with a fallback without copy_file_range.
+        """
+        source_file = os.path.join(self.source, "style.css")
+        for copy_file_range in [sync._copy_file_range, None]:
+            with self.subTest(copy_file_range=copy_file_range), \
+                    mock.patch.object(sync, "_copy_file_range",
+                            copy_file_range), \
+                    mock.patch.object(sync, "clone_file",
+                            return_value=False):
+                destination_file = os.path.join(self.destination,
+                        "style.css")
+                os.makedirs(self.destination, exist_ok=True)
+                copy_file(source_file, destination_file)
+                self.assertEqual(Path(destination_file).read_text(),
+                        "body {}")
+                self.assertTrue(sync.is_same_file(source_file,
+                    destination_file))
@@ -1,6 +1,11 @@
 import unittest
+import glob
+import io
 import os
 from bss_converter import TagConverter
+from bs4 import BeautifulSoup
+from bss_converter.tag_converter import available_parsers, \
+        ConversionError, DECODE_CHUNK_SIZE
 
 class TemporaryFile:
     """
@@ -38,7 +43,7 @@ class TagConverterTest(unittest.TestCase):
     BSS_EXTENSION = ".html"
     DJANGO_EXTENSION = ".render.html"
 
-    def compare_file(self, folder, filename):
+    def compare_file(self, folder, filename, parser="html.parser"):
         """
         Select a bss template, create a copy of the template,
         and render the copy with TagConverter.
@@ -53,7 +58,7 @@ class TagConverterTest(unittest.TestCase):
         bss_file = filename + self.BSS_EXTENSION
         django_file = filename + self.DJANGO_EXTENSION 
         with TemporaryFile(bss_file) as copy_file:
-            TagConverter(copy_file)
+            TagConverter(copy_file, parser, output_format="prettify")
             self.compare_file_content(copy_file, django_file)
 
     @staticmethod
@@ -112,8 +117,205 @@ class TagConverterTest(unittest.TestCase):
         self.compare_file("static_links", "src")
         self.compare_file("static_links", "href")
         self.compare_file("static_links", "css_url")
+        self.compare_file("static_links", "css_style")
 
     def test_reference(self):
         self.compare_file("reference", "basic")
         self.compare_file("reference", "multiple")
         self.compare_file("reference", "with_content")
+
+    def test_cache_fragment(self):
+        self.compare_file("cache", "basic")
+        self.compare_file("cache", "vary_on")
+        self.compare_file("cache", "manage_attribute")
+
+    def test_invalid_cache_fragment(self):
+        """
+        Cache arguments django can't render are rejected
+        at conversion time.
+        """
+        for value in ["", "500", "-5 sidebar", "500 side/bar",
+                "500 sidebar user.name|", "500 sidebar using=a+b"]:
+            with self.subTest(value=value), TemporaryFile(os.path.join( \
+                    self.TEMPLATE_DIR, "cache", "basic.html")) as copy_file:
+                with open(copy_file, "w") as file_stream:
+                    file_stream.write(f'<div dj-cache="{value}"></div>\n')
+                with self.assertRaises(ConversionError):
+                    TagConverter(copy_file, "html.parser")
+
+    def test_fast_path(self):
+        """
+        Pages without anything to convert are copied without
+        being parsed, other pages are fully converted.
+        """
+        pages = {
+            '<p class="a" >Text</p>\n<a href="https://x.org/a/b/c">x</a>':
+                True,
+            "<script src='//cdn.org/a/b/c.js'></script><a href=#top>t</a>":
+                True,
+            '<img src="assets/img/home/a.png">': False,
+            '<a HREF = "assets/img/home/a.png">a</a>': False,
+            '<div style="background: url(a.png)"></div>': False,
+            '<p Dj-Ref="user"></p>': False,
+        }
+        for content, fast_path in pages.items():
+            with self.subTest(content=content), TemporaryFile(os.path.join( \
+                    self.TEMPLATE_DIR, "if", "basic.html")) as copy_file:
+                with open(copy_file, "w") as file_stream:
+                    file_stream.write(content)
+                converter = TagConverter(copy_file, "html.parser")
+                self.assertEqual(converter.fast_path, fast_path)
+                if fast_path:
+                    with open(copy_file) as file_stream:
+                        self.assertEqual(file_stream.read(),
+                                TagConverter.LOAD_STATIC + content)
+
+                #Prettified pages are always parsed
+                converter = TagConverter(copy_file, "html.parser",
+                        output_format="prettify")
+                self.assertFalse(converter.fast_path)
+
+    def test_fast_path_encoding(self):
+        """
+        Unconverted pages are decoded by slices, an undecodable
+        byte of a later slice fails the page.
+        """
+        content = b"<p>" + b"a" * DECODE_CHUNK_SIZE + b"\xff</p>"
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, "if",
+                "basic.html")) as copy_file:
+            with open(copy_file, "wb") as file_stream:
+                file_stream.write(content)
+            with self.assertRaises(ConversionError):
+                TagConverter(copy_file, "html.parser")
+            with open(copy_file, "rb") as file_stream:
+                self.assertEqual(file_stream.read(), content)
+
+            #A character cut between two slices is decoded
+            content = b"<p>" + b"a" * (DECODE_CHUNK_SIZE - 4) + \
+                    "\u00e9</p>".encode()
+            with open(copy_file, "wb") as file_stream:
+                file_stream.write(content)
+            self.assertTrue(TagConverter(copy_file, "html.parser").fast_path)
+
+    def test_in_memory_conversion(self):
+        """
+        A single converter renders documents in memory like
+        files converted in place.
+        """
+        converter = TagConverter(parser="html.parser",
+                output_format="prettify")
+        for folder, filename in [("static_links", "src"), ("if", "basic"),
+                ("cache", "basic")]:
+            bss_file = os.path.join(self.TEMPLATE_DIR, folder, filename + \
+                    self.BSS_EXTENSION)
+            with self.subTest(template=bss_file), \
+                    TemporaryFile(bss_file) as copy_file:
+                with open(bss_file) as file_stream:
+                    markup = file_stream.read()
+                content = converter.convert_string(markup)
+
+                TagConverter(copy_file, "html.parser",
+                        output_format="prettify")
+                with open(copy_file) as file_stream:
+                    self.assertEqual(content, file_stream.read())
+                self.assertEqual(converter.convert_bytes(markup.encode()),
+                        content.encode())
+
+        converter.convert_string('<img src="assets/img/home/a.png">')
+        self.assertEqual(converter.static_links, {"assets/img/home/a.png"})
+        converter.convert_string("<p>Text</p>")
+        self.assertEqual(converter.static_links, set())
+
+    def test_stream_conversion(self):
+        converter = TagConverter(parser="html.parser")
+        output = io.StringIO()
+        size = converter.convert_stream(io.StringIO(
+            '<p dj-if="user">Text</p>\n'), output)
+        self.assertEqual(output.getvalue(),
+                "{% load static %}\n{% if user %}<p>Text</p>{% endif %}\n")
+        self.assertEqual(size, len(output.getvalue()))
+
+        with self.assertRaises(ConversionError):
+            converter.convert_bytes(b"<p>\xff</p>")
+
+    def test_parser_conformance(self):
+        """
+        Every installed parser must render all templates
+        exactly like their reference file.
+        """
+        pattern = os.path.join(self.TEMPLATE_DIR, "**", \
+                "*" + self.DJANGO_EXTENSION)
+        references = sorted(glob.glob(pattern, recursive=True))
+
+        for parser in available_parsers():
+            for reference in references:
+                folder = os.path.basename(os.path.dirname(reference))
+                filename = os.path.basename(reference)
+                filename = filename[:-len(self.DJANGO_EXTENSION)]
+
+                with self.subTest(parser=parser, template=reference):
+                    self.compare_file(folder, filename, parser)
+
+    def test_preserve_format(self):
+        """
+        Preserved output must hold the same html than the reference
+        file once prettified, whitespace apart.
+        """
+        pattern = os.path.join(self.TEMPLATE_DIR, "**", \
+                "*" + self.DJANGO_EXTENSION)
+
+        for django_file in sorted(glob.glob(pattern, recursive=True)):
+            bss_file = django_file[:-len(self.DJANGO_EXTENSION)] + \
+                    self.BSS_EXTENSION
+            with self.subTest(template=bss_file), \
+                    TemporaryFile(bss_file) as copy_file:
+                TagConverter(copy_file, "html.parser",
+                        output_format="preserve")
+                with open(copy_file) as file_stream:
+                    content = BeautifulSoup(file_stream.read(),
+                            "html.parser").prettify()
+                self.assertEqual("".join(content.split()),
+                        "".join(self.readfile(django_file).split()))
+
+    def test_preserve_page(self):
+        """
+        A whole exported page is written byte for byte,
+        converted links apart.
+        """
+        page = '<!DOCTYPE html>\n<html lang="en">\n\n<head>\n' \
+                '    <meta charset="utf-8">\n' \
+                '    <meta name="viewport" content="width=device-width, ' \
+                'initial-scale=1.0">\n' \
+                '    <title>Café — Home</title>\n' \
+                '    <link rel="stylesheet" href="{}">\n' \
+                '</head>\n\n<body>\n    <!-- navbar -->\n' \
+                '    <nav class="navbar navbar-light"><a class="navbar-brand"' \
+                ' href="#">Brand &amp; co &lt;3</a></nav>\n' \
+                '    <p  id="text">\n        Text\n    </p>\n' \
+                '    <script src="https://cdn.example.com/a.js"></script>\n' \
+                '</body>\n\n</html>\n'
+        for parser in ["html.parser", "lxml"]:
+            with self.subTest(parser=parser):
+                content = TagConverter(parser=parser,
+                        output_format="preserve").convert_string(
+                                page.format("assets/css/home/styles.css"))
+                self.assertEqual(content, "{% load static %}\n" + \
+                        page.format('{% static "home/css/styles.css" %}') \
+                        .replace("<p  ", "<p ").replace('href="{%',
+                            "href='{%").replace('%}">', "%}'>"))
+
+    def test_preserve_formatting(self):
+        """
+        Untouched markup keeps its spacing and attributes order.
+        """
+        content = '<div  id="b" class="a">\n  <p>Text &amp; more</p>\n' \
+                '  <!-- comment --><br>\n</div>\n'
+        with TemporaryFile(os.path.join(self.TEMPLATE_DIR, \
+                "if", "basic.html")) as copy_file:
+            with open(copy_file, "w") as file_stream:
+                file_stream.write(content + '<p dj-if="user">x</p>\n')
+            TagConverter(copy_file, "html.parser", output_format="preserve")
+            with open(copy_file) as file_stream:
+                self.assertEqual(file_stream.read(), "{% load static %}\n" + \
+                        content.replace("<div  ", "<div ") + \
+                        "{% if user %}<p>x</p>{% endif %}\n")
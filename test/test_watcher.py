@@ -0,0 +1,79 @@
+import unittest
+import tempfile
+import os
+from pathlib import Path
+from bss_converter.watcher import watch, PollingWatcher, InotifyWatcher
+
+class StopWatching(Exception):
+    pass
+
+class FakeWatcher:
+    """
+    Watcher returning predefined events, None being
+    used as a wait timeout.
+    """
+    def __init__(self, events):
+        self.events = list(events)
+        self.closed = False
+
+    def wait(self, timeout=None):
+        if not self.events:
+            raise StopWatching()
+        return self.events.pop(0)
+
+    def close(self):
+        self.closed = True
+
+class WatcherTest(unittest.TestCase):
+    """
+    Test suits for bss_converter.watcher module.
+    """
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._tmp_dir.name
+        Path(self.directory, "home").mkdir()
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_debounce(self):
+        """
+        Events following each other are exported in a single batch.
+        """
+        watcher = FakeWatcher([{"a.html"}, {"b.html"}, set(), {"c.css"},
+            set()])
+        batches = []
+        with self.assertRaises(StopWatching):
+            watch(self.directory, batches.append, watcher=watcher)
+
+        self.assertEqual(batches, [["a.html", "b.html"], ["c.css"]])
+        self.assertTrue(watcher.closed)
+
+    def test_polling(self):
+        watcher = PollingWatcher(self.directory, interval=0.01)
+        self.assertEqual(watcher.wait(0.05), set())
+
+        Path(self.directory, "home", "index.html").touch()
+        self.assertEqual(watcher.wait(1),
+                {os.path.join("home", "index.html")})
+
+    def test_inotify(self):
+        try:
+            watcher = InotifyWatcher(self.directory)
+        except OSError:
+            self.skipTest("inotify is not available")
+
+        try:
+            self.assertEqual(watcher.wait(0.05), set())
+            Path(self.directory, "home", "index.html").touch()
+            self.assertEqual(watcher.wait(1),
+                    {os.path.join("home", "index.html")})
+
+            #Files of new directories are watched
+            Path(self.directory, "forum").mkdir()
+            watcher.wait(1)
+            Path(self.directory, "forum", "login.html").touch()
+            self.assertIn(os.path.join("forum", "login.html"),
+                    watcher.wait(1))
+        finally:
+            watcher.close()
@@ -1 +1,2 @@
 from .tree_script import TreeScript
+from .export_generator import ExportGenerator
@@ -0,0 +1,147 @@
+from .file_utils import TaggedFile, Directory, Workdir
+from pathlib import Path
+import random
+import shutil
+import os
+
+class ExportGenerator:
+    """
+    Generate a synthetic Bootstrap Studio export with its
+    django project, sized for benchmarks.
+
+    Export contains `apps` applications, each with `pages` html
+    pages of about `page_size` bytes. `density` is the ratio of
+    html elements using a dj-* attribute, and each application
+    gets `assets` files of each asset type.
+    """
+    ASSET_TYPES = {
+        "css": ("style{}.css", b".banner { background: #fff; }\n"),
+        "js": ("script{}.js", b"function run() { return 0; }\n"),
+        "img": ("image{}.png", b"\x89PNG\r\n\x1a\n" + bytes(range(256))),
+    }
+    BSS_DIR = "bench_bss"
+    DJANGO_DIR = "bench_django"
+    SETTINGS_APP = "project"
+
+    def __init__(self, directory, apps=2, pages=10, page_size=20000,
+            density=0.2, assets=5, seed=0):
+        self.directory = os.path.realpath(directory)
+        self.apps = [f"app{index}" for index in range(apps)]
+        self.pages = pages
+        self.page_size = page_size
+        self.density = density
+        self.assets = assets
+        self.random = random.Random(seed)
+
+        self.export_dir = os.path.join(self.directory, self.BSS_DIR)
+        self.django_dir = os.path.join(self.directory, self.DJANGO_DIR)
+
+    def generate(self):
+        """
+        Create export and django project folders, return the
+        total size of html pages in bytes.
+        """
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        with Workdir(self.directory):
+            Directory(self.BSS_DIR, self._export_files()).generate()
+
+        self.reset_django()
+        self._write_assets()
+        return self._write_pages()
+
+    def reset_django(self):
+        """
+        Create back an empty django project, without any
+        exported file.
+        """
+        shutil.rmtree(self.django_dir, ignore_errors=True)
+        with Workdir(self.directory):
+            Directory(self.DJANGO_DIR, self._django_files()).generate()
+        Path(self.django_dir, self.SETTINGS_APP, "settings.py").touch()
+
+    def clean(self):
+        shutil.rmtree(self.export_dir, ignore_errors=True)
+        shutil.rmtree(self.django_dir, ignore_errors=True)
+
+    def _export_files(self):
+        """
+        List files of the export, tagged with their folder level.
+        """
+        files = [TaggedFile("assets/", 0)]
+        for file_type, (asset_name, _) in self.ASSET_TYPES.items():
+            files.append(TaggedFile(f"{file_type}/", 1))
+            for app in self.apps:
+                files.append(TaggedFile(f"{app}/", 2))
+                files.extend(TaggedFile(asset_name.format(index), 3) \
+                        for index in range(self.assets))
+
+        for app in self.apps:
+            files.append(TaggedFile(f"{app}/", 0))
+            files.extend(TaggedFile(f"page{index}.html", 1) \
+                    for index in range(self.pages))
+        return files
+
+    def _django_files(self):
+        """
+        List folders of the django project applications.
+        """
+        return [TaggedFile(f"{app}/", 0) \
+                for app in self.apps + [self.SETTINGS_APP]]
+
+    def _write_assets(self):
+        for file_type, (asset_name, content) in self.ASSET_TYPES.items():
+            for app in self.apps:
+                for index in range(self.assets):
+                    Path(self.export_dir, "assets", file_type, app,
+                            asset_name.format(index)).write_bytes(content)
+
+    def _element(self, app):
+        """
+        Create a random html element, using a bss attribute
+        according to density.
+        """
+        text = "Lorem ipsum dolor sit amet " * self.random.randint(1, 4)
+        if self.random.random() >= self.density:
+            return f'<div class="row"><p>{text}</p></div>\n'
+
+        choice = self.random.randrange(6)
+        if choice == 0:
+            return f'<div dj-for="item in items"><p dj-ref="item.name">' \
+                    f'{text}</p></div>\n<div dj-for-data><p>{text}</p>' \
+                    '</div>\n'
+        if choice == 1:
+            return f'<section dj-if="user.is_authenticated"><p>{text}' \
+                    '</p></section>\n'
+        if choice == 2:
+            return f'<div dj-block="content"><p>{text}</p></div>\n'
+        if choice == 3:
+            return f'<img alt="" src="assets/img/{app}/image0.png">\n'
+        if choice == 4:
+            return f'<div style="background: url(assets/img/{app}/' \
+                    f'image0.png)"><p>{text}</p></div>\n'
+        return f'<span dj-load="humanize">{text}</span>\n'
+
+    def _write_pages(self):
+        """
+        Fill html pages up to the expected page size.
+        """
+        total_size = 0
+        for app in self.apps:
+            for index in range(self.pages):
+                head = f'<!DOCTYPE html>\n<html>\n<head>\n' \
+                        f'<link rel="stylesheet" href="assets/css/{app}/' \
+                        f'style0.css">\n</head>\n<body>\n'
+                tail = f'<script src="assets/js/{app}/script0.js">' \
+                        '</script>\n</body>\n</html>\n'
+
+                elements = []
+                size = len(head) + len(tail)
+                while size < self.page_size:
+                    elements.append(self._element(app))
+                    size += len(elements[-1])
+
+                page = head + "".join(elements) + tail
+                Path(self.export_dir, app, f"page{index}.html") \
+                        .write_text(page)
+                total_size += len(page)
+        return total_size
@@ -20,6 +20,7 @@ class TreeScript:
     """
     DJANGO_DIR = "tmp_django"
     BSS_DIR = "tmp_bss"
+    BUILD_DIR = "tmp_build"
     def __init__(self, script_file):
         # Fix folder name at the top of template
         # represent Boostrap Studio export folder or
@@ -29,6 +30,7 @@ class TreeScript:
         self.reference = Directory('django', reference)
 
         self.django_workdir = os.path.realpath(self.DJANGO_DIR)
+        self.build_workdir = os.path.realpath(self.BUILD_DIR)
 
     def launch(self):
         #Create fake bss and django project
@@ -36,6 +38,7 @@ class TreeScript:
         self.emulate_django_project()
 
         os.environ["DJANGO_PROJECT"] = self.django_workdir
+        os.environ["BSS_BUILD_DIR"] = self.build_workdir
 
         with Workdir(self.BSS_DIR):
             FileManager()
@@ -47,6 +50,7 @@ class TreeScript:
     def clean(self):
         shutil.rmtree(self.BSS_DIR, ignore_errors=True)
         shutil.rmtree(self.DJANGO_DIR, ignore_errors=True)
+        shutil.rmtree(self.BUILD_DIR, ignore_errors=True)
 
     @staticmethod
     def file_indent(filename):